@@ -81,8 +81,12 @@ class Settings:
 
     # ===== MEMÓRIA =====
     MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", str(MEMORY_DIR / "memory.db"))
-    MAX_CONTEXT_LENGTH = int(os.getenv("MAX_CONTEXT_LENGTH", "4000"))
+    MAX_CONTEXT_LENGTH = int(os.getenv("MAX_CONTEXT_LENGTH", "4000"))  # Tokens de historico por chamada
+    # Turnos que saem do orcamento: extractive (resumo local), llm (resumo pela IA) ou none (descarta)
+    CONTEXT_SUMMARY_MODE = os.getenv("CONTEXT_SUMMARY_MODE", "extractive").lower()
     MAX_MEMORY_ITEMS = int(os.getenv("MAX_MEMORY_ITEMS", "100"))
+    # Dias de segmentos do log de interacoes mantidos em disco (0 = sem limite)
+    INTERACTIONS_RETENTION_DAYS = int(os.getenv("INTERACTIONS_RETENTION_DAYS", "365"))
     ENABLE_SEMANTIC_SEARCH = os.getenv("ENABLE_SEMANTIC_SEARCH", "true").lower() == "true"
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Modelo para embeddings
 
@@ -140,6 +144,27 @@ class Settings:
     PROVIDER_FALLBACK_ORDER = os.getenv(
         "PROVIDER_FALLBACK_ORDER", "groq,ollama,openai,anthropic"
     ).split(",")
+    # Cache de respostas (memoria + data/cache/responses.db)
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "21600"))
+    RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", "0.3"))
+    RESPONSE_CACHE_MEMORY_ITEMS = int(os.getenv("RESPONSE_CACHE_MEMORY_ITEMS", "512"))
+    # Cache semantico (parafrases por tipo de tarefa); opt-in
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLDS = os.getenv("SEMANTIC_CACHE_THRESHOLDS", "")
+    SEMANTIC_CACHE_MAX_TEMPERATURE = float(os.getenv("SEMANTIC_CACHE_MAX_TEMPERATURE", "0.7"))
+    # Hedging: provider lento alem do p95 dispara o proximo em paralelo
+    PROVIDER_HEDGING = os.getenv("PROVIDER_HEDGING", "false").lower() == "true"
+    HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "3.0"))  # Sem historico de latencia
+    HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+    HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "15.0"))
+    HEDGE_MAX_INFLIGHT = int(os.getenv("HEDGE_MAX_INFLIGHT", "2"))
+    # Pool HTTP compartilhado (providers + skills de rede), por host
+    HTTP_POOL_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS_PER_HOST", "10"))
+    HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "5"))
+    HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60.0"))
+    HTTP_POOL_HTTP2 = os.getenv("HTTP_POOL_HTTP2", "true").lower() == "true"
+    HTTP_POOL_HOST_LIMITS = os.getenv("HTTP_POOL_HOST_LIMITS", "")
 
     # ===== MODO MESCLADO v6 =====
     # false = so Groq (padrao, mais rapido)
@@ -149,10 +174,17 @@ class Settings:
     # ===== OBSERVABILITY v4 =====
     EVENTS_LOG_DIR = str(DATA_DIR / "logs" / "events")
     EVENTS_RETENTION_DAYS = int(os.getenv("EVENTS_RETENTION_DAYS", "30"))
+    EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "10000"))
+    EVENTS_FLUSH_BATCH = int(os.getenv("EVENTS_FLUSH_BATCH", "256"))
+    EVENTS_FLUSH_INTERVAL = float(os.getenv("EVENTS_FLUSH_INTERVAL", "1.0"))
+    EVENTS_FSYNC = os.getenv("EVENTS_FSYNC", "none").lower()
 
     # ===== TASKS v4 =====
     TASKS_DIR = str(DATA_DIR / "tasks")
     TASK_QUEUE_FILE = str(DATA_DIR / "tasks" / "task_queue.json")
+    SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "16"))
+    SCHEDULER_TASK_TIMEOUT = int(os.getenv("SCHEDULER_TASK_TIMEOUT", "300"))
+    TRIGGER_QUIET_SECONDS = float(os.getenv("TRIGGER_QUIET_SECONDS", "1.0"))
 
     # ===== SKILLS v4 =====
     SKILLS_DIR = str(BASE_DIR / "src" / "skills")
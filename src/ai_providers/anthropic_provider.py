@@ -7,11 +7,15 @@ Item 24 do plano arquitetural - Multi-provider fallback.
 from typing import Optional, Dict, List, Any
 
 from .base_provider import BaseAIProvider
+from ..core.http_pool import get_http_pool
 from ..utils.exceptions import AIProviderError, RateLimitError, TokenLimitError
 from ..utils.logger import get_logger
 
 log = get_logger(__name__)
 
+# Cliente HTTP keep-alive compartilhado (src/core/http_pool.py)
+API_ORIGIN = "https://api.anthropic.com"
+
 
 class AnthropicProvider(BaseAIProvider):
     """Provider para API da Anthropic (Claude)."""
@@ -27,10 +31,12 @@ class AnthropicProvider(BaseAIProvider):
         """
         super().__init__(api_key, model, **kwargs)
         self.client = None
+        self._async_client = None  # (http_client, cliente SDK) do event loop atual
 
         try:
             from anthropic import Anthropic
-            self.client = Anthropic(api_key=api_key)
+            self.client = Anthropic(api_key=api_key,
+                                    http_client=get_http_pool().get_client(API_ORIGIN))
             log.info(f"AnthropicProvider inicializado com modelo: {model}")
         except ImportError:
             log.warning("Pacote 'anthropic' nao instalado. Instale com: pip install anthropic")
@@ -61,59 +67,68 @@ class AnthropicProvider(BaseAIProvider):
             raise AIProviderError("Anthropic client nao inicializado")
 
         try:
-            # Converte contexto para formato Anthropic
-            messages = []
-            system_prompt = None
-
-            if context:
-                for msg in context:
-                    role = msg.get("role", "user")
-                    content = msg.get("content", "")
-                    if role == "system":
-                        system_prompt = content
-                    else:
-                        # Anthropic so aceita "user" e "assistant"
-                        if role not in ("user", "assistant"):
-                            role = "user"
-                        messages.append({"role": role, "content": content})
-
-            messages.append({"role": "user", "content": message})
-
-            # Garante alternancia user/assistant (requisito da Anthropic)
-            messages = self._ensure_alternating(messages)
-
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": kwargs.get("max_tokens", 2048),
-                "temperature": kwargs.get("temperature", 0.7),
-            }
-
-            if system_prompt:
-                params["system"] = system_prompt
-
             log.debug(f"Enviando para Claude: {message[:100]}...")
 
-            response = self.client.messages.create(**params)
-
-            # Extrai texto da resposta
-            text = ""
-            for block in response.content:
-                if hasattr(block, "text"):
-                    text += block.text
+            response = self.client.messages.create(**self._params(message, context, kwargs))
+            text = self._extract_text(response)
 
             log.info(f"Resposta Claude ({len(text)} chars)")
             return text
 
         except Exception as e:
-            error_str = str(e).lower()
-            if "rate_limit" in error_str:
-                raise RateLimitError("Limite de requisicoes Anthropic excedido")
-            elif "token" in error_str:
-                raise TokenLimitError("Limite de tokens Anthropic excedido")
-            else:
-                log.error(f"Erro Anthropic: {e}")
-                raise AIProviderError(f"Erro ao processar com Claude: {str(e)}")
+            raise self._translate_error(e)
+
+    def _params(self, message: str, context: Optional[List[Dict]], kwargs: Dict) -> Dict:
+        """Converte contexto para o formato Anthropic (system separado)."""
+        messages = []
+        system_prompt = None
+
+        if context:
+            for msg in context:
+                role = msg.get("role", "user")
+                content = msg.get("content", "")
+                if role == "system":
+                    system_prompt = content
+                else:
+                    # Anthropic so aceita "user" e "assistant"
+                    if role not in ("user", "assistant"):
+                        role = "user"
+                    messages.append({"role": role, "content": content})
+
+        messages.append({"role": "user", "content": message})
+
+        # Garante alternancia user/assistant (requisito da Anthropic)
+        messages = self._ensure_alternating(messages)
+
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": kwargs.get("max_tokens", 2048),
+            "temperature": kwargs.get("temperature", 0.7),
+        }
+
+        if system_prompt:
+            params["system"] = system_prompt
+        return params
+
+    @staticmethod
+    def _extract_text(response) -> str:
+        """Extrai texto da resposta."""
+        text = ""
+        for block in response.content:
+            if hasattr(block, "text"):
+                text += block.text
+        return text
+
+    def _translate_error(self, e: Exception) -> Exception:
+        """Converte erro do SDK para as excecoes do projeto."""
+        error_str = str(e).lower()
+        if "rate_limit" in error_str:
+            return RateLimitError("Limite de requisicoes Anthropic excedido")
+        elif "token" in error_str:
+            return TokenLimitError("Limite de tokens Anthropic excedido")
+        log.error(f"Erro Anthropic: {e}")
+        return AIProviderError(f"Erro ao processar com Claude: {str(e)}")
 
     def _ensure_alternating(self, messages: List[Dict]) -> List[Dict]:
         """Garante que mensagens alternam entre user e assistant."""
@@ -145,34 +160,7 @@ class AnthropicProvider(BaseAIProvider):
             raise AIProviderError("Anthropic client nao inicializado")
 
         try:
-            messages = []
-            system_prompt = None
-
-            if context:
-                for msg in context:
-                    role = msg.get("role", "user")
-                    content = msg.get("content", "")
-                    if role == "system":
-                        system_prompt = content
-                    else:
-                        if role not in ("user", "assistant"):
-                            role = "user"
-                        messages.append({"role": role, "content": content})
-
-            messages.append({"role": "user", "content": message})
-            messages = self._ensure_alternating(messages)
-
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": kwargs.get("max_tokens", 2048),
-                "temperature": kwargs.get("temperature", 0.7),
-            }
-
-            if system_prompt:
-                params["system"] = system_prompt
-
-            with self.client.messages.stream(**params) as stream:
+            with self.client.messages.stream(**self._params(message, context, kwargs)) as stream:
                 for text in stream.text_stream:
                     yield text
 
@@ -180,6 +168,41 @@ class AnthropicProvider(BaseAIProvider):
             log.error(f"Erro streaming Anthropic: {e}")
             raise AIProviderError(f"Erro no streaming Claude: {str(e)}")
 
+    @property
+    def async_client(self):
+        # O AsyncClient do pool e um por event loop: SDK recriado quando o loop muda
+        http_client = get_http_pool().get_async_client(API_ORIGIN)
+        if self._async_client is None or self._async_client[0] is not http_client:
+            from anthropic import AsyncAnthropic
+            self._async_client = (http_client, AsyncAnthropic(api_key=self.api_key, http_client=http_client))
+        return self._async_client[1]
+
+    async def achat(self, message: str, context: Optional[List[Dict]] = None, **kwargs) -> str:
+        """Versao async do chat (AsyncAnthropic, cancelavel)."""
+        if not self.client:
+            raise AIProviderError("Anthropic client nao inicializado")
+        try:
+            response = await self.async_client.messages.create(
+                **self._params(message, context, kwargs))
+            text = self._extract_text(response)
+            log.info(f"Resposta Claude ({len(text)} chars)")
+            return text
+        except Exception as e:
+            raise self._translate_error(e)
+
+    async def achat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
+        """Versao async do chat_stream."""
+        if not self.client:
+            raise AIProviderError("Anthropic client nao inicializado")
+        try:
+            async with self.async_client.messages.stream(
+                    **self._params(message, context, kwargs)) as stream:
+                async for text in stream.text_stream:
+                    yield text
+        except Exception as e:
+            log.error(f"Erro streaming Anthropic: {e}")
+            raise AIProviderError(f"Erro no streaming Claude: {str(e)}")
+
     def get_model_info(self) -> Dict[str, Any]:
         """Retorna informacoes sobre o modelo Claude."""
         info = super().get_model_info()
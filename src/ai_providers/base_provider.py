@@ -1,8 +1,14 @@
 """
 Interface base para provedores de IA.
 Define o contrato que todos os provedores devem implementar.
+
+achat/achat_stream sao as versoes asyncio. O padrao roda a versao
+sincrona numa thread; providers com SDK async (Groq, OpenAI, Anthropic,
+Google, Ollama via httpx) sobrescrevem com chamadas nativas, que podem
+ser canceladas de verdade (hedging do AIEngine).
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, List
 
@@ -61,6 +67,29 @@ class BaseAIProvider(ABC):
         """
         pass
 
+    async def achat(self, message: str, context: Optional[List[Dict]] = None, **kwargs) -> str:
+        """
+        Versao async do chat.
+
+        Padrao: executa chat() numa thread. Cancelar a task libera quem
+        espera, mas a chamada sincrona termina em segundo plano.
+        """
+        return await asyncio.to_thread(self.chat, message, context, **kwargs)
+
+    async def achat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
+        """
+        Versao async do chat_stream (async generator).
+
+        Padrao: consome o generator sincrono numa thread, chunk a chunk.
+        """
+        chunks = iter(self.chat_stream(message, context, **kwargs))
+        done = object()
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, done)
+            if chunk is done:
+                break
+            yield chunk
+
     def is_available(self) -> bool:
         """
         Verifica se o provider está disponível.
@@ -46,17 +46,8 @@ class GoogleProvider(BaseAIProvider):
             Resposta da IA
         """
         try:
-            # Construir histórico
-            history = []
-            if context:
-                for msg in context:
-                    if msg.get("role") == "user":
-                        history.append({"role": "user", "parts": [msg.get("content", "")]})
-                    elif msg.get("role") == "assistant":
-                        history.append({"role": "model", "parts": [msg.get("content", "")]})
-
-            # Criar chat session
-            chat = self.model_obj.start_chat(history=history)
+            # Criar chat session com o histórico
+            chat = self._start_chat(context)
 
             # Enviar mensagem
             response = chat.send_message(message)
@@ -79,17 +70,8 @@ class GoogleProvider(BaseAIProvider):
             Chunks de resposta
         """
         try:
-            # Construir histórico
-            history = []
-            if context:
-                for msg in context:
-                    if msg.get("role") == "user":
-                        history.append({"role": "user", "parts": [msg.get("content", "")]})
-                    elif msg.get("role") == "assistant":
-                        history.append({"role": "model", "parts": [msg.get("content", "")]})
-
-            # Criar chat session
-            chat = self.model_obj.start_chat(history=history)
+            # Criar chat session com o histórico
+            chat = self._start_chat(context)
 
             # Stream
             response = chat.send_message(message, stream=True)
@@ -101,3 +83,34 @@ class GoogleProvider(BaseAIProvider):
         except Exception as e:
             log.error(f"Erro ao chamar Google Gemini (stream): {e}")
             raise
+
+    async def achat(self, message: str, context: Optional[List[Dict]] = None, **kwargs) -> str:
+        """Versao async do chat (send_message_async, cancelavel)."""
+        try:
+            response = await self._start_chat(context).send_message_async(message)
+            return response.text
+        except Exception as e:
+            log.error(f"Erro ao chamar Google Gemini (async): {e}")
+            raise
+
+    async def achat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
+        """Versao async do chat_stream."""
+        try:
+            response = await self._start_chat(context).send_message_async(message, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            log.error(f"Erro ao chamar Google Gemini (async stream): {e}")
+            raise
+
+    def _start_chat(self, context: Optional[List[Dict]]):
+        """Chat session com o histórico convertido (assistant -> model)."""
+        history = []
+        if context:
+            for msg in context:
+                if msg.get("role") == "user":
+                    history.append({"role": "user", "parts": [msg.get("content", "")]})
+                elif msg.get("role") == "assistant":
+                    history.append({"role": "model", "parts": [msg.get("content", "")]})
+        return self.model_obj.start_chat(history=history)
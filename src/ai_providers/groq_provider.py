@@ -4,15 +4,19 @@ Integração com a API do Groq para modelos Llama, Mixtral, Gemma.
 """
 
 from typing import Optional, Dict, List, Any
-from groq import Groq
+from groq import Groq, AsyncGroq
 from groq._exceptions import APIError
 
 from .base_provider import BaseAIProvider
+from ..core.http_pool import get_http_pool
 from ..utils.exceptions import AIProviderError, RateLimitError, TokenLimitError
 from ..utils.logger import get_logger
 
 log = get_logger(__name__)
 
+# Cliente HTTP keep-alive compartilhado (src/core/http_pool.py)
+API_ORIGIN = "https://api.groq.com"
+
 
 class GroqProvider(BaseAIProvider):
     """Provider para API do Groq."""
@@ -28,8 +32,11 @@ class GroqProvider(BaseAIProvider):
         """
         super().__init__(api_key, model, **kwargs)
 
+        self._async_client = None  # (http_client, cliente SDK) do event loop atual
+
         try:
-            self.client = Groq(api_key=api_key)
+            self.client = Groq(api_key=api_key,
+                               http_client=get_http_pool().get_client(API_ORIGIN))
             log.info(f"GroqProvider inicializado com modelo: {model}")
         except Exception as e:
             log.error(f"Erro ao inicializar Groq: {e}")
@@ -51,31 +58,10 @@ class GroqProvider(BaseAIProvider):
             AIProviderError: Se houver erro na API
         """
         try:
-            # Prepara mensagens
-            messages = []
-
-            # Adiciona contexto se fornecido
-            if context:
-                messages.extend(context)
-
-            # Adiciona mensagem atual
-            messages.append({
-                "role": "user",
-                "content": message
-            })
-
-            # Parâmetros da requisição
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": kwargs.get("temperature", 0.7),
-                "max_tokens": kwargs.get("max_tokens", 2048),
-            }
-
             log.debug(f"Enviando mensagem para Groq: {message[:100]}...")
 
             # Faz requisição
-            completion = self.client.chat.completions.create(**params)
+            completion = self.client.chat.completions.create(**self._params(message, context, kwargs))
 
             # Extrai resposta
             response = completion.choices[0].message.content
@@ -84,17 +70,8 @@ class GroqProvider(BaseAIProvider):
 
             return response
 
-        except APIError as e:
-            if "rate_limit" in str(e).lower():
-                raise RateLimitError("Limite de requisições excedido")
-            elif "token" in str(e).lower():
-                raise TokenLimitError("Limite de tokens excedido")
-            else:
-                raise AIProviderError(f"Erro na API Groq: {str(e)}")
-
         except Exception as e:
-            log.error(f"Erro inesperado no Groq: {e}")
-            raise AIProviderError(f"Erro ao processar com Groq: {str(e)}")
+            raise self._translate_error(e)
 
     def chat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
         """
@@ -109,36 +86,76 @@ class GroqProvider(BaseAIProvider):
             Chunks da resposta
         """
         try:
-            messages = []
+            log.debug("Iniciando streaming do Groq")
 
-            if context:
-                messages.extend(context)
+            stream = self.client.chat.completions.create(
+                **self._params(message, context, kwargs, stream=True))
 
-            messages.append({
-                "role": "user",
-                "content": message
-            })
+            for chunk in stream:
+                if chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
 
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": kwargs.get("temperature", 0.7),
-                "max_tokens": kwargs.get("max_tokens", 2048),
-                "stream": True
-            }
+        except Exception as e:
+            log.error(f"Erro no streaming do Groq: {e}")
+            raise AIProviderError(f"Erro no streaming: {str(e)}")
 
-            log.debug("Iniciando streaming do Groq")
+    @property
+    def async_client(self) -> AsyncGroq:
+        # O AsyncClient do pool e um por event loop: SDK recriado quando o loop muda
+        http_client = get_http_pool().get_async_client(API_ORIGIN)
+        if self._async_client is None or self._async_client[0] is not http_client:
+            self._async_client = (http_client, AsyncGroq(api_key=self.api_key, http_client=http_client))
+        return self._async_client[1]
 
-            stream = self.client.chat.completions.create(**params)
+    async def achat(self, message: str, context: Optional[List[Dict]] = None, **kwargs) -> str:
+        """Versao async do chat (AsyncGroq, cancelavel)."""
+        try:
+            completion = await self.async_client.chat.completions.create(
+                **self._params(message, context, kwargs))
+            response = completion.choices[0].message.content
+            log.info(f"Resposta recebida do Groq ({len(response)} chars)")
+            return response
+        except Exception as e:
+            raise self._translate_error(e)
 
-            for chunk in stream:
+    async def achat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
+        """Versao async do chat_stream."""
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **self._params(message, context, kwargs, stream=True))
+            async for chunk in stream:
                 if chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
-
         except Exception as e:
             log.error(f"Erro no streaming do Groq: {e}")
             raise AIProviderError(f"Erro no streaming: {str(e)}")
 
+    def _params(self, message: str, context: Optional[List[Dict]], kwargs: Dict,
+                stream: bool = False) -> Dict:
+        """Parametros da requisicao (contexto + mensagem atual)."""
+        messages = list(context or [])
+        messages.append({"role": "user", "content": message})
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 2048),
+        }
+        if stream:
+            params["stream"] = True
+        return params
+
+    def _translate_error(self, e: Exception) -> Exception:
+        """Converte erro do SDK para as excecoes do projeto."""
+        if isinstance(e, APIError):
+            if "rate_limit" in str(e).lower():
+                return RateLimitError("Limite de requisições excedido")
+            elif "token" in str(e).lower():
+                return TokenLimitError("Limite de tokens excedido")
+            return AIProviderError(f"Erro na API Groq: {str(e)}")
+        log.error(f"Erro inesperado no Groq: {e}")
+        return AIProviderError(f"Erro ao processar com Groq: {str(e)}")
+
     def get_model_info(self) -> Dict[str, Any]:
         """Retorna informações sobre o modelo Groq."""
         info = super().get_model_info()
@@ -8,6 +8,7 @@ import json
 from typing import Optional, Dict, List, Any
 
 from .base_provider import BaseAIProvider
+from ..core.http_pool import get_http_pool
 from ..utils.exceptions import AIProviderError
 from ..utils.logger import get_logger
 
@@ -33,10 +34,10 @@ class OllamaProvider(BaseAIProvider):
         self._available = False
 
         try:
-            import requests
-            self._requests = requests
+            # Cliente keep-alive compartilhado (uma conexao TCP por host)
+            self._http = get_http_pool().get_client(self.base_url)
             # Testa conexao
-            resp = requests.get(f"{self.base_url}/api/tags", timeout=3)
+            resp = self._http.get(f"{self.base_url}/api/tags", timeout=3)
             if resp.status_code == 200:
                 self._available = True
                 models = [m["name"] for m in resp.json().get("models", [])]
@@ -70,25 +71,11 @@ class OllamaProvider(BaseAIProvider):
             raise AIProviderError("Ollama nao esta disponivel")
 
         try:
-            # Prepara mensagens no formato Ollama
-            messages = []
-            if context:
-                messages.extend(context)
-            messages.append({"role": "user", "content": message})
-
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "stream": False,
-                "options": {
-                    "temperature": kwargs.get("temperature", 0.7),
-                    "num_predict": kwargs.get("max_tokens", 2048),
-                },
-            }
+            payload = self._payload(message, context, kwargs)
 
             log.debug(f"Enviando para Ollama: {message[:100]}...")
 
-            resp = self._requests.post(
+            resp = self._http.post(
                 f"{self.base_url}/api/chat",
                 json=payload,
                 timeout=kwargs.get("timeout", 60),
@@ -120,42 +107,84 @@ class OllamaProvider(BaseAIProvider):
             raise AIProviderError("Ollama nao esta disponivel")
 
         try:
-            messages = []
-            if context:
-                messages.extend(context)
-            messages.append({"role": "user", "content": message})
-
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "stream": True,
-                "options": {
-                    "temperature": kwargs.get("temperature", 0.7),
-                    "num_predict": kwargs.get("max_tokens", 2048),
-                },
-            }
-
-            resp = self._requests.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=kwargs.get("timeout", 120),
-                stream=True,
-            )
+            payload = self._payload(message, context, kwargs, stream=True)
+
+            with self._http.stream("POST", f"{self.base_url}/api/chat", json=payload,
+                                   timeout=kwargs.get("timeout", 120)) as resp:
+                for line in resp.iter_lines():
+                    if line:
+                        try:
+                            data = json.loads(line)
+                            content = data.get("message", {}).get("content", "")
+                            if content:
+                                yield content
+                        except json.JSONDecodeError:
+                            continue
+
+        except Exception as e:
+            log.error(f"Erro streaming Ollama: {e}")
+            raise AIProviderError(f"Erro no streaming Ollama: {str(e)}")
 
-            for line in resp.iter_lines():
-                if line:
-                    try:
-                        data = json.loads(line)
-                        content = data.get("message", {}).get("content", "")
-                        if content:
-                            yield content
-                    except json.JSONDecodeError:
-                        continue
+    async def achat(self, message: str, context: Optional[List[Dict]] = None, **kwargs) -> str:
+        """Versao async do chat (AsyncClient do pool, cancelavel)."""
+        if not self._available:
+            raise AIProviderError("Ollama nao esta disponivel")
+
+        try:
+            client = get_http_pool().get_async_client(self.base_url)
+            resp = await client.post(f"{self.base_url}/api/chat",
+                                     json=self._payload(message, context, kwargs),
+                                     timeout=kwargs.get("timeout", 60))
+            if resp.status_code != 200:
+                raise AIProviderError(f"Ollama erro HTTP {resp.status_code}: {resp.text[:200]}")
+            response = resp.json().get("message", {}).get("content", "")
+            log.info(f"Resposta Ollama ({len(response)} chars)")
+            return response
+
+        except AIProviderError:
+            raise
+        except Exception as e:
+            log.error(f"Erro no Ollama: {e}")
+            raise AIProviderError(f"Erro ao processar com Ollama: {str(e)}")
+
+    async def achat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
+        """Versao async do chat_stream."""
+        if not self._available:
+            raise AIProviderError("Ollama nao esta disponivel")
+
+        try:
+            client = get_http_pool().get_async_client(self.base_url)
+            async with client.stream("POST", f"{self.base_url}/api/chat",
+                                     json=self._payload(message, context, kwargs, stream=True),
+                                     timeout=kwargs.get("timeout", 120)) as resp:
+                async for line in resp.aiter_lines():
+                    if line:
+                        try:
+                            content = json.loads(line).get("message", {}).get("content", "")
+                            if content:
+                                yield content
+                        except json.JSONDecodeError:
+                            continue
 
         except Exception as e:
             log.error(f"Erro streaming Ollama: {e}")
             raise AIProviderError(f"Erro no streaming Ollama: {str(e)}")
 
+    def _payload(self, message: str, context: Optional[List[Dict]], kwargs: Dict,
+                 stream: bool = False) -> Dict:
+        """Mensagens no formato Ollama."""
+        messages = list(context or [])
+        messages.append({"role": "user", "content": message})
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "options": {
+                "temperature": kwargs.get("temperature", 0.7),
+                "num_predict": kwargs.get("max_tokens", 2048),
+            },
+        }
+
     def get_model_info(self) -> Dict[str, Any]:
         """Retorna informacoes sobre o modelo Ollama."""
         info = super().get_model_info()
@@ -172,7 +201,7 @@ class OllamaProvider(BaseAIProvider):
         if not self._available:
             return []
         try:
-            resp = self._requests.get(f"{self.base_url}/api/tags", timeout=5)
+            resp = self._http.get(f"{self.base_url}/api/tags", timeout=5)
             if resp.status_code == 200:
                 return [m["name"] for m in resp.json().get("models", [])]
         except Exception:
@@ -7,11 +7,15 @@ Item 24 do plano arquitetural - Multi-provider fallback.
 from typing import Optional, Dict, List, Any
 
 from .base_provider import BaseAIProvider
+from ..core.http_pool import get_http_pool
 from ..utils.exceptions import AIProviderError, RateLimitError, TokenLimitError
 from ..utils.logger import get_logger
 
 log = get_logger(__name__)
 
+# Cliente HTTP keep-alive compartilhado (src/core/http_pool.py)
+API_ORIGIN = "https://api.openai.com"
+
 
 class OpenAIProvider(BaseAIProvider):
     """Provider para API da OpenAI."""
@@ -27,10 +31,12 @@ class OpenAIProvider(BaseAIProvider):
         """
         super().__init__(api_key, model, **kwargs)
         self.client = None
+        self._async_client = None  # (http_client, cliente SDK) do event loop atual
 
         try:
             from openai import OpenAI
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key,
+                                 http_client=get_http_pool().get_client(API_ORIGIN))
             log.info(f"OpenAIProvider inicializado com modelo: {model}")
         except ImportError:
             log.warning("Pacote 'openai' nao instalado. Instale com: pip install openai")
@@ -61,35 +67,16 @@ class OpenAIProvider(BaseAIProvider):
             raise AIProviderError("OpenAI client nao inicializado")
 
         try:
-            messages = []
-            if context:
-                messages.extend(context)
-            messages.append({"role": "user", "content": message})
-
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": kwargs.get("temperature", 0.7),
-                "max_tokens": kwargs.get("max_tokens", 2048),
-            }
-
             log.debug(f"Enviando para OpenAI: {message[:100]}...")
 
-            completion = self.client.chat.completions.create(**params)
+            completion = self.client.chat.completions.create(**self._params(message, context, kwargs))
             response = completion.choices[0].message.content
 
             log.info(f"Resposta OpenAI ({len(response)} chars)")
             return response
 
         except Exception as e:
-            error_str = str(e).lower()
-            if "rate_limit" in error_str:
-                raise RateLimitError("Limite de requisicoes OpenAI excedido")
-            elif "token" in error_str and "limit" in error_str:
-                raise TokenLimitError("Limite de tokens OpenAI excedido")
-            else:
-                log.error(f"Erro OpenAI: {e}")
-                raise AIProviderError(f"Erro ao processar com OpenAI: {str(e)}")
+            raise self._translate_error(e)
 
     def chat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
         """
@@ -102,20 +89,8 @@ class OpenAIProvider(BaseAIProvider):
             raise AIProviderError("OpenAI client nao inicializado")
 
         try:
-            messages = []
-            if context:
-                messages.extend(context)
-            messages.append({"role": "user", "content": message})
-
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": kwargs.get("temperature", 0.7),
-                "max_tokens": kwargs.get("max_tokens", 2048),
-                "stream": True,
-            }
-
-            stream = self.client.chat.completions.create(**params)
+            stream = self.client.chat.completions.create(
+                **self._params(message, context, kwargs, stream=True))
 
             for chunk in stream:
                 if chunk.choices[0].delta.content:
@@ -125,6 +100,67 @@ class OpenAIProvider(BaseAIProvider):
             log.error(f"Erro streaming OpenAI: {e}")
             raise AIProviderError(f"Erro no streaming OpenAI: {str(e)}")
 
+    @property
+    def async_client(self):
+        # O AsyncClient do pool e um por event loop: SDK recriado quando o loop muda
+        http_client = get_http_pool().get_async_client(API_ORIGIN)
+        if self._async_client is None or self._async_client[0] is not http_client:
+            from openai import AsyncOpenAI
+            self._async_client = (http_client, AsyncOpenAI(api_key=self.api_key, http_client=http_client))
+        return self._async_client[1]
+
+    async def achat(self, message: str, context: Optional[List[Dict]] = None, **kwargs) -> str:
+        """Versao async do chat (AsyncOpenAI, cancelavel)."""
+        if not self.client:
+            raise AIProviderError("OpenAI client nao inicializado")
+        try:
+            completion = await self.async_client.chat.completions.create(
+                **self._params(message, context, kwargs))
+            response = completion.choices[0].message.content
+            log.info(f"Resposta OpenAI ({len(response)} chars)")
+            return response
+        except Exception as e:
+            raise self._translate_error(e)
+
+    async def achat_stream(self, message: str, context: Optional[List[Dict]] = None, **kwargs):
+        """Versao async do chat_stream."""
+        if not self.client:
+            raise AIProviderError("OpenAI client nao inicializado")
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **self._params(message, context, kwargs, stream=True))
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            log.error(f"Erro streaming OpenAI: {e}")
+            raise AIProviderError(f"Erro no streaming OpenAI: {str(e)}")
+
+    def _params(self, message: str, context: Optional[List[Dict]], kwargs: Dict,
+                stream: bool = False) -> Dict:
+        """Parametros da requisicao (contexto + mensagem atual)."""
+        messages = list(context or [])
+        messages.append({"role": "user", "content": message})
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 2048),
+        }
+        if stream:
+            params["stream"] = True
+        return params
+
+    def _translate_error(self, e: Exception) -> Exception:
+        """Converte erro do SDK para as excecoes do projeto."""
+        error_str = str(e).lower()
+        if "rate_limit" in error_str:
+            return RateLimitError("Limite de requisicoes OpenAI excedido")
+        elif "token" in error_str and "limit" in error_str:
+            return TokenLimitError("Limite de tokens OpenAI excedido")
+        log.error(f"Erro OpenAI: {e}")
+        return AIProviderError(f"Erro ao processar com OpenAI: {str(e)}")
+
     def get_model_info(self) -> Dict[str, Any]:
         """Retorna informacoes sobre o modelo OpenAI."""
         info = super().get_model_info()
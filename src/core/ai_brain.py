@@ -12,6 +12,8 @@ import subprocess
 import time
 from pathlib import Path
 from typing import Dict, Optional, List
+from config.settings import settings
+from src.core.context_window import MESSAGE_OVERHEAD, fit_messages, get_token_counter
 from src.utils.logger import get_logger
 
 log = get_logger(__name__)
@@ -119,8 +121,12 @@ class AIBrain:
         try:
             brain_context = [{"role": "system", "content": BRAIN_SYSTEM_PROMPT}]
             if context:
-                for c in context[-6:]:
-                    brain_context.append(c)
+                # Historico mais recente que cabe no orcamento junto com prompt + pedido
+                counter = get_token_counter(getattr(self.engine, "default_provider", None))
+                budget = (settings.MAX_CONTEXT_LENGTH - counter.count_message(brain_context[0])
+                          - counter.count(message) - MESSAGE_OVERHEAD)
+                brain_context.extend(fit_messages(
+                    [c for c in context if isinstance(c, dict)], budget, counter))
 
             response = self.engine.chat(
                 message=f"Pedido do usuario: {message}",
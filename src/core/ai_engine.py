@@ -2,12 +2,25 @@
 Motor de IA principal do Assistente William.
 Gerencia provedores de IA e processa requisições.
 v4: Multi-provider com fallback automatico (Item 24).
+
+Respostas deterministicas (temperature baixa ou cache=True) passam pelo
+cache de respostas em dois niveis (src/core/response_cache.py).
+Com semantic_cache (opt-in), parafrases do mesmo tipo de tarefa tambem
+reaproveitam respostas (src/core/semantic_cache.py).
+Com hedging (PROVIDER_HEDGING ou hedge=True), um provider lento alem do
+seu p95 dispara o proximo em paralelo; vale a primeira resposta.
 """
 
+import asyncio
+import threading
 import time
+from collections import deque
 from typing import Optional, List, Dict, Any
 from config.settings import settings
 from src.ai_providers.groq_provider import GroqProvider
+from src.core.http_pool import get_http_pool
+from src.core.response_cache import DEFAULT_TEMPERATURE, get_response_cache, make_key
+from src.core.semantic_cache import get_semantic_cache
 from src.utils.exceptions import AIProviderError, ConfigurationError
 from src.utils.logger import get_logger
 
@@ -16,6 +29,13 @@ log = get_logger(__name__)
 # Cooldown de providers com rate limit (segundos)
 _RATE_LIMIT_COOLDOWN = 60
 
+# Latencias recentes por provider (base do p95 do hedging)
+_LATENCY_WINDOW = 50
+_HEDGE_MIN_SAMPLES = 5
+
+# Protege a criacao do event loop dedicado
+_loop_lock = threading.Lock()
+
 # Router importado de forma lazy para evitar circular imports
 _router = None
 
@@ -49,6 +69,9 @@ class AIEngine:
                                        ['groq', 'openai', 'anthropic', 'ollama'])
         self._provider_errors: Dict[str, Dict] = {}  # Rastreia erros por provider
         self._rate_limited_until: Dict[str, float] = {}  # Provider → timestamp de liberacao
+        self._latencies: Dict[str, deque] = {}  # Provider → ultimas latencias (s)
+        self._hedge_stats = {"hedged": 0, "hedge_wins": 0, "cancelled": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Loop dos clientes async
         self._initialize_providers()
 
     def _initialize_providers(self):
@@ -162,6 +185,69 @@ class AIEngine:
 
         return self.providers[name]
 
+    # ---------------------------------------------------------------
+    # Cache de respostas
+    # ---------------------------------------------------------------
+
+    def _cache_ttl(self, kwargs: Dict, stream: bool) -> Optional[float]:
+        """
+        Tira as opcoes de cache dos kwargs e decide se a chamada e cacheavel.
+
+        kwargs aceitos: cache (True forca, False ignora o cache) e cache_ttl.
+        Sem opcao explicita, so temperature <= RESPONSE_CACHE_MAX_TEMPERATURE
+        e cacheada (respostas com amostragem alta nao se repetem).
+
+        Returns:
+            TTL em segundos ou None (bypass)
+        """
+        cache = kwargs.pop("cache", None)
+        ttl = kwargs.pop("cache_ttl", None)
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+        temperature = kwargs.get("temperature", DEFAULT_TEMPERATURE)
+        if stream or cache is False or (
+                cache is not True and temperature > settings.RESPONSE_CACHE_MAX_TEMPERATURE):
+            get_response_cache().record_bypass()
+            return None
+        return ttl or settings.RESPONSE_CACHE_TTL
+
+    def _cache_key(self, provider_name: str, message: str,
+                   context: Optional[List[Dict]], kwargs: Dict) -> str:
+        return make_key(
+            provider_name,
+            getattr(self.providers[provider_name], "model", ""),
+            message, context,
+            kwargs.get("temperature", DEFAULT_TEMPERATURE),
+            kwargs.get("max_tokens"),
+        )
+
+    def _semantic_type(self, message: str, context: Optional[List[Dict]],
+                       kwargs: Dict, stream: bool) -> Optional[str]:
+        """
+        Tira semantic_cache dos kwargs e decide se o cache semantico se aplica.
+
+        So prompts avulsos (sem turnos anteriores de user/assistant no
+        contexto): numa conversa a mesma pergunta depende do historico.
+        cache=False desliga os dois caches; temperature acima de
+        SEMANTIC_CACHE_MAX_TEMPERATURE nunca recebe resposta de parafrase.
+        Chamar antes de _cache_ttl (que tira a opcao cache dos kwargs).
+
+        Returns:
+            Tipo da tarefa (IntelligenceRouter.classify) ou None (bypass)
+        """
+        enabled = kwargs.pop("semantic_cache", None)
+        if enabled is None:
+            enabled = settings.SEMANTIC_CACHE_ENABLED
+        if not enabled or stream or not message or kwargs.get("cache") is False:
+            return None
+        if kwargs.get("temperature", DEFAULT_TEMPERATURE) > settings.SEMANTIC_CACHE_MAX_TEMPERATURE:
+            return None
+        if any(isinstance(m, dict) and m.get("role") in ("user", "assistant")
+               for m in (context or [])):
+            return None
+        router = _get_router()
+        return router.classify(message) if router else "general"
+
     def chat(
         self,
         message: str,
@@ -178,7 +264,7 @@ class AIEngine:
             provider: Provider a usar (opcional, usa padrão)
             context: Histórico de conversação
             stream: Se True, retorna generator para streaming
-            **kwargs: Parâmetros adicionais (temperature, max_tokens, etc)
+            **kwargs: Parâmetros adicionais (temperature, max_tokens, cache, cache_ttl, etc)
 
         Returns:
             Resposta da IA (string ou generator se stream=True)
@@ -188,13 +274,29 @@ class AIEngine:
         """
         try:
             provider_instance = self.get_provider(provider)
+            name = provider or self.default_provider
+
+            ttl = self._cache_ttl(kwargs, stream)
+            kwargs.pop("semantic_cache", None)  # So no chat_with_fallback
+            kwargs.pop("hedge", None)
+            if ttl:
+                key = self._cache_key(name, message, context, kwargs)
+                cached = get_response_cache().get(key)
+                if cached is not None:
+                    log.info(f"Resposta do cache ({name})")
+                    return cached
 
-            log.info(f"Processando mensagem com {provider or self.default_provider}")
+            log.info(f"Processando mensagem com {name}")
 
             if stream:
                 return provider_instance.chat_stream(message, context, **kwargs)
-            else:
-                return provider_instance.chat(message, context, **kwargs)
+
+            start = time.time()
+            response = provider_instance.chat(message, context, **kwargs)
+            if ttl:
+                get_response_cache().put(key, response, ttl, name,
+                                         provider_instance.model, time.time() - start)
+            return response
 
         except Exception as e:
             log.error(f"Erro ao processar mensagem: {e}")
@@ -217,7 +319,81 @@ class AIEngine:
             message: Mensagem do usuario
             context: Historico de conversacao
             stream: Se True, retorna generator (nao suportado em fallback)
-            **kwargs: Parametros adicionais
+            **kwargs: Parametros adicionais (temperature, max_tokens, cache, cache_ttl,
+                      semantic_cache, hedge)
+
+        Returns:
+            Resposta da IA
+
+        Raises:
+            AIProviderError: Se TODOS os providers falharem
+        """
+        hedge = kwargs.pop("hedge", None)
+        order, ttl, task_type, keys, cached = self._prepare_fallback(message, context, stream, kwargs)
+        if cached is not None:
+            return cached
+
+        if self._hedging_enabled(hedge, order) and not stream:
+            # Hedging: corrida async no loop dedicado do engine
+            provider_name, response, elapsed = self._run_async(
+                self._race(order, message, context, kwargs, hedge=True))
+            self._store_response(provider_name, response, elapsed, message, context,
+                                 ttl, keys, task_type)
+            return response
+
+        errors = []
+        for provider_name in order:
+            # Pula providers em cooldown de rate limit
+            if self._is_rate_limited(provider_name):
+                log.info(f"Pulando {provider_name} (rate limited), tentando proximo...")
+                errors.append(f"{provider_name}: rate limited (em cooldown)")
+                continue
+
+            start = time.time()
+            try:
+                provider_instance = self.providers[provider_name]
+                log.info(f"Tentando provider: {provider_name}")
+
+                if stream:
+                    response = provider_instance.chat_stream(message, context, **kwargs)
+                else:
+                    response = provider_instance.chat(message, context, **kwargs)
+                elapsed = time.time() - start
+
+                self._record_success(provider_name, elapsed, fallback=provider_name != order[0])
+                if not stream:
+                    self._store_response(provider_name, response, elapsed, message, context,
+                                         ttl, keys, task_type)
+                return response
+
+            except Exception as e:
+                errors.append(self._record_failure(provider_name, e))
+                continue
+
+        # Todos falharam
+        all_errors = "; ".join(errors)
+        raise AIProviderError(
+            f"Todos os providers falharam: {all_errors}"
+        )
+
+    async def achat_with_fallback(
+        self,
+        message: str,
+        context: Optional[List[Dict]] = None,
+        **kwargs
+    ) -> str:
+        """
+        Versao async do chat_with_fallback (providers via achat).
+
+        Com hedging (hedge=True ou PROVIDER_HEDGING), se o provider atual
+        nao responde ate o p95 da sua latencia, o proximo e disparado em
+        paralelo; vale a primeira resposta e o perdedor e cancelado.
+        Sem hedging, tenta um provider por vez.
+
+        Args:
+            message: Mensagem do usuario
+            context: Historico de conversacao
+            **kwargs: Mesmos de chat_with_fallback
 
         Returns:
             Resposta da IA
@@ -225,7 +401,22 @@ class AIEngine:
         Raises:
             AIProviderError: Se TODOS os providers falharem
         """
-        # Constroi ordem de tentativa (com roteamento inteligente se disponivel)
+        hedge = kwargs.pop("hedge", None)
+        order, ttl, task_type, keys, cached = self._prepare_fallback(message, context, False, kwargs)
+        if cached is not None:
+            return cached
+        provider_name, response, elapsed = await self._race(
+            order, message, context, kwargs, hedge=self._hedging_enabled(hedge, order))
+        self._store_response(provider_name, response, elapsed, message, context,
+                             ttl, keys, task_type)
+        return response
+
+    # ---------------------------------------------------------------
+    # Fallback: ordem, cache e registro de sucesso/falha
+    # ---------------------------------------------------------------
+
+    def _provider_order(self, message: str) -> List[str]:
+        """Ordem de tentativa (com roteamento inteligente se disponivel)."""
         order = []
         router = _get_router()
 
@@ -256,94 +447,213 @@ class AIEngine:
         for name in self.providers:
             if name not in order:
                 order.append(name)
+        return order
 
-        errors = []
-        for provider_name in order:
-            # Pula providers em cooldown de rate limit
-            if self._is_rate_limited(provider_name):
-                log.info(f"Pulando {provider_name} (rate limited), tentando proximo...")
-                errors.append(f"{provider_name}: rate limited (em cooldown)")
-                continue
-
-            try:
-                provider_instance = self.providers[provider_name]
-                log.info(f"Tentando provider: {provider_name}")
-
-                start = time.time()
-                if stream:
-                    response = provider_instance.chat_stream(message, context, **kwargs)
-                else:
-                    response = provider_instance.chat(message, context, **kwargs)
-                elapsed = time.time() - start
-
-                # Sucesso - limpa erros e cooldown
-                self._provider_errors.pop(provider_name, None)
-                self._rate_limited_until.pop(provider_name, None)
-                log.info(f"Provider {provider_name} respondeu em {elapsed:.2f}s")
-
-                # Log no observability
-                try:
-                    from src.core.observability import get_event_log
-                    get_event_log().log_event(
-                        "provider_success",
-                        agent="ai_engine",
-                        data={
-                            "provider": provider_name,
-                            "elapsed": round(elapsed, 2),
-                            "fallback": provider_name != order[0],
-                        }
-                    )
-                except Exception:
-                    pass
+    def _prepare_fallback(self, message: str, context: Optional[List[Dict]],
+                          stream: bool, kwargs: Dict) -> tuple:
+        """
+        Ordem dos providers + consulta aos caches.
 
-                return response
+        Returns:
+            (order, ttl, task_type, keys, resposta cacheada ou None)
+        """
+        task_type = self._semantic_type(message, context, kwargs, stream)
+        ttl = self._cache_ttl(kwargs, stream)
+        order = self._provider_order(message)
+
+        # Cache: vale a resposta de qualquer provider, na ordem de preferencia
+        keys = {}
+        if ttl:
+            keys = {name: self._cache_key(name, message, context, kwargs) for name in order}
+            cached = get_response_cache().get_any(list(keys.values()))
+            if cached is not None:
+                log.info("Resposta do cache")
+                return order, ttl, task_type, keys, cached
+
+        if task_type:
+            cached = get_semantic_cache().get(message, task_type, context)
+            if cached is not None:
+                log.info(f"Resposta do cache semantico ({task_type})")
+                return order, ttl, task_type, keys, cached
+
+        return order, ttl, task_type, keys, None
+
+    def _store_response(self, provider_name: str, response: str, elapsed: float,
+                        message: str, context: Optional[List[Dict]], ttl: Optional[float],
+                        keys: Dict, task_type: Optional[str]):
+        """Guarda a resposta nos caches aplicaveis."""
+        if ttl:
+            get_response_cache().put(keys[provider_name], response, ttl, provider_name,
+                                     self.providers[provider_name].model, elapsed)
+        if task_type:
+            get_semantic_cache().put(message, response, task_type, context)
+
+    def _record_latency(self, provider_name: str, elapsed: float):
+        self._latencies.setdefault(provider_name, deque(maxlen=_LATENCY_WINDOW)).append(elapsed)
+
+    def _record_success(self, provider_name: str, elapsed: float, fallback: bool):
+        """Limpa erros/cooldown, guarda a latencia e registra no observability."""
+        self._provider_errors.pop(provider_name, None)
+        self._rate_limited_until.pop(provider_name, None)
+        self._record_latency(provider_name, elapsed)
+        log.info(f"Provider {provider_name} respondeu em {elapsed:.2f}s")
+
+        # Log no observability
+        try:
+            from src.core.observability import get_event_log
+            get_event_log().log_event(
+                "provider_success",
+                agent="ai_engine",
+                data={
+                    "provider": provider_name,
+                    "elapsed": round(elapsed, 2),
+                    "fallback": fallback,
+                }
+            )
+        except Exception:
+            pass
+
+    def _record_failure(self, provider_name: str, e: Exception) -> str:
+        """Registra a falha (cooldown se rate limit). Retorna a mensagem de erro."""
+        error_str = str(e).lower()
+        error_msg = f"{provider_name}: {str(e)[:200]}"
+        log.warning(f"Provider {provider_name} falhou: {e}")
+
+        # Detecta 429 / rate limit — coloca em cooldown
+        is_rate_limit = any(x in error_str for x in [
+            "429", "rate_limit", "rate limit", "too many requests",
+            "quota", "ratelimit", "tokens per minute", "requests per minute"
+        ])
+        if is_rate_limit:
+            self._mark_rate_limited(provider_name, cooldown=_RATE_LIMIT_COOLDOWN)
+            log.warning(f"429 detectado em {provider_name} — rotacionando para proximo provider")
+
+        # Registra erro
+        self._provider_errors[provider_name] = {
+            "error": str(e)[:200],
+            "timestamp": time.time(),
+            "rate_limited": is_rate_limit,
+        }
 
-            except Exception as e:
-                elapsed = time.time() - start if 'start' in locals() else 0
-                error_str = str(e).lower()
-                error_msg = f"{provider_name}: {str(e)[:200]}"
-                errors.append(error_msg)
-                log.warning(f"Provider {provider_name} falhou: {e}")
-
-                # Detecta 429 / rate limit — coloca em cooldown
-                is_rate_limit = any(x in error_str for x in [
-                    "429", "rate_limit", "rate limit", "too many requests",
-                    "quota", "ratelimit", "tokens per minute", "requests per minute"
-                ])
-                if is_rate_limit:
-                    self._mark_rate_limited(provider_name, cooldown=_RATE_LIMIT_COOLDOWN)
-                    log.warning(f"429 detectado em {provider_name} — rotacionando para proximo provider")
-
-                # Registra erro
-                self._provider_errors[provider_name] = {
+        # Log no observability
+        try:
+            from src.core.observability import get_event_log
+            get_event_log().log_event(
+                "provider_failed",
+                agent="ai_engine",
+                data={
+                    "provider": provider_name,
                     "error": str(e)[:200],
-                    "timestamp": time.time(),
                     "rate_limited": is_rate_limit,
-                }
+                },
+                risk_level="yellow",
+            )
+        except Exception:
+            pass
+        return error_msg
+
+    # ---------------------------------------------------------------
+    # Hedging (requisicoes async em paralelo)
+    # ---------------------------------------------------------------
+
+    def _hedging_enabled(self, hedge: Optional[bool], order: List[str]) -> bool:
+        if hedge is None:
+            hedge = settings.PROVIDER_HEDGING
+        return bool(hedge) and len(order) > 1
+
+    def _hedge_delay(self, provider_name: str) -> float:
+        """Prazo antes de disparar o proximo provider: p95 da latencia recente."""
+        samples = self._latencies.get(provider_name)
+        if not samples or len(samples) < _HEDGE_MIN_SAMPLES:
+            return settings.HEDGE_DEFAULT_DELAY
+        ordered = sorted(samples)
+        p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        return min(max(p95, settings.HEDGE_MIN_DELAY), settings.HEDGE_MAX_DELAY)
+
+    async def _race(self, order: List[str], message: str, context: Optional[List[Dict]],
+                    kwargs: Dict, hedge: bool) -> tuple:
+        """
+        Executa os providers via achat. Falha -> proximo; com hedge, prazo
+        vencido -> proximo em paralelo (ate HEDGE_MAX_INFLIGHT). A primeira
+        resposta vence e as outras tasks sao canceladas. O tempo ate o
+        cancelamento entra como amostra de latencia do perdedor (censurada:
+        a real e maior), senao o p95 so veria os providers que ganham.
 
-                # Log no observability
-                try:
-                    from src.core.observability import get_event_log
-                    get_event_log().log_event(
-                        "provider_failed",
-                        agent="ai_engine",
-                        data={
-                            "provider": provider_name,
-                            "error": str(e)[:200],
-                            "rate_limited": is_rate_limit,
-                        },
-                        risk_level="yellow",
-                    )
-                except Exception:
-                    pass
+        Returns:
+            (provider, resposta, elapsed)
+        """
+        errors = []
+        candidates = []
+        for name in order:
+            if self._is_rate_limited(name):
+                errors.append(f"{name}: rate limited (em cooldown)")
+            else:
+                candidates.append(name)
+
+        tasks: Dict[asyncio.Task, str] = {}
+        started: Dict[asyncio.Task, float] = {}
+        first = candidates[0] if candidates else None
+        last_launched = None
+
+        async def call(name: str) -> tuple:
+            start = time.time()
+            response = await self.providers[name].achat(message, context, **kwargs)
+            return name, response, time.time() - start
+
+        def launch():
+            nonlocal last_launched
+            last_launched = candidates.pop(0)
+            log.info(f"Tentando provider: {last_launched}")
+            task = asyncio.ensure_future(call(last_launched))
+            tasks[task] = last_launched
+            started[task] = time.time()
 
-                continue
+        try:
+            while candidates or tasks:
+                if not tasks:
+                    launch()
+                timeout = None
+                if hedge and candidates and len(tasks) < settings.HEDGE_MAX_INFLIGHT:
+                    timeout = self._hedge_delay(last_launched)
+                done, _ = await asyncio.wait(list(tasks), timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    log.info(f"Hedge: {last_launched} passou de {timeout:.2f}s, "
+                             f"disparando {candidates[0]}")
+                    self._hedge_stats["hedged"] += 1
+                    launch()
+                    continue
+                for task in done:
+                    name = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        errors.append(self._record_failure(name, e))
+                        continue
+                    if tasks:
+                        self._hedge_stats["cancelled"] += len(tasks)
+                        now = time.time()
+                        for loser, loser_name in tasks.items():
+                            self._record_latency(loser_name, now - started[loser])
+                    if hedge and name != first:
+                        self._hedge_stats["hedge_wins"] += 1
+                    self._record_success(name, result[2], fallback=name != order[0])
+                    return result
+        finally:
+            for task in tasks:
+                task.cancel()
 
         # Todos falharam
-        all_errors = "; ".join(errors)
-        raise AIProviderError(
-            f"Todos os providers falharam: {all_errors}"
-        )
+        raise AIProviderError(f"Todos os providers falharam: {'; '.join(errors)}")
+
+    def _run_async(self, coro):
+        """Executa a corrotina no loop dedicado do engine e espera o resultado."""
+        with _loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True,
+                                 name="ai-engine-loop").start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
 
     def get_available_providers(self) -> List[str]:
         """Retorna lista de providers disponiveis."""
@@ -382,6 +692,16 @@ class AIEngine:
             "provider_errors": {
                 k: v.get("error", "") for k, v in self._provider_errors.items()
             },
+            "response_cache": (get_response_cache().get_stats()
+                               if settings.RESPONSE_CACHE_ENABLED else None),
+            "semantic_cache": (get_semantic_cache().get_stats()
+                               if settings.SEMANTIC_CACHE_ENABLED else None),
+            "http_pool": get_http_pool().get_stats(),
+            "hedging": {
+                "enabled": settings.PROVIDER_HEDGING,
+                **self._hedge_stats,
+                "delays": {name: round(self._hedge_delay(name), 2) for name in self.providers},
+            },
             "status": "operational" if self.providers else "no_providers"
         }
 
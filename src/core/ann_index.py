@@ -0,0 +1,596 @@
+"""
+ANN Index - Indices de vizinhos mais proximos para o SemanticSearch.
+
+Backends (mesma interface VectorIndex):
+    flat     busca exata: produto matriz-vetor no corpus inteiro
+    ivf      IVF-flat em NumPy puro: k-means em listas invertidas,
+             busca so nas `nprobe` listas mais proximas da query
+    hnsw     grafo HNSW via hnswlib (opcional, se instalado)
+
+O knob recall/latencia e `effort`: nprobe no IVF, ef no HNSW. Mais esforco
+= mais candidatos visitados = recall maior e busca mais lenta.
+Indices ANN persistem em data/cache/ann/<backend>/.
+"""
+
+import json
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # Indices so sao usados quando embeddings estao ativos
+    np = None
+
+try:
+    import hnswlib
+    _hnswlib_available = True
+except ImportError:
+    hnswlib = None
+    _hnswlib_available = False
+
+ANN_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "ann"
+
+# IVF: treina quando atinge esse tamanho; re-treina quando cresce 4x
+IVF_TRAIN_MIN = 4096
+IVF_RETRAIN_GROWTH = 4
+IVF_KMEANS_ITERS = 10
+IVF_TRAIN_SAMPLE = 65536
+IVF_DEFAULT_NPROBE = 16
+
+# HNSW: parametros de construcao e ef padrao de busca
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_DEFAULT_EF = 64
+
+
+class EmbeddingMatrix:
+    """
+    Embeddings dos documentos em uma matriz float32 contigua, normalizada.
+    Similaridade coseno de todos os documentos = um produto matriz-vetor.
+    Remocao troca a ultima linha para o buraco (O(dim)).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self._capacity = capacity
+        self._mat = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_batch(self, doc_ids: List[str], vectors: "np.ndarray"):
+        """Adiciona (ou substitui) vetores ja normalizados."""
+        with self._lock:
+            if self._mat is None:
+                self._mat = np.zeros((max(self._capacity, len(doc_ids)), vectors.shape[1]),
+                                     dtype=np.float32)
+            for doc_id, vec in zip(doc_ids, vectors):
+                row = self.row_of.get(doc_id)
+                if row is None:
+                    row = len(self.ids)
+                    if row >= self._mat.shape[0]:
+                        grown = np.zeros((self._mat.shape[0] * 2, self._mat.shape[1]),
+                                         dtype=np.float32)
+                        grown[:row] = self._mat[:row]
+                        self._mat = grown
+                    self.ids.append(doc_id)
+                    self.row_of[doc_id] = row
+                self._mat[row] = vec
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            row = self.row_of.pop(doc_id, None)
+            if row is None:
+                return False
+            last = len(self.ids) - 1
+            if row != last:
+                moved = self.ids[last]
+                self._mat[row] = self._mat[last]
+                self.ids[row] = moved
+                self.row_of[moved] = row
+            self.ids.pop()
+            return True
+
+    def similarities(self, query_vec: "np.ndarray") -> "np.ndarray":
+        """Coseno de todos os documentos com a query (vetores normalizados)."""
+        with self._lock:
+            if not self.ids:
+                return np.zeros(0, dtype=np.float32)
+            return self._mat[:len(self.ids)] @ query_vec
+
+    def vectors(self) -> "np.ndarray":
+        """Copia das linhas ocupadas (na ordem de self.ids)."""
+        with self._lock:
+            if not self.ids:
+                return np.zeros((0, 0), dtype=np.float32)
+            return self._mat[:len(self.ids)].copy()
+
+    def get(self, doc_id: str) -> Optional["np.ndarray"]:
+        row = self.row_of.get(doc_id)
+        return self._mat[row] if row is not None else None
+
+
+def _top_k(ids: List[str], sims: "np.ndarray", k: int) -> List[Tuple[str, float]]:
+    """Os k maiores (id, similaridade), ordenados."""
+    if k <= 0 or len(sims) == 0:
+        return []
+    if k < len(sims):
+        top = np.argpartition(-sims, k - 1)[:k]
+    else:
+        top = np.arange(len(sims))
+    top = top[np.argsort(-sims[top])]
+    return [(ids[i], float(sims[i])) for i in top]
+
+
+class VectorIndex(ABC):
+    """
+    Interface comum dos indices de vetores (normalizados, coseno).
+
+    `keys` guarda um hash do conteudo de cada documento: permite ao
+    SemanticSearch pular o re-embedding de documentos que ja estao em um
+    indice carregado do disco.
+    """
+
+    backend = "base"
+
+    def __init__(self, effort: int = None):
+        self.effort = effort
+        self.dim: Optional[int] = None
+        self.keys: Dict[str, int] = {}
+        self.changes = 0   # alteracoes desde o ultimo save()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.keys
+
+    @abstractmethod
+    def add(self, doc_ids: List[str], vectors: "np.ndarray", keys: List[int] = None):
+        pass
+
+    @abstractmethod
+    def remove(self, doc_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def search(self, query_vec: "np.ndarray", k: int,
+               effort: int = None) -> List[Tuple[str, float]]:
+        """Os k documentos mais similares: [(doc_id, coseno)]."""
+        pass
+
+    @abstractmethod
+    def get_vectors(self, doc_ids: List[str]) -> Dict[str, "np.ndarray"]:
+        """Vetores armazenados dos documentos pedidos (os que existem)."""
+        pass
+
+    @abstractmethod
+    def items(self) -> Tuple[List[str], "np.ndarray"]:
+        """Todos os (ids, vetores) - usado para migrar entre backends."""
+        pass
+
+    @abstractmethod
+    def save(self, directory: str = None):
+        pass
+
+    def _set_keys(self, doc_ids: List[str], keys: Optional[List[int]]):
+        for i, doc_id in enumerate(doc_ids):
+            self.keys[doc_id] = int(keys[i]) if keys is not None else 0
+        self.changes += len(doc_ids)
+
+    def get_stats(self) -> Dict:
+        return {"backend": self.backend, "size": len(self), "dim": self.dim,
+                "effort": self.effort}
+
+
+class FlatIndex(VectorIndex):
+    """Busca exata (forca bruta vetorizada). Padrao para corpus pequenos."""
+
+    backend = "flat"
+
+    def __init__(self, effort: int = None):
+        super().__init__(effort)
+        self._matrix = EmbeddingMatrix()
+
+    def add(self, doc_ids, vectors, keys=None):
+        if not doc_ids:
+            return
+        self.dim = int(vectors.shape[1])
+        self._matrix.add_batch(doc_ids, vectors)
+        self._set_keys(doc_ids, keys)
+
+    def remove(self, doc_id):
+        self.keys.pop(doc_id, None)
+        return self._matrix.remove(doc_id)
+
+    def search(self, query_vec, k, effort=None):
+        return _top_k(self._matrix.ids, self._matrix.similarities(query_vec), k)
+
+    def get_vectors(self, doc_ids):
+        found = {}
+        for doc_id in doc_ids:
+            vec = self._matrix.get(doc_id)
+            if vec is not None:
+                found[doc_id] = vec
+        return found
+
+    def items(self):
+        return list(self._matrix.ids), self._matrix.vectors()
+
+    def save(self, directory=None):
+        # Reconstruido do cache de embeddings - nada a persistir
+        self.changes = 0
+
+
+class IVFFlatIndex(VectorIndex):
+    """
+    IVF-flat em NumPy puro.
+
+    Os vetores sao particionados por k-means (coseno) em `nlist` listas;
+    cada lista e uma EmbeddingMatrix. A busca compara a query com os
+    centroides e varre so as `nprobe` listas mais proximas. Inserts vao
+    para a lista do centroide mais proximo; removes sao swap-remove na
+    lista. Antes de atingir IVF_TRAIN_MIN vetores o indice tem uma unica
+    lista (busca exata).
+    """
+
+    backend = "ivf"
+
+    def __init__(self, effort: int = None, nlist: int = None):
+        super().__init__(effort or IVF_DEFAULT_NPROBE)
+        self._nlist = nlist
+        self.centroids: Optional["np.ndarray"] = None
+        self.lists: List[EmbeddingMatrix] = [EmbeddingMatrix()]
+        self.list_of: Dict[str, int] = {}
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    @property
+    def nprobe(self) -> int:
+        return self.effort
+
+    def _assign(self, vectors: "np.ndarray") -> "np.ndarray":
+        """Lista (centroide mais proximo) de cada vetor, em blocos."""
+        if self.centroids is None:
+            return np.zeros(len(vectors), dtype=np.int64)
+        out = np.empty(len(vectors), dtype=np.int64)
+        for i in range(0, len(vectors), 8192):
+            out[i:i + 8192] = np.argmax(vectors[i:i + 8192] @ self.centroids.T, axis=1)
+        return out
+
+    def add(self, doc_ids, vectors, keys=None):
+        if not doc_ids:
+            return
+        with self._lock:
+            self.dim = int(vectors.shape[1])
+            for doc_id in doc_ids:
+                old = self.list_of.pop(doc_id, None)
+                if old is not None:
+                    self.lists[old].remove(doc_id)
+            self._insert(doc_ids, vectors)
+            self._set_keys(doc_ids, keys)
+            n = len(self.list_of)
+            if (self.centroids is None and n >= IVF_TRAIN_MIN) or \
+                    (self.centroids is not None and n >= self._trained_size * IVF_RETRAIN_GROWTH):
+                self.train()
+
+    def _insert(self, doc_ids: List[str], vectors: "np.ndarray"):
+        assign = self._assign(vectors)
+        for c in np.unique(assign).tolist():
+            rows = np.nonzero(assign == c)[0]
+            ids = [doc_ids[r] for r in rows.tolist()]
+            self.lists[c].add_batch(ids, vectors[rows])
+            for doc_id in ids:
+                self.list_of[doc_id] = c
+
+    def train(self):
+        """(Re)treina os centroides com k-means e redistribui os vetores."""
+        with self._lock:
+            doc_ids, vectors = self.items()
+            n = len(doc_ids)
+            if n == 0:
+                return
+            nlist = self._nlist or min(4096, max(16, int(4 * math.sqrt(n))))
+            nlist = min(nlist, n)
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(n, size=min(n, nlist * 32, IVF_TRAIN_SAMPLE), replace=False)]
+
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(IVF_KMEANS_ITERS):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                # Soma por cluster: ordena por cluster e reduz os blocos
+                order = np.argsort(assign, kind="stable")
+                present, starts = np.unique(assign[order], return_index=True)
+                sums = np.zeros_like(centroids)
+                sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                filled = norms[:, 0] > 0
+                # Centroide vazio mantem a posicao anterior
+                centroids[filled] = sums[filled] / norms[filled]
+
+            self.centroids = centroids.astype(np.float32)
+            self.lists = [EmbeddingMatrix(capacity=max(16, 2 * n // nlist)) for _ in range(nlist)]
+            self.list_of = {}
+            self._insert(doc_ids, vectors)
+            self._trained_size = n
+            self.changes += 1
+            log.info(f"IVFFlatIndex: treinado com {nlist} listas para {n} vetores")
+
+    def remove(self, doc_id):
+        with self._lock:
+            self.keys.pop(doc_id, None)
+            c = self.list_of.pop(doc_id, None)
+            if c is None:
+                return False
+            self.changes += 1
+            return self.lists[c].remove(doc_id)
+
+    def search(self, query_vec, k, effort=None):
+        with self._lock:
+            if not self.list_of:
+                return []
+            if self.centroids is None:
+                probe = [0]
+            else:
+                nprobe = min(effort or self.nprobe, len(self.lists))
+                csims = self.centroids @ query_vec
+                probe = np.argpartition(-csims, nprobe - 1)[:nprobe].tolist()
+            ids: List[str] = []
+            sims = []
+            for c in probe:
+                lst = self.lists[c]
+                if len(lst):
+                    ids.extend(lst.ids)
+                    sims.append(lst.similarities(query_vec))
+            if not sims:
+                return []
+            return _top_k(ids, np.concatenate(sims), k)
+
+    def get_vectors(self, doc_ids):
+        found = {}
+        with self._lock:
+            for doc_id in doc_ids:
+                c = self.list_of.get(doc_id)
+                if c is not None:
+                    found[doc_id] = self.lists[c].get(doc_id)
+        return found
+
+    def items(self):
+        with self._lock:
+            ids: List[str] = []
+            blocks = []
+            for lst in self.lists:
+                if len(lst):
+                    ids.extend(lst.ids)
+                    blocks.append(lst.vectors())
+            if not blocks:
+                return [], np.zeros((0, self.dim or 0), dtype=np.float32)
+            return ids, np.concatenate(blocks)
+
+    def save(self, directory=None):
+        """Grava centroides + vetores + ids em ivf.npz (escrita atomica)."""
+        directory = Path(directory or ANN_DIR / self.backend)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            doc_ids, vectors = self.items()
+            tmp = directory / "ivf.tmp.npz"
+            np.savez(
+                tmp,
+                centroids=self.centroids if self.centroids is not None
+                else np.zeros((0, self.dim or 0), dtype=np.float32),
+                vectors=vectors,
+                ids=np.array(doc_ids, dtype=str),
+                keys=np.array([self.keys.get(d, 0) for d in doc_ids], dtype=np.uint64),
+                meta=np.array([self.effort, self._trained_size, self._nlist or 0], dtype=np.int64),
+            )
+            os.replace(tmp, directory / "ivf.npz")
+            self.changes = 0
+
+    @classmethod
+    def load(cls, directory: str = None) -> Optional["IVFFlatIndex"]:
+        path = Path(directory or ANN_DIR / cls.backend) / "ivf.npz"
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            effort, trained_size, nlist = data["meta"].tolist()
+            index = cls(effort=effort, nlist=nlist or None)
+            vectors = data["vectors"]
+            doc_ids = data["ids"].tolist()
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+                nlist = len(index.centroids)
+                index.lists = [EmbeddingMatrix(capacity=max(16, 2 * len(doc_ids) // nlist))
+                               for _ in range(nlist)]
+            index._trained_size = trained_size
+            if doc_ids:
+                index.dim = int(vectors.shape[1])
+                index._insert(doc_ids, vectors)
+                index._set_keys(doc_ids, data["keys"].tolist())
+        index.changes = 0
+        log.info(f"IVFFlatIndex: {len(index)} vetores carregados de {path}")
+        return index
+
+
+class HnswIndex(VectorIndex):
+    """
+    HNSW via hnswlib (espaco 'ip' = coseno para vetores normalizados).
+    Ids de documento sao mapeados para labels inteiros; remove usa
+    mark_deleted e o indice cresce com resize_index.
+    """
+
+    backend = "hnsw"
+
+    def __init__(self, effort: int = None, m: int = HNSW_M,
+                 ef_construction: int = HNSW_EF_CONSTRUCTION):
+        if not _hnswlib_available:
+            raise ImportError("hnswlib nao instalado")
+        super().__init__(effort or HNSW_DEFAULT_EF)
+        self.m = m
+        self.ef_construction = ef_construction
+        self._index = None
+        self._capacity = 0
+        self.label_of: Dict[str, int] = {}
+        self.id_of: Dict[int, str] = {}
+        self._next_label = 0
+        self._lock = threading.RLock()
+
+    def _ensure(self, dim: int, needed: int):
+        if self._index is None:
+            self.dim = dim
+            self._capacity = max(1024, needed)
+            self._index = hnswlib.Index(space="ip", dim=dim)
+            self._index.init_index(max_elements=self._capacity, M=self.m,
+                                   ef_construction=self.ef_construction)
+            self._index.set_ef(self.effort)
+        elif needed > self._capacity:
+            while self._capacity < needed:
+                self._capacity *= 2
+            self._index.resize_index(self._capacity)
+
+    def add(self, doc_ids, vectors, keys=None):
+        if not doc_ids:
+            return
+        with self._lock:
+            new = sum(1 for d in doc_ids if d not in self.label_of)
+            self._ensure(int(vectors.shape[1]), self._next_label + new)
+            labels = []
+            for doc_id in doc_ids:
+                label = self.label_of.get(doc_id)
+                if label is None:
+                    label = self._next_label
+                    self._next_label += 1
+                    self.label_of[doc_id] = label
+                    self.id_of[label] = doc_id
+                else:
+                    try:
+                        self._index.unmark_deleted(label)
+                    except RuntimeError:
+                        pass
+                labels.append(label)
+            self._index.add_items(vectors, np.array(labels, dtype=np.int64))
+            self._set_keys(doc_ids, keys)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self.keys.pop(doc_id, None)
+            label = self.label_of.get(doc_id)
+            if label is None:
+                return False
+            try:
+                self._index.mark_deleted(label)
+            except RuntimeError:
+                return False
+            # O label fica reservado: um re-add do mesmo id o reaproveita
+            self.changes += 1
+            return True
+
+    def search(self, query_vec, k, effort=None):
+        with self._lock:
+            k = min(k, len(self.keys))
+            if k <= 0:
+                return []
+            ef = max(effort or self.effort, k)
+            self._index.set_ef(ef)
+            labels, dists = self._index.knn_query(query_vec, k=k)
+            if ef != self.effort:
+                self._index.set_ef(self.effort)
+        return [(self.id_of[int(l)], 1.0 - float(d))
+                for l, d in zip(labels[0], dists[0])]
+
+    def get_vectors(self, doc_ids):
+        with self._lock:
+            present = [d for d in doc_ids if d in self.keys]
+            if not present:
+                return {}
+            vecs = self._index.get_items([self.label_of[d] for d in present])
+        return {d: np.asarray(v, dtype=np.float32) for d, v in zip(present, vecs)}
+
+    def items(self):
+        doc_ids = list(self.keys)
+        vecs = self.get_vectors(doc_ids)
+        if not doc_ids:
+            return [], np.zeros((0, self.dim or 0), dtype=np.float32)
+        return doc_ids, np.stack([vecs[d] for d in doc_ids])
+
+    def save(self, directory=None):
+        """Grava o grafo (hnsw.bin) e o mapa id -> label (hnsw.json)."""
+        directory = Path(directory or ANN_DIR / self.backend)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self._index is None:
+                return
+            self._index.save_index(str(directory / "hnsw.tmp.bin"))
+            os.replace(directory / "hnsw.tmp.bin", directory / "hnsw.bin")
+            meta = {
+                "dim": self.dim, "capacity": self._capacity, "m": self.m,
+                "ef_construction": self.ef_construction, "effort": self.effort,
+                "next_label": self._next_label, "labels": self.label_of,
+                "keys": {d: str(k) for d, k in self.keys.items()},
+            }
+            tmp = directory / "hnsw.json.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, directory / "hnsw.json")
+            self.changes = 0
+
+    @classmethod
+    def load(cls, directory: str = None) -> Optional["HnswIndex"]:
+        directory = Path(directory or ANN_DIR / cls.backend)
+        if not _hnswlib_available or not (directory / "hnsw.json").exists() \
+                or not (directory / "hnsw.bin").exists():
+            return None
+        with open(directory / "hnsw.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(effort=meta["effort"], m=meta["m"], ef_construction=meta["ef_construction"])
+        index.dim = meta["dim"]
+        index._capacity = meta["capacity"]
+        index._index = hnswlib.Index(space="ip", dim=index.dim)
+        index._index.load_index(str(directory / "hnsw.bin"), max_elements=index._capacity)
+        index._index.set_ef(index.effort)
+        index._next_label = meta["next_label"]
+        index.label_of = meta["labels"]
+        index.id_of = {label: d for d, label in index.label_of.items()}
+        index.keys = {d: int(k) for d, k in meta["keys"].items()}
+        log.info(f"HnswIndex: {len(index)} vetores carregados de {directory}")
+        return index
+
+
+_BACKENDS = {"flat": FlatIndex, "ivf": IVFFlatIndex, "hnsw": HnswIndex}
+
+
+def resolve_backend(backend: str) -> str:
+    """'auto' = hnsw se hnswlib estiver instalado, senao ivf."""
+    if backend == "auto":
+        return "hnsw" if _hnswlib_available else "ivf"
+    if backend == "hnsw" and not _hnswlib_available:
+        log.warning("hnswlib nao instalado - usando IVF-flat (NumPy)")
+        return "ivf"
+    if backend not in _BACKENDS:
+        raise ValueError(f"Backend ANN desconhecido: {backend}")
+    return backend
+
+
+def create_index(backend: str = "auto", effort: int = None) -> VectorIndex:
+    """Cria indice vazio do backend pedido."""
+    return _BACKENDS[resolve_backend(backend)](effort=effort)
+
+
+def load_index(backend: str = "auto", directory: str = None) -> Optional[VectorIndex]:
+    """Carrega indice persistido (None se nao existe ou esta invalido)."""
+    cls = _BACKENDS[resolve_backend(backend)]
+    if not hasattr(cls, "load"):
+        return None
+    try:
+        return cls.load(directory)
+    except Exception as e:
+        log.warning(f"Indice ANN em disco invalido, sera reconstruido ({e})")
+        return None
@@ -0,0 +1,265 @@
+"""
+Context Window - Historico de conversa dentro de um orcamento de tokens.
+O orcamento vem de settings.MAX_CONTEXT_LENGTH; a contagem e por provider
+(tiktoken quando instalado, senao estimativa por caracteres) e cada
+mensagem e contada uma vez so (cache por conteudo).
+
+Quando o historico passa do orcamento, os turnos mais antigos saem em
+bloco (ate LOW_WATER do orcamento, para nao repetir a cada turno) e viram
+um resumo curto que vai como mensagem de sistema.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from config.settings import settings
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import tiktoken
+    _tiktoken_available = True
+except ImportError:
+    _tiktoken_available = False
+
+# Caracteres por token quando nao ha tokenizer (texto em portugues)
+CHARS_PER_TOKEN = {
+    "openai": 3.6,
+    "groq": 3.4,
+    "anthropic": 3.3,
+    "google": 3.6,
+    "ollama": 3.4,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.4
+
+# Providers cujo tokenizer e proximo do cl100k (tiktoken)
+_TIKTOKEN_PROVIDERS = ("openai", "groq")
+
+# Tokens de formatacao por mensagem (role, separadores)
+MESSAGE_OVERHEAD = 4
+
+# Apos despejar, o historico fica em ate LOW_WATER do orcamento
+LOW_WATER = 0.75
+
+# Fracao do orcamento reservada ao resumo dos turnos antigos
+SUMMARY_RATIO = 0.2
+
+SUMMARY_HEADER = "Resumo da conversa anterior:"
+
+
+class TokenCounter:
+    """Conta tokens de textos/mensagens de um provider, com cache por conteudo."""
+
+    def __init__(self, provider: str = None, cache_size: int = 8192):
+        self.provider = (provider or "").lower()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._encoding = None
+        if _tiktoken_available and self.provider in _TIKTOKEN_PROVIDERS:
+            try:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                log.debug(f"tiktoken indisponivel: {e}")
+        self._ratio = CHARS_PER_TOKEN.get(self.provider, DEFAULT_CHARS_PER_TOKEN)
+
+    @property
+    def exact(self) -> bool:
+        """True se a contagem usa tokenizer de verdade (nao estimativa)."""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """Tokens do texto (consulta o cache antes de tokenizar)."""
+        if not text:
+            return 0
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+        if self._encoding is not None:
+            tokens = len(self._encoding.encode(text, disallowed_special=()))
+        else:
+            tokens = int(len(text) / self._ratio) + 1
+        with self._lock:
+            self._cache[text] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def count_message(self, message: Dict) -> int:
+        content = message.get("content") if isinstance(message, dict) else message
+        return self.count(content if isinstance(content, str) else str(content or "")) + MESSAGE_OVERHEAD
+
+    def count_messages(self, messages: List[Dict]) -> int:
+        return sum(self.count_message(m) for m in messages)
+
+
+_counters: Dict[str, TokenCounter] = {}
+
+
+def get_token_counter(provider: str = None) -> TokenCounter:
+    """TokenCounter compartilhado por provider (cache de contagens comum)."""
+    key = (provider or "").lower()
+    counter = _counters.get(key)
+    if counter is None:
+        counter = _counters.setdefault(key, TokenCounter(key))
+    return counter
+
+
+def fit_messages(messages: List[Dict], budget: int, counter: TokenCounter) -> List[Dict]:
+    """Mensagens mais recentes que cabem no orcamento (ordem preservada)."""
+    kept, used = [], 0
+    for message in reversed(messages or []):
+        tokens = counter.count_message(message)
+        if used + tokens > budget:
+            break
+        kept.append(message)
+        used += tokens
+    kept.reverse()
+    return kept
+
+
+def extractive_summary(messages: List[Dict], previous: str = "") -> str:
+    """Resumo sem IA: primeira frase de cada turno despejado, uma linha cada."""
+    lines = [line for line in (previous or "").split("\n") if line]
+    for message in messages:
+        content = " ".join(str(message.get("content", "")).split())
+        if not content:
+            continue
+        first = content.split(". ")[0][:160]
+        who = "usuario" if message.get("role") == "user" else "assistente"
+        lines.append(f"- {who}: {first}")
+    return "\n".join(lines)
+
+
+def engine_summarizer(engine) -> Callable[[List[Dict], str], str]:
+    """Resumo pela IA (uma chamada curta por bloco despejado); cai no extrativo se falhar."""
+    def summarize(messages: List[Dict], previous: str = "") -> str:
+        transcript = "\n".join(f"{m.get('role')}: {m.get('content', '')}" for m in messages)
+        try:
+            return engine.chat(
+                message=f"Resumo atual:\n{previous or '(vazio)'}\n\nNovos turnos:\n{transcript[:6000]}",
+                context=[{"role": "system", "content":
+                          "Atualize o resumo da conversa em portugues, em topicos curtos. "
+                          "Mantenha nomes, numeros, decisoes e pedidos pendentes."}],
+                temperature=0.2, max_tokens=300,
+            ).strip()
+        except Exception as e:
+            log.debug(f"Resumo por IA falhou, usando extrativo: {e}")
+            return extractive_summary(messages, previous)
+    return summarize
+
+
+def summarizer_for(mode: str, engine=None) -> Optional[Callable[[List[Dict], str], str]]:
+    """Resumidor de settings.CONTEXT_SUMMARY_MODE: extractive, llm ou none."""
+    mode = (mode or "extractive").lower()
+    if mode == "none":
+        return None
+    if mode == "llm" and engine is not None:
+        return engine_summarizer(engine)
+    return extractive_summary
+
+
+class ContextWindow:
+    """Historico de conversa com orcamento de tokens e resumo incremental."""
+
+    def __init__(self, budget: int = None, provider: str = None,
+                 summarizer: Optional[Callable[[List[Dict], str], str]] = extractive_summary,
+                 summary_ratio: float = SUMMARY_RATIO):
+        """
+        Args:
+            budget: Tokens de contexto (padrao: settings.MAX_CONTEXT_LENGTH)
+            provider: Provider cujo tokenizer e usado na contagem
+            summarizer: f(turnos_despejados, resumo_anterior) -> resumo; None descarta
+            summary_ratio: Fracao do orcamento que o resumo pode ocupar
+        """
+        self.budget = budget or settings.MAX_CONTEXT_LENGTH
+        self.counter = get_token_counter(provider)
+        self.summarizer = summarizer
+        self.summary_budget = int(self.budget * summary_ratio)
+        self.summary = ""
+        self._turns: List[Dict] = []
+        self._tokens = 0
+        self._summary_tokens = 0
+        self._metrics = {"messages_added": 0, "evicted": 0, "summaries": 0}
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def add(self, role: str, content: str):
+        """Registra uma mensagem; despeja/resume turnos antigos se passar do orcamento."""
+        message = {"role": role, "content": content}
+        self._turns.append(message)
+        self._tokens += self.counter.count_message(message)
+        self._metrics["messages_added"] += 1
+        if self._tokens + self._summary_tokens > self.budget:
+            self._evict()
+
+    def _evict(self):
+        """Tira turnos antigos (nunca o ultimo) ate LOW_WATER do orcamento."""
+        target = int(self.budget * LOW_WATER) - self._summary_tokens
+        evicted = []
+        while len(self._turns) > 1 and self._tokens > target:
+            message = self._turns.pop(0)
+            self._tokens -= self.counter.count_message(message)
+            evicted.append(message)
+        if not evicted:
+            return
+        self._metrics["evicted"] += len(evicted)
+        if self.summarizer is not None:
+            self._set_summary(self.summarizer(evicted, self.summary))
+            self._metrics["summaries"] += 1
+        log.debug(f"ContextWindow: {len(evicted)} mensagens despejadas "
+                  f"({self._tokens} tokens no historico)")
+
+    def _set_summary(self, summary: str):
+        """Guarda o resumo limitado a summary_budget (linhas mais antigas saem)."""
+        lines = [line for line in (summary or "").split("\n") if line.strip()]
+        sizes = [self.counter.count(line) + 1 for line in lines]  # Linhas contadas uma vez
+        total = self.counter.count(SUMMARY_HEADER) + MESSAGE_OVERHEAD + sum(sizes)
+        while lines and total > self.summary_budget:
+            total -= sizes.pop(0)
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+        self._summary_tokens = total if lines else 0
+
+    def _summary_message(self) -> Dict:
+        return {"role": "system", "content": f"{SUMMARY_HEADER}\n{self.summary}"}
+
+    def messages(self, reserve: int = 0) -> List[Dict]:
+        """
+        Contexto para a proxima chamada: resumo + turnos recentes.
+
+        Args:
+            reserve: Tokens ja ocupados fora do historico (system prompt,
+                     mensagem atual); os turnos mais antigos saem se precisar
+        """
+        context = [self._summary_message()] if self.summary else []
+        available = self.budget - reserve - self._summary_tokens
+        if self._tokens <= available:
+            return context + list(self._turns)
+        return context + fit_messages(self._turns, max(0, available), self.counter)
+
+    def context_for(self, message: str, system: Optional[List[Dict]] = None) -> List[Dict]:
+        """System prompts + contexto que cabe junto com a mensagem atual."""
+        system = system or []
+        reserve = self.counter.count_messages(system) + self.counter.count(message) + MESSAGE_OVERHEAD
+        return list(system) + self.messages(reserve)
+
+    def clear(self):
+        self._turns.clear()
+        self._tokens = 0
+        self.summary = ""
+        self._summary_tokens = 0
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._metrics,
+            "messages": len(self._turns),
+            "tokens": self._tokens,
+            "summary_tokens": self._summary_tokens,
+            "budget": self.budget,
+            "tokenizer": "tiktoken" if self.counter.exact else "estimativa",
+        }
@@ -0,0 +1,239 @@
+"""
+Embedding Cache - Cache persistente de embeddings em disco.
+Vetores float32 em arquivo memory-mapped, chave = hash(modelo + texto),
+eviction LRU por orcamento de bytes. Sobrevive a restarts: o corpus nao
+precisa ser recodificado a cada inicializacao.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # Cache so e usado quando embeddings estao ativos
+    np = None
+
+CACHE_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "embeddings"
+
+# Orcamento padrao para os vetores (384 dims * 4 bytes ~ 1.5 KB por texto)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Fracao dos slots liberada de uma vez quando o cache enche
+EVICT_FRACTION = 0.05
+
+_INITIAL_SLOTS = 1024
+
+
+def _cache_key(model_name: str, text: str) -> int:
+    """Hash de 64 bits de (modelo, texto). 0 e reservado para slot vazio."""
+    digest = hashlib.blake2b(f"{model_name}\0{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class EmbeddingCache:
+    """
+    Cache LRU de embeddings em disco (por modelo).
+
+    Arquivos em cache_dir/<modelo>/:
+        vectors.f32   matriz (slots x dim) float32 - memory-mapped
+        keys.u64      hash da chave de cada slot (0 = livre)
+        atime.f64     ultimo acesso de cada slot (para o LRU)
+        meta.json     dim e numero de slots (reescrito so ao crescer)
+
+    O mapa chave -> slot e reconstruido de keys.u64 ao abrir. O vetor e
+    gravado antes da chave, entao um crash no meio deixa o slot livre.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.model_name = model_name
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        self.cache_dir = Path(cache_dir or CACHE_DIR) / safe_name
+        self.max_bytes = max_bytes
+
+        self.dim: Optional[int] = None
+        self._slots = 0
+        self._vectors = None
+        self._keys = None
+        self._atime = None
+        self._slot_of: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            self._open()
+        except Exception as e:
+            log.warning(f"EmbeddingCache: cache em disco invalido, recriando ({e})")
+            self._reset()
+
+    # ---------------------------------------------------------------
+    # Arquivos
+    # ---------------------------------------------------------------
+
+    @property
+    def max_slots(self) -> int:
+        if not self.dim:
+            return 0
+        return max(1, self.max_bytes // (self.dim * 4))
+
+    def _meta_file(self) -> Path:
+        return self.cache_dir / "meta.json"
+
+    def _open(self):
+        """Abre os memmaps existentes e reconstroi o mapa chave -> slot."""
+        meta_file = self._meta_file()
+        if not meta_file.exists():
+            return
+        with open(meta_file, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim = int(meta["dim"])
+        self._slots = int(meta["slots"])
+        self._map()
+
+        used = np.nonzero(self._keys)[0]
+        self._slot_of = dict(zip(self._keys[used].tolist(), used.tolist()))
+        used_set = set(used.tolist())
+        self._free = [s for s in range(self._slots - 1, -1, -1) if s not in used_set]
+        log.info(f"EmbeddingCache: {len(self._slot_of)} embeddings em cache ({self.model_name})")
+
+    def _map(self):
+        self._vectors = np.memmap(self.cache_dir / "vectors.f32", dtype=np.float32,
+                                  mode="r+", shape=(self._slots, self.dim))
+        self._keys = np.memmap(self.cache_dir / "keys.u64", dtype=np.uint64,
+                               mode="r+", shape=(self._slots,))
+        self._atime = np.memmap(self.cache_dir / "atime.f64", dtype=np.float64,
+                                mode="r+", shape=(self._slots,))
+
+    def _unmap(self):
+        for mm in (self._vectors, self._keys, self._atime):
+            if mm is not None:
+                mm.flush()
+        self._vectors = self._keys = self._atime = None
+
+    def _resize(self, slots: int):
+        """Cria/aumenta os arquivos para `slots` e remapeia."""
+        self._unmap()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for name, itemsize in (("vectors.f32", self.dim * 4), ("keys.u64", 8), ("atime.f64", 8)):
+            path = self.cache_dir / name
+            with open(path, "ab") as f:
+                f.truncate(slots * itemsize)
+        self._free.extend(range(slots - 1, self._slots - 1, -1))
+        self._slots = slots
+        self._map()
+        tmp = self._meta_file().with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "slots": slots}, f)
+        os.replace(tmp, self._meta_file())
+
+    def _reset(self):
+        """Descarta o cache em disco."""
+        self._unmap()
+        for name in ("vectors.f32", "keys.u64", "atime.f64", "meta.json"):
+            path = self.cache_dir / name
+            if path.exists():
+                path.unlink()
+        self.dim = None
+        self._slots = 0
+        self._slot_of = {}
+        self._free = []
+
+    # ---------------------------------------------------------------
+    # API
+    # ---------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def get_many(self, texts: List[str]) -> Dict[str, "np.ndarray"]:
+        """Retorna {texto: vetor} para os textos em cache (atualiza o LRU)."""
+        found = {}
+        if not self._slot_of:
+            self.misses += len(texts)
+            return found
+        now = time.time()
+        with self._lock:
+            for text in texts:
+                slot = self._slot_of.get(_cache_key(self.model_name, text))
+                if slot is None:
+                    self.misses += 1
+                    continue
+                self._atime[slot] = now
+                found[text] = np.array(self._vectors[slot])
+                self.hits += 1
+        return found
+
+    def put_many(self, texts: List[str], vectors: "np.ndarray"):
+        """Grava vetores (float32) no cache, evictando os menos usados se preciso."""
+        if not texts:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._resize(min(_INITIAL_SLOTS, self.max_slots))
+            elif vectors.shape[1] != self.dim:
+                log.warning("EmbeddingCache: dimensao mudou, recriando cache")
+                self._reset()
+                self.dim = int(vectors.shape[1])
+                self._resize(min(_INITIAL_SLOTS, self.max_slots))
+
+            now = time.time()
+            for text, vec in zip(texts, vectors):
+                key = _cache_key(self.model_name, text)
+                slot = self._slot_of.get(key)
+                if slot is None:
+                    slot = self._take_slot()
+                self._vectors[slot] = vec
+                self._keys[slot] = key      # chave depois do vetor
+                self._atime[slot] = now
+                self._slot_of[key] = slot
+            self._vectors.flush()
+            self._keys.flush()
+
+    def _take_slot(self) -> int:
+        """Slot livre: cresce o arquivo ate o orcamento, depois evicta LRU."""
+        if not self._free:
+            if self._slots < self.max_slots:
+                self._resize(min(self._slots * 2, self.max_slots))
+            else:
+                self._evict(max(1, int(self._slots * EVICT_FRACTION)))
+        return self._free.pop()
+
+    def _evict(self, count: int):
+        """Libera os `count` slots com acesso mais antigo."""
+        count = min(count, self._slots)
+        victims = np.argpartition(self._atime, count - 1)[:count]
+        for slot in victims.tolist():
+            key = int(self._keys[slot])
+            if key:
+                self._slot_of.pop(key, None)
+            self._keys[slot] = 0
+            self._free.append(slot)
+        log.debug(f"EmbeddingCache: {count} embeddings evictados (LRU)")
+
+    def flush(self):
+        """Grava em disco os memmaps (inclui tempos de acesso do LRU)."""
+        with self._lock:
+            for mm in (self._vectors, self._keys, self._atime):
+                if mm is not None:
+                    mm.flush()
+
+    def get_stats(self) -> Dict:
+        return {
+            "entries": len(self._slot_of),
+            "bytes": self._slots * (self.dim or 0) * 4,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
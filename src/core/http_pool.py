@@ -0,0 +1,262 @@
+"""
+HTTP Pool - Clientes httpx compartilhados (keep-alive) por host.
+Providers (Ollama, SDKs Groq/OpenAI/Anthropic) e skills de rede pegam o
+cliente daqui: TCP + TLS sao pagos uma vez por host, nao a cada chamada.
+
+Um httpx.Client por origem (scheme://host:port), cada um com seu limite
+de conexoes (HTTP_POOL_MAX_CONNECTIONS_PER_HOST, ou por host em
+HTTP_POOL_HOST_LIMITS). AsyncClient tambem por origem, mas preso ao
+event loop que o criou. HTTP/2 quando o pacote h2 esta instalado.
+
+Clientes entregues por get_client (providers guardam o cliente) ficam
+fixos ate close(). Skills de rede buscam URLs arbitrarias por request/get:
+esses clientes ficam num LRU de MAX_CLIENTS origens e o menos usado e
+fechado ao passar disso (depois da ultima requisicao em andamento).
+"""
+
+import asyncio
+import atexit
+import threading
+from collections import OrderedDict
+from typing import Dict
+import httpx
+from config.settings import settings
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401  (habilita http2=True no httpx)
+    _h2_available = True
+except ImportError:
+    _h2_available = False
+
+# Origens com cliente sincrono aberto (LRU)
+MAX_CLIENTS = 32
+
+
+def origin_of(url: str) -> str:
+    """scheme://host[:porta] de uma URL."""
+    parsed = httpx.URL(url)
+    origin = f"{parsed.scheme}://{parsed.host}"
+    return f"{origin}:{parsed.port}" if parsed.port else origin
+
+
+def parse_host_limits(spec: str) -> Dict[str, int]:
+    """'localhost:11434=4,api.groq.com=20' -> {host: conexoes}."""
+    limits = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        host, value = part.rsplit("=", 1)
+        try:
+            limits[host.strip().lower()] = int(value)
+        except ValueError:
+            log.warning(f"Limite invalido em HTTP_POOL_HOST_LIMITS: {part}")
+    return limits
+
+
+class HttpPool:
+    """Registro de clientes httpx reutilizaveis, um por host."""
+
+    def __init__(self, max_connections: int = None, max_keepalive: int = None,
+                 keepalive_expiry: float = None, http2: bool = None,
+                 host_limits: Dict[str, int] = None, timeout: float = 30.0,
+                 max_clients: int = MAX_CLIENTS):
+        """
+        Args:
+            max_connections: Conexoes simultaneas por host
+            max_keepalive: Conexoes ociosas mantidas abertas por host
+            keepalive_expiry: Segundos que uma conexao ociosa fica aberta
+            http2: Usa HTTP/2 quando o servidor suporta (requer h2)
+            host_limits: Limite de conexoes especifico por host
+            timeout: Timeout padrao das requisicoes (segundos)
+            max_clients: Origens de request/get com cliente mantido (LRU)
+        """
+        self.max_connections = max_connections or settings.HTTP_POOL_MAX_CONNECTIONS_PER_HOST
+        self.max_keepalive = max_keepalive or settings.HTTP_POOL_MAX_KEEPALIVE
+        self.keepalive_expiry = keepalive_expiry or settings.HTTP_POOL_KEEPALIVE_EXPIRY
+        if http2 is None:
+            http2 = settings.HTTP_POOL_HTTP2
+        self.http2 = http2 and _h2_available
+        self.host_limits = (host_limits if host_limits is not None
+                            else parse_host_limits(settings.HTTP_POOL_HOST_LIMITS))
+        self.timeout = timeout
+        self.max_clients = max_clients
+        self._clients: Dict[str, httpx.Client] = {}  # Entregues por get_client: fixos
+        self._transient: "OrderedDict[str, httpx.Client]" = OrderedDict()  # LRU de request/get
+        self._inflight: Dict[httpx.Client, int] = {}
+        self._retired = set()   # Despejados com requisicao em andamento
+        self._async_clients: Dict[tuple, tuple] = {}  # (origem, id(loop)) -> (loop, cliente)
+        self._requests: Dict[str, int] = {}
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def _limits(self, origin: str) -> httpx.Limits:
+        host = origin.split("://", 1)[-1].lower()
+        limit = self.host_limits.get(host, self.host_limits.get(host.split(":")[0],
+                                                                 self.max_connections))
+        return httpx.Limits(max_connections=limit,
+                            max_keepalive_connections=min(self.max_keepalive, limit),
+                            keepalive_expiry=self.keepalive_expiry)
+
+    def _count(self, origin: str):
+        with self._lock:
+            self._requests[origin] = self._requests.get(origin, 0) + 1
+
+    def _new_client(self, origin: str) -> httpx.Client:
+        log.debug(f"HttpPool: novo cliente para {origin}")
+        return httpx.Client(
+            limits=self._limits(origin), http2=self.http2,
+            timeout=self.timeout, follow_redirects=True,
+            event_hooks={"request": [lambda request: self._count(origin)]})
+
+    def get_client(self, url: str) -> httpx.Client:
+        """Cliente sincrono do host da URL para uso prolongado (nunca despejado)."""
+        origin = origin_of(url)
+        with self._lock:
+            client = self._clients.get(origin)
+            if client is None:
+                # Ja usado por request/get: promove para fixo
+                client = self._transient.pop(origin, None) or self._new_client(origin)
+                self._clients[origin] = client
+            return client
+
+    def _acquire(self, origin: str) -> tuple:
+        """(cliente, fixo) para uma requisicao; despeja o LRU de request/get."""
+        evicted = []
+        with self._lock:
+            client = self._clients.get(origin)
+            if client is not None:
+                return client, True
+            client = self._transient.get(origin)
+            if client is None:
+                client = self._transient[origin] = self._new_client(origin)
+            self._transient.move_to_end(origin)
+            self._inflight[client] = self._inflight.get(client, 0) + 1
+            while len(self._transient) > self.max_clients:
+                old_origin, old_client = self._transient.popitem(last=False)
+                self._requests.pop(old_origin, None)
+                self._evicted += 1
+                if self._inflight.get(old_client):
+                    self._retired.add(old_client)  # Fecha quando a requisicao terminar
+                else:
+                    evicted.append(old_client)
+        self._close_all(evicted)
+        return client, False
+
+    def _release(self, client: httpx.Client):
+        with self._lock:
+            self._inflight[client] -= 1
+            if self._inflight[client] > 0:
+                return
+            del self._inflight[client]
+            if client not in self._retired:
+                return
+            self._retired.discard(client)
+        self._close_all([client])
+
+    @staticmethod
+    def _close_all(clients):
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def get_async_client(self, url: str) -> httpx.AsyncClient:
+        """AsyncClient compartilhado para o host da URL no event loop atual."""
+        origin = origin_of(url)
+        loop = asyncio.get_running_loop()
+        key = (origin, id(loop))
+        entry = self._async_clients.get(key)
+        if entry is None or entry[0] is not loop:
+            async def count(request):
+                self._count(origin)
+            with self._lock:
+                # Loops encerrados nao reaproveitam mais seus clientes
+                for stale in [k for k, (l, _) in self._async_clients.items() if l.is_closed()]:
+                    del self._async_clients[stale]
+                entry = (loop, httpx.AsyncClient(
+                    limits=self._limits(origin), http2=self.http2,
+                    timeout=self.timeout, follow_redirects=True,
+                    event_hooks={"request": [count]}))
+                self._async_clients[key] = entry
+        return entry[1]
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Requisicao pelo cliente do host (mesma assinatura do httpx)."""
+        client, pinned = self._acquire(origin_of(url))
+        try:
+            return client.request(method, url, **kwargs)
+        finally:
+            if not pinned:
+                self._release(client)
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    @staticmethod
+    def _pool_usage(client) -> Dict:
+        """Conexoes abertas/ociosas do pool (internals do httpcore)."""
+        try:
+            connections = client._transport._pool.connections
+            return {
+                "open": sum(1 for c in connections if not c.is_closed()),
+                "idle": sum(1 for c in connections if c.is_idle()),
+            }
+        except Exception:
+            return {}
+
+    def get_stats(self) -> Dict:
+        """Requisicoes e uso do pool por host."""
+        with self._lock:
+            hosts = {}
+            for origin, client in list(self._clients.items()) + list(self._transient.items()):
+                hosts[origin] = {"requests": self._requests.get(origin, 0),
+                                 "limit": self._limits(origin).max_connections,
+                                 **self._pool_usage(client)}
+            for (origin, _), (loop, client) in self._async_clients.items():
+                usage = self._pool_usage(client)
+                host = hosts.setdefault(origin, {"requests": self._requests.get(origin, 0)})
+                host["async_clients"] = host.get("async_clients", 0) + 1
+                host["async_open"] = host.get("async_open", 0) + usage.get("open", 0)
+            return {
+                "hosts": hosts,
+                "clients": len(self._clients),
+                "transient_clients": len(self._transient),
+                "evicted_clients": self._evicted,
+                "async_clients": len(self._async_clients),
+                "http2": self.http2,
+                "max_connections_per_host": self.max_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+            }
+
+    def close(self):
+        """Fecha os clientes sincronos (os async fecham com o loop)."""
+        with self._lock:
+            clients = list(self._clients.values()) + list(self._transient.values())
+            self._clients.clear()
+            self._transient.clear()
+            self._retired.clear()
+            self._async_clients.clear()
+        self._close_all(clients)
+
+
+# Singleton
+_http_pool = None
+_http_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpPool:
+    """Retorna singleton do HttpPool."""
+    global _http_pool
+    if _http_pool is None:
+        with _http_pool_lock:
+            if _http_pool is None:
+                _http_pool = HttpPool()
+                atexit.register(_http_pool.close)
+    return _http_pool
@@ -0,0 +1,414 @@
+"""
+Interaction Log - Log de interacoes particionado em segmentos JSONL.
+Segmentos diarios (ou limitados por tamanho); segmentos frios sao
+comprimidos em gzip. Um manifest (tabela `segments`) guarda o intervalo de
+tempo e a contagem de linhas de cada segmento, e um indice invertido em
+SQLite (token -> interacao -> segmento/offset) faz busca e historico
+abrirem apenas os segmentos necessarios.
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+_TOKEN_RE = re.compile(r"\w{2,}", re.UNICODE)
+_SEGMENT_RE = re.compile(r"^seg-(\d+)-(\d{8})\.jsonl(\.gz)?$")
+
+# Tamanho maximo do segmento ativo antes de rotacionar
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+
+
+def tokenize(text: str) -> Set[str]:
+    """Tokens unicos (lowercase, >= 2 chars) usados no indice e na busca."""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def entry_text(entry: Dict) -> str:
+    """Texto indexado de uma interacao."""
+    return f"{entry.get('user_msg', '')} {entry.get('ai_response', '')}"
+
+
+def _entry_day(entry: Dict) -> str:
+    """Dia (YYYYMMDD) de uma interacao, pelo campo ts."""
+    ts = str(entry.get("ts", ""))[:10]
+    day = ts.replace("-", "")
+    return day if len(day) == 8 and day.isdigit() else datetime.now().strftime("%Y%m%d")
+
+
+class InteractionLog:
+    """
+    Log append-only de interacoes, rotacionado e indexado.
+
+    Layout em log_dir:
+        seg-000001-20260101.jsonl.gz   segmento frio (comprimido)
+        seg-000002-20260102.jsonl      segmento ativo
+        index.db                        manifest + indice invertido
+
+    O indice guarda o offset de cada interacao dentro do segmento (offset
+    descomprimido para segmentos .gz). Se o indice sumir, e reconstruido a
+    partir dos arquivos de segmento na abertura.
+    """
+
+    def __init__(self, log_dir: Path, legacy_file: Path = None,
+                 max_segment_bytes: int = SEGMENT_MAX_BYTES,
+                 retention_days: int = None):
+        self.log_dir = Path(log_dir)
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self.index_file = self.log_dir / "index.db"
+        self.max_segment_bytes = max_segment_bytes
+        self.retention_days = retention_days
+
+        self._lock = threading.RLock()
+        self._db = None
+        self._active: Optional[Dict] = None
+
+    # ---------------------------------------------------------------
+    # Manifest + indice
+    # ---------------------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        """Abre o indice (lazy), migra o JSONL legado e sincroniza segmentos."""
+        if self._db is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.index_file), check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS segments (
+                    id INTEGER PRIMARY KEY, file TEXT NOT NULL, day TEXT,
+                    start_ts TEXT, end_ts TEXT, lines INTEGER DEFAULT 0,
+                    bytes INTEGER DEFAULT 0, compressed INTEGER DEFAULT 0);
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY, seg INTEGER NOT NULL,
+                    pos INTEGER NOT NULL, ts TEXT);
+                CREATE INDEX IF NOT EXISTS idx_entries_seg ON entries(seg);
+                CREATE TABLE IF NOT EXISTS postings (
+                    token TEXT NOT NULL, entry INTEGER NOT NULL,
+                    PRIMARY KEY (token, entry)) WITHOUT ROWID;
+            """)
+            db.commit()
+            self._db = db
+            self._migrate_legacy()
+            self._sync()
+        return self._db
+
+    def _segment_files(self) -> Dict[int, Path]:
+        """Arquivos de segmento presentes no disco, por id."""
+        files = {}
+        for path in self.log_dir.iterdir():
+            m = _SEGMENT_RE.match(path.name)
+            if m:
+                seg_id = int(m.group(1))
+                # Se existem .jsonl e .jsonl.gz (crash na compressao), vale o .jsonl
+                if seg_id not in files or not m.group(3):
+                    files[seg_id] = path
+        return files
+
+    def _segment_name(self, seg_id: int, day: str, compressed: bool = False) -> str:
+        return f"seg-{seg_id:06d}-{day}.jsonl" + (".gz" if compressed else "")
+
+    def _migrate_legacy(self):
+        """Move o interactions.jsonl antigo (arquivo unico) para um segmento."""
+        legacy = self.legacy_file
+        if not legacy or not legacy.exists():
+            return
+        if legacy.stat().st_size > 0:
+            with open(legacy, "rb") as f:
+                try:
+                    day = _entry_day(json.loads(f.readline()))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    day = datetime.now().strftime("%Y%m%d")
+            seg_id = max(self._segment_files(), default=0) + 1
+            shutil.move(str(legacy), str(self.log_dir / self._segment_name(seg_id, day)))
+            log.info(f"InteractionLog: {legacy.name} migrado para segmento {seg_id}")
+        else:
+            legacy.unlink()
+        # Indice da versao sem segmentos
+        for suffix in (".idx.db", ".idx.db-wal", ".idx.db-shm"):
+            old = legacy.with_suffix(suffix)
+            if old.exists():
+                old.unlink()
+
+    def _sync(self):
+        """Reconcilia manifest/indice com os arquivos de segmento no disco."""
+        db = self._db
+        files = self._segment_files()
+        rows = {r["id"]: r for r in db.execute("SELECT * FROM segments")}
+
+        for seg_id in sorted(files):
+            path = files[seg_id]
+            row = rows.get(seg_id)
+            size = path.stat().st_size
+            if row is None or row["file"] != path.name:
+                if row is not None:
+                    self._drop_segment_index(seg_id)
+                self._index_segment(seg_id, path, 0)
+            elif not row["compressed"] and size > row["bytes"]:
+                self._index_segment(seg_id, path, row["bytes"])
+            elif not row["compressed"] and size < row["bytes"]:
+                self._drop_segment_index(seg_id)
+                self._index_segment(seg_id, path, 0)
+
+        # Segmentos removidos do disco
+        for seg_id in set(rows) - set(files):
+            self._drop_segment_index(seg_id)
+        db.commit()
+
+        last = db.execute("SELECT * FROM segments ORDER BY id DESC LIMIT 1").fetchone()
+        self._active = dict(last) if last and not last["compressed"] else None
+
+        # Segmentos frios que ficaram sem comprimir (crash, migracao)
+        for row in db.execute("SELECT * FROM segments WHERE compressed = 0").fetchall():
+            if not self._active or row["id"] != self._active["id"]:
+                self._schedule_compress(dict(row))
+
+    def _drop_segment_index(self, seg_id: int):
+        db = self._db
+        db.execute("DELETE FROM postings WHERE entry IN "
+                   "(SELECT id FROM entries WHERE seg = ?)", (seg_id,))
+        db.execute("DELETE FROM entries WHERE seg = ?", (seg_id,))
+        db.execute("DELETE FROM segments WHERE id = ?", (seg_id,))
+
+    def _index_segment(self, seg_id: int, path: Path, start: int):
+        """Indexa um segmento a partir do offset `start` e atualiza o manifest."""
+        m = _SEGMENT_RE.match(path.name)
+        compressed = bool(m.group(3))
+        row = self._db.execute("SELECT * FROM segments WHERE id = ?", (seg_id,)).fetchone()
+        seg = dict(row) if row else {
+            "id": seg_id, "file": path.name, "day": m.group(2),
+            "start_ts": None, "end_ts": None, "lines": 0, "bytes": 0,
+            "compressed": int(compressed),
+        }
+
+        opener = gzip.open if compressed else open
+        count = 0
+        with opener(path, "rb") as f:
+            f.seek(start)
+            pos = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Linha incompleta - indexa quando terminar
+                try:
+                    entry = json.loads(raw)
+                    self._index_entry(seg, pos, entry)
+                    count += 1
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    pass
+                pos += len(raw)
+        seg["bytes"] = pos
+        self._save_segment(seg)
+        if count:
+            log.info(f"InteractionLog: {count} interacoes indexadas ({path.name})")
+
+    def _index_entry(self, seg: Dict, pos: int, entry: Dict):
+        ts = str(entry.get("ts", ""))
+        cur = self._db.execute(
+            "INSERT INTO entries(seg, pos, ts) VALUES (?, ?, ?)", (seg["id"], pos, ts))
+        self._db.executemany(
+            "INSERT OR IGNORE INTO postings(token, entry) VALUES (?, ?)",
+            [(t, cur.lastrowid) for t in tokenize(entry_text(entry))],
+        )
+        if not seg["start_ts"]:
+            seg["start_ts"] = ts
+        seg["end_ts"] = ts
+        seg["lines"] += 1
+
+    def _save_segment(self, seg: Dict):
+        self._db.execute(
+            "INSERT OR REPLACE INTO segments"
+            "(id, file, day, start_ts, end_ts, lines, bytes, compressed) "
+            "VALUES (:id, :file, :day, :start_ts, :end_ts, :lines, :bytes, :compressed)",
+            seg,
+        )
+
+    # ---------------------------------------------------------------
+    # Rotacao, compressao e retencao
+    # ---------------------------------------------------------------
+
+    def _rotate(self, day: str) -> Dict:
+        """Fecha o segmento ativo e abre um novo para `day`."""
+        old = self._active
+        row = self._db.execute("SELECT MAX(id) FROM segments").fetchone()
+        seg_id = max(row[0] or 0, max(self._segment_files(), default=0)) + 1
+        self._active = {
+            "id": seg_id, "file": self._segment_name(seg_id, day), "day": day,
+            "start_ts": None, "end_ts": None, "lines": 0, "bytes": 0,
+            "compressed": 0,
+        }
+        self._save_segment(self._active)
+        if old:
+            self._schedule_compress(old)
+            self._apply_retention()
+        return self._active
+
+    def _schedule_compress(self, seg: Dict):
+        threading.Thread(
+            target=self._compress, args=(seg,),
+            daemon=True, name=f"InteractionLog-gz-{seg['id']}",
+        ).start()
+
+    def _compress(self, seg: Dict):
+        """Comprime um segmento frio e troca o arquivo no manifest."""
+        src = self.log_dir / seg["file"]
+        gz_name = self._segment_name(seg["id"], seg["day"], compressed=True)
+        dst = self.log_dir / gz_name
+        tmp = self.log_dir / (gz_name + ".tmp")
+        try:
+            with open(src, "rb") as fin, gzip.open(tmp, "wb") as fout:
+                shutil.copyfileobj(fin, fout)
+            with self._lock:
+                os.replace(tmp, dst)
+                self._db.execute(
+                    "UPDATE segments SET file = ?, compressed = 1 WHERE id = ?",
+                    (gz_name, seg["id"]))
+                self._db.commit()
+                src.unlink()
+            log.debug(f"InteractionLog: segmento {seg['id']} comprimido")
+        except Exception as e:
+            log.error(f"Erro ao comprimir segmento {seg['file']}: {e}")
+            if tmp.exists():
+                tmp.unlink()
+
+    def _apply_retention(self):
+        """Remove segmentos inteiros mais antigos que retention_days."""
+        if not self.retention_days:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y%m%d")
+        old = self._db.execute(
+            "SELECT * FROM segments WHERE day < ? AND compressed = 1", (cutoff,)
+        ).fetchall()
+        for row in old:
+            path = self.log_dir / row["file"]
+            if path.exists():
+                path.unlink()
+            self._drop_segment_index(row["id"])
+            log.info(f"InteractionLog: segmento antigo removido: {row['file']}")
+        if old:
+            self._db.commit()
+
+    # ---------------------------------------------------------------
+    # Escrita
+    # ---------------------------------------------------------------
+
+    def append(self, entry: Dict):
+        """Grava interacao no segmento ativo (rotacionando se preciso) e indexa."""
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        day = _entry_day(entry)
+        with self._lock:
+            db = self._conn()
+            seg = self._active
+            if seg is None or seg["day"] != day or seg["bytes"] >= self.max_segment_bytes:
+                seg = self._rotate(day)
+            with open(self.log_dir / seg["file"], "ab") as f:
+                pos = f.tell()
+                f.write(line)
+            self._index_entry(seg, pos, entry)
+            seg["bytes"] = pos + len(line)
+            self._save_segment(seg)
+            db.commit()
+
+    # ---------------------------------------------------------------
+    # Leitura
+    # ---------------------------------------------------------------
+
+    def _read_entries(self, rows) -> Dict[int, Dict]:
+        """Le interacoes por (seg, pos), abrindo cada segmento uma vez."""
+        by_seg: Dict[int, List] = {}
+        for row in rows:
+            by_seg.setdefault(row["seg"], []).append(row)
+
+        entries = {}
+        for seg_id, seg_rows in by_seg.items():
+            seg = self._db.execute(
+                "SELECT file, compressed FROM segments WHERE id = ?", (seg_id,)).fetchone()
+            if not seg:
+                continue
+            opener = gzip.open if seg["compressed"] else open
+            with opener(self.log_dir / seg["file"], "rb") as f:
+                # Offsets crescentes: seek em gzip so avanca
+                for row in sorted(seg_rows, key=lambda r: r["pos"]):
+                    f.seek(row["pos"])
+                    try:
+                        entries[row["id"]] = json.loads(f.readline())
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+        return entries
+
+    def search(self, query: str, limit: int = 10, offset: int = 0,
+               since: str = None) -> List[Dict]:
+        """
+        Busca interacoes pelo indice invertido.
+
+        Pega as `limit` interacoes mais recentes (apos `offset`, e com
+        ts >= since, se informado) que contem algum token da query e ordena
+        por relevancia: 5 se a query inteira aparece no texto, senao o
+        numero de tokens em comum.
+        """
+        query_lower = query.lower().strip()
+        tokens = tokenize(query_lower)
+        if not tokens:
+            return []
+
+        with self._lock:
+            db = self._conn()
+            marks = ",".join("?" * len(tokens))
+            params: List = list(tokens)
+            where_ts = ""
+            if since:
+                where_ts = "AND e.ts >= ?"
+                params.append(since)
+            rows = db.execute(
+                f"SELECT e.id, e.seg, e.pos, COUNT(*) AS common "
+                f"FROM postings p JOIN entries e ON e.id = p.entry "
+                f"WHERE p.token IN ({marks}) {where_ts} "
+                f"GROUP BY e.id ORDER BY e.id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+            entries = self._read_entries(rows)
+
+        results = []
+        for row in rows:
+            entry = entries.get(row["id"])
+            if entry is None:
+                continue
+            text = entry_text(entry).lower()
+            entry["_relevance_score"] = 5 if query_lower in text else row["common"]
+            results.append(entry)
+
+        results.sort(key=lambda x: x.get("_relevance_score", 0), reverse=True)
+        return results
+
+    def tail(self, n: int = 20) -> List[Dict]:
+        """Ultimas N interacoes (ordem cronologica), abrindo so os segmentos recentes."""
+        if n <= 0:
+            return []
+        with self._lock:
+            db = self._conn()
+            rows = db.execute(
+                "SELECT id, seg, pos FROM entries ORDER BY id DESC LIMIT ?", (n,)
+            ).fetchall()
+            entries = self._read_entries(rows)
+        return [entries[r["id"]] for r in reversed(rows) if r["id"] in entries]
+
+    def get_segments(self) -> List[Dict]:
+        """Manifest: segmentos com intervalo de tempo, linhas e tamanho."""
+        with self._lock:
+            db = self._conn()
+            return [dict(r) for r in db.execute("SELECT * FROM segments ORDER BY id")]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -2,10 +2,18 @@
 Knowledge Base - Base de conhecimento verificada.
 Fatos verificados vs hipoteses, com busca inteligente.
 Item 22 do plano arquitetural.
+
+Dois engines de persistencia com a mesma API:
+    json   - arquivo knowledge.json (padrao)
+    sqlite - knowledge.db com FTS5 para busca full-text ranqueada (bm25)
 """
 
+import atexit
 import json
 import os
+import re
+import sqlite3
+import threading
 import time
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
@@ -18,6 +26,49 @@ log = get_logger(__name__)
 KB_FILE = os.path.join(
     str(Path.home()), "Desktop", "WILTOP", "data", "memory", "knowledge.json"
 )
+KB_DB_FILE = os.path.join(os.path.dirname(KB_FILE), "knowledge.db")
+
+# access_count e gravado em lote (N consultas ou T segundos)
+ACCESS_FLUSH_BATCH = 50
+ACCESS_FLUSH_INTERVAL = 30.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    content TEXT NOT NULL,
+    category TEXT,
+    source TEXT,
+    confidence REAL,
+    tags TEXT,
+    related_facts TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    access_count INTEGER DEFAULT 0,
+    verified INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_facts_category ON facts(category, confidence);
+CREATE INDEX IF NOT EXISTS idx_facts_confidence ON facts(confidence);
+CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5(
+    content, tags, content='facts', content_rowid='seq',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS facts_ai AFTER INSERT ON facts BEGIN
+    INSERT INTO facts_fts(rowid, content, tags) VALUES (new.seq, new.content, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS facts_ad AFTER DELETE ON facts BEGIN
+    INSERT INTO facts_fts(facts_fts, rowid, content, tags)
+    VALUES ('delete', old.seq, old.content, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS facts_au AFTER UPDATE OF content, tags ON facts BEGIN
+    INSERT INTO facts_fts(facts_fts, rowid, content, tags)
+    VALUES ('delete', old.seq, old.content, old.tags);
+    INSERT INTO facts_fts(rowid, content, tags) VALUES (new.seq, new.content, new.tags);
+END;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
 
 
 @dataclass
@@ -66,16 +117,29 @@ class KnowledgeFact:
 class KnowledgeBase:
     """
     Base de conhecimento com fatos verificados e hipoteses.
-    Persiste em JSON. Busca por keyword e categoria.
+    Persiste em JSON ou SQLite (engine="sqlite"). Busca por keyword e categoria.
     """
 
-    def __init__(self, kb_file: str = None):
+    def __init__(self, kb_file: str = None, engine: str = "json",
+                 db_file: str = None):
         self.kb_file = kb_file or KB_FILE
+        self.engine = engine
+        self.db_file = db_file or (
+            os.path.splitext(kb_file)[0] + ".db" if kb_file else KB_DB_FILE
+        )
         self.facts: Dict[str, KnowledgeFact] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._access_pending: set = set()
+        self._access_flushed_at = time.time()
         self._load()
+        atexit.register(self.flush)
 
     def _load(self):
         """Carrega KB do arquivo."""
+        if self.engine == "sqlite":
+            self._load_sqlite()
+            return
         try:
             if os.path.exists(self.kb_file):
                 with open(self.kb_file, "r", encoding="utf-8") as f:
@@ -98,6 +162,148 @@ class KnowledgeBase:
         except Exception as e:
             log.error(f"Erro ao salvar KB: {e}")
 
+    # ---------------------------------------------------------------
+    # Engine SQLite
+    # ---------------------------------------------------------------
+
+    def _load_sqlite(self):
+        """Abre knowledge.db, migra o JSON na primeira vez e carrega os fatos."""
+        try:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SQLITE_SCHEMA)
+
+            migrated = self._db.execute(
+                "SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+            if not migrated:
+                self._migrate_json()
+
+            for row in self._db.execute("SELECT * FROM facts ORDER BY seq"):
+                fact = self._row_to_fact(row)
+                self.facts[fact.id] = fact
+            log.info(f"KnowledgeBase (sqlite): {len(self.facts)} fatos carregados")
+        except Exception as e:
+            log.error(f"Erro ao carregar KB sqlite: {e}")
+            self.facts = {}
+
+    def _migrate_json(self):
+        """Importa knowledge.json para o SQLite (uma vez, em uma transacao)."""
+        count = 0
+        if os.path.exists(self.kb_file):
+            with open(self.kb_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._db:
+                for fact_data in data:
+                    self._upsert_row(KnowledgeFact.from_dict(fact_data))
+                    count += 1
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_from', ?)",
+                (self.kb_file,))
+        if count:
+            log.info(f"KnowledgeBase: {count} fatos migrados de {self.kb_file}")
+
+    @staticmethod
+    def _row_to_fact(row: sqlite3.Row) -> KnowledgeFact:
+        data = dict(row)
+        data["tags"] = json.loads(data.get("tags") or "[]")
+        data["related_facts"] = json.loads(data.get("related_facts") or "[]")
+        data["verified"] = bool(data.get("verified"))
+        return KnowledgeFact.from_dict(data)
+
+    def _upsert_row(self, fact: KnowledgeFact):
+        self._db.execute(
+            "INSERT INTO facts(id, content, category, source, confidence, tags, "
+            "related_facts, created_at, updated_at, access_count, verified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET content = excluded.content, "
+            "category = excluded.category, source = excluded.source, "
+            "confidence = excluded.confidence, tags = excluded.tags, "
+            "related_facts = excluded.related_facts, updated_at = excluded.updated_at, "
+            "access_count = excluded.access_count, verified = excluded.verified",
+            (fact.id, fact.content, fact.category, fact.source, fact.confidence,
+             json.dumps(fact.tags, ensure_ascii=False),
+             json.dumps(fact.related_facts, ensure_ascii=False),
+             fact.created_at, fact.updated_at, fact.access_count, int(fact.verified)),
+        )
+
+    def _persist(self, fact: KnowledgeFact):
+        """Grava um fato alterado (1 linha no sqlite, arquivo inteiro no json)."""
+        if self._db is None:
+            self._save()
+            return
+        try:
+            with self._lock, self._db:
+                self._upsert_row(fact)
+        except Exception as e:
+            log.error(f"Erro ao salvar fato {fact.id}: {e}")
+
+    def _persist_delete(self, fact_id: str):
+        if self._db is None:
+            self._save()
+            return
+        try:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM facts WHERE id = ?", (fact_id,))
+        except Exception as e:
+            log.error(f"Erro ao remover fato {fact_id}: {e}")
+
+    def _fts_candidates(self, query: str, category: str,
+                        min_confidence: float, limit: int) -> List[Tuple[str, float]]:
+        """Ids candidatos via FTS5 (+ filtros indexados), com rank bm25."""
+        tokens = _TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return []
+        match = " OR ".join(f'"{t}"' for t in dict.fromkeys(tokens))
+        sql = ("SELECT f.id, bm25(facts_fts) AS rank FROM facts_fts "
+               "JOIN facts f ON f.seq = facts_fts.rowid "
+               "WHERE facts_fts MATCH ? AND f.confidence >= ?")
+        params: list = [match, min_confidence]
+        if category:
+            sql += " AND f.category = ?"
+            params.append(category)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [(r["id"], r["rank"]) for r in self._db.execute(sql, params)]
+
+    def _record_access(self, facts: List[KnowledgeFact]):
+        """Incrementa access_count em memoria; persiste em lote."""
+        for fact in facts:
+            fact.access_count += 1
+            self._access_pending.add(fact.id)
+        if (len(self._access_pending) >= ACCESS_FLUSH_BATCH
+                or time.time() - self._access_flushed_at >= ACCESS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Grava os access_count pendentes (uma transacao / um write)."""
+        pending, self._access_pending = self._access_pending, set()
+        self._access_flushed_at = time.time()
+        if not pending:
+            return
+        if self._db is None:
+            self._save()
+            return
+        rows = [(self.facts[fid].access_count, fid) for fid in pending if fid in self.facts]
+        try:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "UPDATE facts SET access_count = ? WHERE id = ?", rows)
+        except Exception as e:
+            log.error(f"Erro ao gravar access_count: {e}")
+
+    def close(self):
+        """Grava pendencias e fecha o banco (engine sqlite)."""
+        self.flush()
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
     def add_fact(self, content: str, category: str = "general",
                  source: str = "user", confidence: float = 1.0,
                  tags: List[str] = None, verified: bool = False) -> KnowledgeFact:
@@ -126,7 +332,7 @@ class KnowledgeBase:
             verified=verified,
         )
         self.facts[fact_id] = fact
-        self._save()
+        self._persist(fact)
         log.info(f"Fato adicionado: {fact_id} - {content[:60]}")
         return fact
 
@@ -150,7 +356,7 @@ class KnowledgeBase:
         fact.verified = True
         fact.confidence = confidence
         fact.updated_at = datetime.now().isoformat()
-        self._save()
+        self._persist(fact)
         return True
 
     def update_fact(self, fact_id: str, content: str = None,
@@ -166,14 +372,15 @@ class KnowledgeBase:
         if tags is not None:
             fact.tags = tags
         fact.updated_at = datetime.now().isoformat()
-        self._save()
+        self._persist(fact)
         return True
 
     def remove_fact(self, fact_id: str) -> bool:
         """Remove fato da KB."""
         if fact_id in self.facts:
             del self.facts[fact_id]
-            self._save()
+            self._access_pending.discard(fact_id)
+            self._persist_delete(fact_id)
             return True
         return False
 
@@ -195,7 +402,19 @@ class KnowledgeBase:
         query_words = set(query_lower.split())
         results = []
 
-        for fact in self.facts.values():
+        if self._db is not None:
+            # FTS5: so os candidatos ranqueados pelo bm25 sao pontuados
+            for fact_id, rank in self._fts_candidates(
+                    query, category, min_confidence, limit * 5):
+                fact = self.facts.get(fact_id)
+                if fact:
+                    score = self._calculate_relevance(fact, query_lower, query_words)
+                    results.append((fact, score - rank))  # bm25: menor = melhor
+            candidates = []
+        else:
+            candidates = self.facts.values()
+
+        for fact in candidates:
             # Filtro de categoria
             if category and fact.category != category:
                 continue
@@ -213,14 +432,10 @@ class KnowledgeBase:
         # Ordena por score (maior primeiro)
         results.sort(key=lambda x: x[1], reverse=True)
 
-        # Incrementa access_count dos resultados
-        top_facts = []
-        for fact, score in results[:limit]:
-            fact.access_count += 1
-            top_facts.append(fact)
-
+        # Incrementa access_count dos resultados (gravado em lote)
+        top_facts = [fact for fact, score in results[:limit]]
         if top_facts:
-            self._save()
+            self._record_access(top_facts)
 
         return top_facts
 
@@ -324,8 +539,8 @@ _knowledge_base = None
 
 
 def get_knowledge_base() -> KnowledgeBase:
-    """Retorna singleton da KnowledgeBase."""
+    """Retorna singleton da KnowledgeBase (engine via KNOWLEDGE_ENGINE=json|sqlite)."""
     global _knowledge_base
     if _knowledge_base is None:
-        _knowledge_base = KnowledgeBase()
+        _knowledge_base = KnowledgeBase(engine=os.getenv("KNOWLEDGE_ENGINE", "json").lower())
     return _knowledge_base
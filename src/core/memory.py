@@ -3,14 +3,16 @@ Sistema de memoria AVANCADA do William.
 Auto-aprendizado profundo com evolucao de personalidade.
 """
 
-import json
 import re
 import os
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 from collections import Counter
+from config.settings import settings
 from src.utils.logger import get_logger
+from src.core.memory_wal import MemoryWAL, apply_delta
+from src.core.interaction_log import InteractionLog
 
 log = get_logger(__name__)
 
@@ -48,17 +50,27 @@ class WilliamMemory:
             "success_rate": {"total": 0, "success": 0},
             "vocabulary": {},
         }
+        # Deltas pendentes: paths alterados (set) e itens para append
+        self._dirty: Dict[tuple, None] = {}
+        self._appends: List[Dict] = []
+        self._journal = MemoryWAL(MEMORY_FILE)
+        self._interactions = InteractionLog(
+            MEMORY_FILE.parent / "interactions",
+            legacy_file=MEMORY_FILE.parent / "interactions.jsonl",
+            retention_days=settings.INTERACTIONS_RETENTION_DAYS,
+        )
         self._load()
 
     def _load(self):
-        """Carrega memoria do disco."""
+        """Carrega snapshot do disco e reaplica os deltas do WAL."""
         try:
             MEMORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-            if MEMORY_FILE.exists():
-                with open(MEMORY_FILE, 'r', encoding='utf-8') as f:
-                    saved = json.load(f)
-                    # Merge profundo - preserva campos novos
-                    self._deep_merge(self.data, saved)
+            saved, records = self._journal.load()
+            # Merge profundo - preserva campos novos
+            self._deep_merge(self.data, saved)
+            for record in records:
+                apply_delta(self.data, record)
+            if saved or records:
                 log.info(f"Memoria carregada: {self.data['interaction_count']} interacoes")
         except Exception as e:
             log.error(f"Erro ao carregar memoria: {e}")
@@ -71,23 +83,49 @@ class WilliamMemory:
             else:
                 base[key] = value
 
+    def _mark(self, *path):
+        """Marca um path de self.data como alterado (vira delta 'set')."""
+        self._dirty[path] = None
+
+    def _mark_append(self, key: str, item, limit: int):
+        """Registra append em uma lista de self.data (vira delta 'append')."""
+        self._appends.append({"op": "append", "p": [key], "v": item, "max": limit})
+
+    def _resolve(self, path: tuple):
+        """Retorna (True, valor) do path em self.data, ou (False, None)."""
+        node = self.data
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                return False, None
+            node = node[key]
+        return True, node
+
     def _save(self):
-        """Salva memoria no disco."""
+        """Grava no WAL apenas os deltas pendentes (custo constante)."""
+        records = []
+        for path in self._dirty:
+            found, value = self._resolve(path)
+            if found:
+                records.append({"op": "set", "p": list(path), "v": value})
+        records.extend(self._appends)
+        self._dirty.clear()
+        self._appends = []
         try:
-            MEMORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(MEMORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            self._journal.commit(records, state=self.data)
         except Exception as e:
             log.error(f"Erro ao salvar memoria: {e}")
 
     def record_interaction(self, user_msg: str, actions_executed: List[Dict], ai_response: str):
         """Registra interacao completa com aprendizado profundo."""
         self.data["interaction_count"] += 1
+        self._mark("interaction_count")
+        self._mark("success_rate")
 
         # 1. Registra acao frequente
         for action in actions_executed:
             atype = action.get("type", "unknown")
             self.data["frequent_actions"][atype] = self.data["frequent_actions"].get(atype, 0) + 1
+            self._mark("frequent_actions", atype)
             # Registra sucesso/falha
             self.data["success_rate"]["total"] += 1
             if action.get("success"):
@@ -117,9 +155,8 @@ class WilliamMemory:
         # 9. Aprende aliases de comandos
         self._learn_aliases(user_msg, actions_executed)
 
-        # Salva a cada 3 interacoes
-        if self.data["interaction_count"] % 3 == 0:
-            self._save()
+        # Grava os deltas desta interacao no WAL
+        self._save()
 
     def _learn_about_user(self, msg: str):
         """Aprende sobre o usuario a partir das mensagens."""
@@ -134,7 +171,7 @@ class WilliamMemory:
             m = re.search(p, msg, re.IGNORECASE)
             if m:
                 self.data["user_info"]["nome"] = m.group(1).capitalize()
-                self._save()
+                self._mark("user_info", "nome")
 
         # Detecta preferencias
         pref_patterns = [
@@ -151,7 +188,7 @@ class WilliamMemory:
                     self.data["user_preferences"][category].append(pref)
                     # Limita a 20 por categoria
                     self.data["user_preferences"][category] = self.data["user_preferences"][category][-20:]
-                self._save()
+                self._mark("user_preferences", category)
 
         # Detecta profissao
         prof_patterns = [
@@ -161,13 +198,13 @@ class WilliamMemory:
             m = re.search(p, msg_lower)
             if m:
                 self.data["user_info"]["profissao"] = m.group(1)
-                self._save()
+                self._mark("user_info", "profissao")
 
         # Detecta idade
         age_match = re.search(r'(?:tenho|to com|estou com)\s+(\d{1,2})\s+anos', msg_lower)
         if age_match:
             self.data["user_info"]["idade"] = int(age_match.group(1))
-            self._save()
+            self._mark("user_info", "idade")
 
     def _analyze_patterns(self, msg: str):
         """Analisa padroes de conversa do usuario."""
@@ -177,22 +214,27 @@ class WilliamMemory:
         # Detecta estilo de comunicacao
         if any(w in msg_lower for w in ["por favor", "poderia", "seria possivel"]):
             patterns["formal"] = patterns.get("formal", 0) + 1
+            self._mark("conversation_patterns", "formal")
         elif any(w in msg_lower for w in ["faz ai", "manda", "bora", "ae", "po"]):
             patterns["informal"] = patterns.get("informal", 0) + 1
+            self._mark("conversation_patterns", "informal")
 
         # Detecta se usuario e tecnico
         if any(w in msg_lower for w in ["python", "script", "codigo", "terminal", "api", "cmd", "git"]):
             patterns["tecnico"] = patterns.get("tecnico", 0) + 1
+            self._mark("conversation_patterns", "tecnico")
 
         # Detecta urgencia
         if any(w in msg_lower for w in ["rapido", "urgente", "agora", "ja", "depressa"]):
             patterns["urgente"] = patterns.get("urgente", 0) + 1
+            self._mark("conversation_patterns", "urgente")
 
         # Comprimento medio das mensagens
         patterns.setdefault("msg_lengths", [])
         patterns["msg_lengths"].append(len(msg))
         if len(patterns["msg_lengths"]) > 100:
             patterns["msg_lengths"] = patterns["msg_lengths"][-100:]
+        self._mark("conversation_patterns", "msg_lengths")
 
     def _track_topics(self, msg: str):
         """Registra topicos discutidos."""
@@ -213,6 +255,7 @@ class WilliamMemory:
         for topic, keywords in topic_keywords.items():
             if any(k in msg_lower for k in keywords):
                 topics[topic] = topics.get(topic, 0) + 1
+                self._mark("topics_discussed", topic)
 
     def _track_time(self):
         """Registra padroes de tempo de uso."""
@@ -223,6 +266,8 @@ class WilliamMemory:
         ts = self.data["time_stats"]
         ts["horarios_ativos"][hour] = ts["horarios_ativos"].get(hour, 0) + 1
         ts["dias_ativos"][day] = ts["dias_ativos"].get(day, 0) + 1
+        self._mark("time_stats", "horarios_ativos", hour)
+        self._mark("time_stats", "dias_ativos", day)
 
     def _learn_vocabulary(self, msg: str):
         """Aprende palavras mais usadas pelo usuario."""
@@ -235,10 +280,12 @@ class WilliamMemory:
         for w in words:
             if w not in stop_words:
                 vocab[w] = vocab.get(w, 0) + 1
+                self._mark("vocabulary", w)
         # Mantém so top 200
         if len(vocab) > 200:
             top = sorted(vocab.items(), key=lambda x: -x[1])[:200]
             self.data["vocabulary"] = dict(top)
+            self._mark("vocabulary")
 
     def _detect_corrections(self, msg: str):
         """Detecta quando o usuario esta corrigindo o William."""
@@ -248,18 +295,20 @@ class WilliamMemory:
                            "burro", "idiota", "nao entendeu", "de novo", "outra vez",
                            "tente novamente", "refaca", "corrija"]
         if any(w in msg_lower for w in correction_words):
-            self.data["corrections"].append({
+            entry = {
                 "timestamp": datetime.now().isoformat(),
                 "user_msg": msg,
                 "issue": f"Usuario insatisfeito: {msg[:100]}"
-            })
+            }
+            self.data["corrections"].append(entry)
             if len(self.data["corrections"]) > 50:
                 self.data["corrections"] = self.data["corrections"][-50:]
-            self._save()
+            self._mark_append("corrections", entry, 50)
 
     def _evolve_personality(self, actions: List[Dict]):
         """Evolui personalidade baseado nas interacoes."""
         p = self.data["personality"]
+        self._mark("personality")
 
         # Ganha XP por cada acao executada com sucesso
         xp_gain = sum(1 for a in actions if a.get("success"))
@@ -339,16 +388,19 @@ class WilliamMemory:
                     aliases[atype].append(short_msg)
                     if len(aliases[atype]) > 15:
                         aliases[atype] = aliases[atype][-15:]
+                    self._mark("command_aliases", atype)
 
     def record_correction(self, user_msg: str, what_went_wrong: str):
         """Registra quando o usuario corrige o William."""
-        self.data["corrections"].append({
+        entry = {
             "timestamp": datetime.now().isoformat(),
             "user_msg": user_msg,
             "issue": what_went_wrong
-        })
+        }
+        self.data["corrections"].append(entry)
         if len(self.data["corrections"]) > 50:
             self.data["corrections"] = self.data["corrections"][-50:]
+        self._mark_append("corrections", entry, 50)
         self._save()
 
     def get_context_prompt(self) -> str:
@@ -473,8 +525,12 @@ class WilliamMemory:
         }
 
     def save(self):
-        """Salva memoria."""
+        """Salva memoria: grava deltas pendentes e compacta o snapshot."""
         self._save()
+        try:
+            self._journal.compact(self.data, background=False)
+        except Exception as e:
+            log.error(f"Erro ao compactar memoria: {e}")
 
     # ================================================================
     # === METODOS v4 (Overhaul Arquitetural - Fase 2) ===
@@ -485,6 +541,8 @@ class WilliamMemory:
         """
         Registra interacao em formato JSONL (append-only).
         Complementa o JSON principal - JSONL e mais seguro para append.
+        O log e particionado em segmentos diarios (data/memory/interactions/),
+        e o indice invertido de busca e atualizado no mesmo append.
 
         Args:
             user_msg: Mensagem do usuario
@@ -493,9 +551,6 @@ class WilliamMemory:
             metadata: Dados extras (agent, task_id, etc)
         """
         try:
-            jsonl_file = MEMORY_FILE.parent / "interactions.jsonl"
-            jsonl_file.parent.mkdir(parents=True, exist_ok=True)
-
             entry = {
                 "ts": datetime.now().isoformat(),
                 "user_msg": user_msg[:500],
@@ -510,67 +565,32 @@ class WilliamMemory:
                 "metadata": metadata or {},
             }
 
-            with open(jsonl_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._interactions.append(entry)
 
         except Exception as e:
             log.debug(f"Erro ao gravar JSONL: {e}")
 
-    def search_memory(self, query: str, limit: int = 10) -> List[Dict]:
+    def search_memory(self, query: str, limit: int = 10, offset: int = 0,
+                      since: str = None) -> List[Dict]:
         """
         Busca nas interacoes passadas por keyword.
-        Procura no JSONL de interacoes.
+        Usa o indice invertido do log (token -> segmento/offset), entao o custo
+        depende do numero de resultados e nao do tamanho do historico.
 
         Args:
             query: Texto de busca
             limit: Maximo de resultados
+            offset: Pula as N interacoes mais recentes que casaram (paginacao)
+            since: ISO timestamp minimo (opcional)
 
         Returns:
             Lista de interacoes relevantes (mais recentes primeiro)
         """
-        results = []
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-
-        jsonl_file = MEMORY_FILE.parent / "interactions.jsonl"
-        if not jsonl_file.exists():
-            return results
-
         try:
-            # Le de tras pra frente (mais recentes primeiro)
-            lines = []
-            with open(jsonl_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            # Processa do mais recente ao mais antigo
-            for line in reversed(lines):
-                if len(results) >= limit:
-                    break
-                try:
-                    entry = json.loads(line.strip())
-                    text = f"{entry.get('user_msg', '')} {entry.get('ai_response', '')}".lower()
-
-                    # Match: query inteira ou palavras individuais
-                    score = 0
-                    if query_lower in text:
-                        score = 5
-                    else:
-                        text_words = set(text.split())
-                        common = query_words & text_words
-                        score = len(common)
-
-                    if score > 0:
-                        entry["_relevance_score"] = score
-                        results.append(entry)
-                except (json.JSONDecodeError, KeyError):
-                    continue
-
+            return self._interactions.search(query, limit=limit, offset=offset, since=since)
         except Exception as e:
             log.debug(f"Erro ao buscar memoria: {e}")
-
-        # Ordena por relevancia
-        results.sort(key=lambda x: x.get("_relevance_score", 0), reverse=True)
-        return results[:limit]
+            return []
 
     def export_to_markdown(self, output_path: str = None) -> str:
         """
@@ -677,21 +697,9 @@ class WilliamMemory:
             return ""
 
     def get_interaction_history(self, n: int = 20) -> List[Dict]:
-        """Retorna ultimas N interacoes do JSONL."""
-        jsonl_file = MEMORY_FILE.parent / "interactions.jsonl"
-        if not jsonl_file.exists():
-            return []
-
+        """Retorna ultimas N interacoes (le so os segmentos mais recentes)."""
         try:
-            with open(jsonl_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            entries = []
-            for line in lines[-n:]:
-                try:
-                    entries.append(json.loads(line.strip()))
-                except json.JSONDecodeError:
-                    continue
-            return entries
+            return self._interactions.tail(n)
         except Exception as e:
             log.debug(f"Erro ao ler historico: {e}")
             return []
@@ -0,0 +1,261 @@
+"""
+Memory WAL - Persistencia incremental da memoria do William.
+Grava deltas pequenos em um log append-only (write-ahead log), reaplica
+o log ao carregar e compacta em snapshot JSON em background.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# Chave reservada no snapshot com o ultimo seq ja incorporado
+SEQ_KEY = "_wal_seq"
+
+
+def apply_delta(data: Dict, record: Dict):
+    """
+    Aplica um delta do WAL sobre o dict de memoria.
+
+    Operacoes:
+        set:    data[p0][p1]...[pn] = v
+        append: data[p0]...[pn].append(v), limitado aos ultimos `max` itens
+    """
+    path = record.get("p") or []
+    if not path:
+        return
+    node = data
+    for key in path[:-1]:
+        child = node.get(key)
+        if not isinstance(child, dict):
+            child = {}
+            node[key] = child
+        node = child
+
+    last = path[-1]
+    if record.get("op") == "append":
+        items = node.get(last)
+        if not isinstance(items, list):
+            items = []
+        items.append(record.get("v"))
+        limit = record.get("max")
+        if limit:
+            items = items[-limit:]
+        node[last] = items
+    else:
+        node[last] = record.get("v")
+
+
+class MemoryWAL:
+    """
+    Write-ahead log + snapshot para o dict de memoria.
+
+    - commit(): grava deltas no fim do log (custo proporcional ao delta)
+    - load(): le snapshot e retorna deltas posteriores para replay
+    - compact(): serializa o estado e reescreve o snapshot em background
+
+    O snapshot e trocado atomicamente (os.replace), e uma linha cortada no
+    fim do log (crash no meio do write) e descartada ao carregar.
+    """
+
+    def __init__(self, snapshot_file: Path, wal_file: Path = None,
+                 compact_every: int = 500, fsync: bool = False):
+        self.snapshot_file = Path(snapshot_file)
+        self.wal_file = Path(wal_file) if wal_file else self.snapshot_file.with_suffix(".wal")
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._fh = None
+        self._seq = 0
+        self._pending_records = 0
+        self._compact_thread: Optional[threading.Thread] = None
+
+    # ---------------------------------------------------------------
+    # Leitura
+    # ---------------------------------------------------------------
+
+    def load(self) -> Tuple[Dict, List[Dict]]:
+        """
+        Carrega snapshot e deltas ainda nao compactados.
+
+        Returns:
+            (snapshot, records) - aplicar records em ordem com apply_delta()
+        """
+        snapshot: Dict = {}
+        snap_seq = 0
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            snap_seq = int(snapshot.pop(SEQ_KEY, 0) or 0)
+
+        records = []
+        last_seq = snap_seq
+        with self._lock:
+            self._repair_tail()
+            if self.wal_file.exists():
+                with open(self.wal_file, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        seq = record.get("n", 0)
+                        if seq > snap_seq:
+                            records.append(record)
+                        last_seq = max(last_seq, seq)
+            self._seq = last_seq
+            self._pending_records = len(records)
+
+        if records:
+            log.debug(f"MemoryWAL: {len(records)} deltas para replay")
+        return snapshot, records
+
+    def _repair_tail(self):
+        """Trunca linha incompleta no fim do log (crash durante write)."""
+        if not self.wal_file.exists():
+            return
+        size = self.wal_file.stat().st_size
+        if size == 0:
+            return
+        with open(self.wal_file, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            # Procura o ultimo \n de tras pra frente
+            pos = size
+            chunk = 4096
+            while pos > 0:
+                start = max(0, pos - chunk)
+                f.seek(start)
+                block = f.read(pos - start)
+                idx = block.rfind(b"\n")
+                if idx >= 0:
+                    f.truncate(start + idx + 1)
+                    break
+                pos = start
+            else:
+                f.truncate(0)
+        log.warning("MemoryWAL: linha incompleta descartada no fim do log")
+
+    # ---------------------------------------------------------------
+    # Escrita
+    # ---------------------------------------------------------------
+
+    def commit(self, records: List[Dict], state: Dict = None):
+        """
+        Grava deltas no log. Se o log passou de compact_every registros
+        e `state` foi passado, dispara compactacao em background.
+
+        Args:
+            records: Deltas {"op", "p", "v"[, "max"]} (seq e atribuido aqui)
+            state: Dict completo da memoria (usado so na compactacao)
+        """
+        if not records:
+            return
+        with self._lock:
+            lines = []
+            for record in records:
+                self._seq += 1
+                record["n"] = self._seq
+                lines.append(json.dumps(record, ensure_ascii=False))
+            fh = self._open()
+            fh.write("\n".join(lines) + "\n")
+            fh.flush()
+            if self.fsync:
+                os.fsync(fh.fileno())
+            self._pending_records += len(records)
+            due = self._pending_records >= self.compact_every
+
+        if due and state is not None:
+            self.compact(state)
+
+    def compact(self, state: Dict, background: bool = True):
+        """
+        Reescreve o snapshot com o estado atual e descarta o log ja coberto.
+
+        A serializacao e feita na thread chamadora (estado consistente);
+        so a escrita em disco vai para background.
+        """
+        if self._compact_thread and self._compact_thread.is_alive():
+            if not background:
+                self._compact_thread.join()
+            else:
+                return
+
+        with self._lock:
+            seq = self._seq
+            payload = dict(state)
+            payload[SEQ_KEY] = seq
+            content = json.dumps(payload, ensure_ascii=False, indent=2)
+            self._pending_records = 0
+
+        if background:
+            self._compact_thread = threading.Thread(
+                target=self._write_snapshot, args=(content, seq),
+                daemon=True, name="MemoryWAL-compact",
+            )
+            self._compact_thread.start()
+        else:
+            self._write_snapshot(content, seq)
+
+    def _write_snapshot(self, content: str, seq: int):
+        """Grava snapshot atomicamente e remove do log os deltas cobertos."""
+        try:
+            self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot_file.with_suffix(self.snapshot_file.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_file)
+            self._truncate_wal(seq)
+            log.debug(f"MemoryWAL: snapshot compactado (seq={seq})")
+        except Exception as e:
+            log.error(f"Erro ao compactar memoria: {e}")
+
+    def _truncate_wal(self, seq: int):
+        """Mantem no log apenas deltas com seq > seq do snapshot."""
+        with self._lock:
+            self._close()
+            if not self.wal_file.exists():
+                return
+            keep = []
+            with open(self.wal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        if json.loads(line).get("n", 0) > seq:
+                            keep.append(line)
+                    except json.JSONDecodeError:
+                        continue
+            tmp = self.wal_file.with_suffix(self.wal_file.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(keep)
+            os.replace(tmp, self.wal_file)
+            self._pending_records = len(keep)
+
+    def _open(self):
+        """Abre (uma vez) o handle de append do log."""
+        if self._fh is None or self._fh.closed:
+            self.wal_file.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.wal_file, "a", encoding="utf-8")
+        return self._fh
+
+    def _close(self):
+        if self._fh is not None and not self._fh.closed:
+            self._fh.close()
+        self._fh = None
+
+    def close(self):
+        """Aguarda compactacao pendente e fecha o log."""
+        if self._compact_thread and self._compact_thread.is_alive():
+            self._compact_thread.join()
+        with self._lock:
+            self._close()
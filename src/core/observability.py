@@ -2,32 +2,106 @@
 Observability - Sistema de logs estruturados e auditoria.
 Registra TODOS os eventos em JSONL para replay, debug e auditoria.
 Item 20 do plano arquitetural.
+
+log_event so serializa e enfileira num ring buffer em memoria; uma thread
+grava em lotes no arquivo do dia (handle mantido aberto), por tamanho ou
+tempo. flush() explicito (tambem no atexit) e politica de fsync opcional.
+
+Cada arquivo do dia tem um sidecar <dia>.idx (offset, tamanho, tipo,
+agente, task, risco por evento), gravado junto com o lote. Na primeira
+consulta os sidecars dos dias dentro de EVENTS_RETENTION_DAYS viram
+indices em memoria por task_id/tipo/agente e contadores por dia: consultas
+leem so as linhas que casam (seek), sem reparsear o arquivo inteiro.
+Antes de cada consulta o tamanho dos arquivos e comparado com o que ja foi
+indexado, entao linhas gravadas por outro processo tambem aparecem.
 """
 
+import atexit
 import json
 import os
-from datetime import datetime, date
+import threading
+import time
+from collections import deque
+from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional
 from pathlib import Path
+from config.settings import settings
 from src.utils.logger import get_logger
 
 log = get_logger(__name__)
 
 EVENTS_DIR = os.path.join(str(Path.home()), "Desktop", "WILTOP", "data", "logs", "events")
 
+# fsync apos gravar: none (SO decide), batch (todo lote), interval (no maximo
+# a cada FSYNC_INTERVAL segundos)
+FSYNC_POLICIES = ("none", "batch", "interval")
+FSYNC_INTERVAL = 5.0
+
+RISK_LEVELS = ("green", "yellow", "red")
+
+
+def _idx_field(value) -> str:
+    """Campo do sidecar (TSV): sem tab/quebra de linha."""
+    if value is None:
+        return ""
+    return str(value).replace("\t", " ").replace("\n", " ")
+
 
 class EventLog:
     """Log estruturado em JSONL para replay e auditoria."""
 
-    def __init__(self, log_dir: str = None):
+    def __init__(self, log_dir: str = None, buffer_size: int = None,
+                 flush_batch: int = None, flush_interval: float = None,
+                 fsync: str = None, retention_days: int = None):
+        """
+        Args:
+            log_dir: Diretorio dos JSONL diarios
+            buffer_size: Capacidade do ring buffer (cheio = descarta o mais antigo)
+            flush_batch: Eventos pendentes que acordam o flusher antes do tempo
+            flush_interval: Segundos maximos de um evento no buffer
+            fsync: none, batch ou interval
+            retention_days: Dias indexados/consultados (padrao EVENTS_RETENTION_DAYS)
+        """
         self.log_dir = log_dir or EVENTS_DIR
         os.makedirs(self.log_dir, exist_ok=True)
+        self.flush_batch = flush_batch or settings.EVENTS_FLUSH_BATCH
+        self.flush_interval = flush_interval or settings.EVENTS_FLUSH_INTERVAL
+        self.fsync = fsync or settings.EVENTS_FSYNC
+        if self.fsync not in FSYNC_POLICIES:
+            log.warning(f"EVENTS_FSYNC invalido: {self.fsync} - usando none")
+            self.fsync = "none"
+        self.retention_days = retention_days or settings.EVENTS_RETENTION_DAYS
+
+        # Ring buffer de (dia, linha JSON, tipo, agente, task_id, risco)
+        self._buffer = deque(maxlen=buffer_size or settings.EVENTS_BUFFER_SIZE)
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._file = None
+        self._idx_file = None
+        self._file_day: Optional[str] = None
+        self._last_fsync = 0.0
+        self._counters = {"logged": 0, "written": 0, "dropped": 0, "flushes": 0}
+
+        # Indices: chave -> [(dia, offset, tamanho)] em ordem cronologica.
+        # Carregados por dia na primeira consulta; _indexed guarda ate que
+        # byte do JSONL de cada dia carregado ja esta indexado
+        self._positions: Dict[str, List[tuple]] = {}
+        self._by_task: Dict[str, List[tuple]] = {}
+        self._by_type: Dict[str, List[tuple]] = {}
+        self._by_agent: Dict[str, List[tuple]] = {}
+        self._day_stats: Dict[str, Dict] = {}
+        self._indexed: Dict[str, int] = {}
+        atexit.register(self.close)
 
     def _get_log_file(self, dt: date = None) -> str:
         """Retorna path do arquivo de log para a data."""
         dt = dt or date.today()
         return os.path.join(self.log_dir, f"{dt.isoformat()}.jsonl")
 
+    def _day_file(self, day: str, ext: str = ".jsonl") -> str:
+        return os.path.join(self.log_dir, f"{day}{ext}")
+
     def log_event(self, event_type: str, agent: str = "system",
                   data: Dict = None, task_id: str = None,
                   risk_level: str = "green", message: str = "") -> Dict:
@@ -53,116 +127,396 @@ class EventLog:
         }
 
         try:
-            filepath = self._get_log_file()
-            with open(filepath, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            # Serializa agora: o evento fica congelado mesmo se `data` mudar depois
+            line = json.dumps(entry, ensure_ascii=False) + "\n"
         except Exception as e:
             log.error(f"Erro ao registrar evento: {e}")
+            return entry
 
+        if len(self._buffer) == self._buffer.maxlen:
+            self._counters["dropped"] += 1
+        self._buffer.append((entry["ts"][:10], line, event_type, agent, task_id, risk_level))
+        self._counters["logged"] += 1
+        if self._flusher is None:
+            self._start_flusher()
+        if len(self._buffer) >= self.flush_batch:
+            self._wake.set()
         return entry
 
-    def get_recent(self, n: int = 50) -> List[Dict]:
-        """Retorna N eventos mais recentes (hoje + ontem se necessario)."""
+    # ---------------------------------------------------------------
+    # Escrita em lote
+    # ---------------------------------------------------------------
+
+    def _start_flusher(self):
+        with self._write_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True,
+                                                 name="eventlog-flusher")
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _open_for(self, day: str):
+        """Handles (dados, sidecar) do dia; troca na virada de dia. Chamar com o lock."""
+        if self._file is not None and self._file_day == day:
+            return self._file
+        self._close_files()
+        self._file = open(self._day_file(day), "ab")
+        self._idx_file = open(self._day_file(day, ".idx"), "a", encoding="utf-8")
+        self._file_day = day
+        return self._file
+
+    def _close_files(self):
+        for f in (self._file, self._idx_file):
+            if f is not None:
+                f.close()
+        self._file = self._idx_file = None
+        self._file_day = None
+
+    def flush(self) -> int:
+        """Grava tudo que esta no buffer. Retorna quantos eventos gravou."""
+        with self._write_lock:
+            if not self._buffer:
+                return 0
+            items = []
+            while self._buffer:
+                items.append(self._buffer.popleft())
+            try:
+                start = 0
+                for i in range(1, len(items) + 1):
+                    # Agrupa linhas consecutivas do mesmo dia em uma escrita
+                    if i == len(items) or items[i][0] != items[start][0]:
+                        self._write_day(items[start][0], items[start:i])
+                        start = i
+                now = time.time()
+                if self.fsync == "batch" or (
+                        self.fsync == "interval" and now - self._last_fsync >= FSYNC_INTERVAL):
+                    os.fsync(self._file.fileno())
+                    self._last_fsync = now
+            except Exception as e:
+                log.error(f"Erro ao gravar eventos: {e}")
+                return 0
+            self._counters["written"] += len(items)
+            self._counters["flushes"] += 1
+            return len(items)
+
+    def _write_day(self, day: str, items: List[tuple]):
+        """Grava um lote do mesmo dia + sidecar e atualiza os indices. Com o lock."""
+        f = self._open_for(day)
+        offset = f.seek(0, os.SEEK_END)  # Fim real (outro processo pode ter gravado)
+        # Dia ainda nao consultado: o sidecar basta, indexa na primeira consulta
+        indexed = day in self._indexed
+        if indexed and offset > self._indexed[day]:
+            self._index_tail(day)
+        chunks, idx_lines = [], []
+        for _, line, event_type, agent, task_id, risk in items:
+            raw = line.encode("utf-8")
+            chunks.append(raw)
+            idx_lines.append("\t".join((str(offset), str(len(raw)), _idx_field(event_type),
+                                        _idx_field(agent), _idx_field(task_id),
+                                        _idx_field(risk))) + "\n")
+            if indexed:
+                self._index_event(day, offset, len(raw), event_type, agent, task_id, risk)
+            offset += len(raw)
+        if indexed:
+            self._indexed[day] = offset
+        f.write(b"".join(chunks))
+        f.flush()
+        # Sidecar depois dos dados: crash no meio = cauda reindexada na subida
+        self._idx_file.write("".join(idx_lines))
+        self._idx_file.flush()
+
+    def close(self):
+        """Grava o pendente e fecha o arquivo (shutdown)."""
+        self.flush()
+        with self._write_lock:
+            if self._file is not None and self.fsync != "none":
+                try:
+                    os.fsync(self._file.fileno())
+                except Exception:
+                    pass
+            self._close_files()
+
+    def get_writer_stats(self) -> Dict:
+        """Contadores do writer (buffer, lotes, descartes)."""
+        return {
+            **self._counters,
+            "buffered": len(self._buffer),
+            "buffer_size": self._buffer.maxlen,
+            "fsync": self.fsync,
+        }
+
+    # ---------------------------------------------------------------
+    # Indices (sidecars) e contadores
+    # ---------------------------------------------------------------
+
+    def _index_event(self, day: str, offset: int, length: int, event_type: str,
+                     agent: str, task_id: Optional[str], risk: str):
+        ref = (day, offset, length)
+        self._positions.setdefault(day, []).append(ref)
+        self._by_type.setdefault(event_type or "", []).append(ref)
+        self._by_agent.setdefault(agent or "unknown", []).append(ref)
+        if task_id:
+            self._by_task.setdefault(task_id, []).append(ref)
+
+        stats = self._day_stats.get(day)
+        if stats is None:
+            stats = self._day_stats[day] = {
+                "total": 0, "errors": 0, "actions": 0, "agents": {},
+                "risk_counts": {r: 0 for r in RISK_LEVELS},
+            }
+        stats["total"] += 1
+        if event_type == "error":
+            stats["errors"] += 1
+        elif event_type in ("action_start", "action_end"):
+            stats["actions"] += 1
+        agent = agent or "unknown"
+        stats["agents"][agent] = stats["agents"].get(agent, 0) + 1
+        if risk in stats["risk_counts"]:
+            stats["risk_counts"][risk] += 1
+
+    def _refresh(self):
+        """
+        Deixa os indices em dia com o disco antes de uma consulta: carrega
+        dias da janela de retencao ainda nao vistos, indexa linhas gravadas
+        por outros processos e solta os dias que sairam da janela. Com o lock.
+        """
+        cutoff = (date.today() - timedelta(days=self.retention_days)).isoformat()
+        try:
+            names = sorted(os.listdir(self.log_dir))
+        except OSError:
+            return
+        for filename in names:
+            if not filename.endswith(".jsonl"):
+                continue
+            day = filename[:-len(".jsonl")]
+            try:
+                date.fromisoformat(day)
+            except ValueError:
+                continue
+            if day < cutoff:
+                continue
+            if day in self._indexed:
+                self._index_tail(day)
+            else:
+                self._load_day(day)
+        expired = {day for day in self._indexed if day < cutoff}
+        if expired:
+            self._forget_days(expired)
+
+    def _index_tail(self, day: str):
+        """Indexa o que foi gravado no JSONL depois do ultimo byte indexado."""
+        try:
+            size = os.path.getsize(self._day_file(day))
+        except OSError:
+            return
+        start = self._indexed.get(day, 0)
+        if size <= start:
+            return
+        rows, end = self._scan_tail(self._day_file(day), start)
+        for offset, length, event_type, agent, task_id, risk in rows:
+            self._index_event(day, offset, length, event_type, agent, task_id or None, risk)
+        self._indexed[day] = end
+
+    def _load_day(self, day: str):
+        """Indice de um dia a partir do sidecar; a cauda sem indice e relida."""
+        data_path = self._day_file(day)
+        idx_path = self._day_file(day, ".idx")
+        self._positions.setdefault(day, [])
+        self._indexed[day] = 0
+        if not os.path.exists(data_path):
+            return
+        size = os.path.getsize(data_path)
+
+        entries = []
+        covered = 0
+        if os.path.exists(idx_path):
+            try:
+                with open(idx_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.endswith("\n"):
+                            break  # Linha parcial no fim (crash no meio da escrita)
+                        parts = line.rstrip("\n").split("\t")
+                        if len(parts) != 6:
+                            continue
+                        offset, length = int(parts[0]), int(parts[1])
+                        if offset != covered or offset + length > size:
+                            break  # Sidecar inconsistente: reindexa daqui
+                        entries.append((offset, length, *parts[2:]))
+                        covered = offset + length
+            except (OSError, ValueError) as e:
+                log.warning(f"Sidecar {idx_path} ilegivel ({e}) - reindexando")
+                entries, covered = [], 0
+
+        tail, end = [], covered
+        if covered < size:
+            tail, end = self._scan_tail(data_path, covered)
+            # Sidecar reescrito se estava inconsistente, senao so completado
+            mode = "a" if len(entries) == self._count_idx_lines(idx_path) else "w"
+            rows = entries if mode == "w" else []
+            with open(idx_path, mode, encoding="utf-8") as f:
+                f.write("".join("\t".join(str(v) for v in row) + "\n" for row in rows + tail))
+
+        for offset, length, event_type, agent, task_id, risk in entries + tail:
+            self._index_event(day, offset, length, event_type, agent, task_id or None, risk)
+        self._indexed[day] = end
+
+    @staticmethod
+    def _count_idx_lines(idx_path: str) -> int:
+        if not os.path.exists(idx_path):
+            return 0
+        with open(idx_path, "rb") as f:
+            return sum(1 for _ in f)
+
+    @staticmethod
+    def _scan_tail(data_path: str, start: int) -> tuple:
+        """Le o JSONL a partir de `start`: (linhas de indice, fim da ultima linha completa)."""
+        rows = []
+        with open(data_path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Linha parcial (escrita em andamento)
+                try:
+                    e = json.loads(raw)
+                    rows.append((offset, len(raw), _idx_field(e.get("type")),
+                                 _idx_field(e.get("agent")), _idx_field(e.get("task_id")),
+                                 _idx_field(e.get("risk"))))
+                except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                    pass
+                offset += len(raw)
+        return rows, offset
+
+    def _read_refs(self, refs: List[tuple]) -> List[Dict]:
+        """Le eventos por (dia, offset, tamanho): um seek por evento."""
         events = []
+        handle, handle_day = None, None
+        try:
+            for day, offset, length in refs:
+                if day != handle_day:
+                    if handle is not None:
+                        handle.close()
+                    handle, handle_day = open(self._day_file(day), "rb"), day
+                handle.seek(offset)
+                try:
+                    events.append(json.loads(handle.read(length)))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+        except OSError as e:
+            log.error(f"Erro ao ler eventos: {e}")
+        finally:
+            if handle is not None:
+                handle.close()
+        return events
 
-        # Tenta hoje primeiro
-        today_file = self._get_log_file()
-        events.extend(self._read_log_file(today_file))
+    def _query(self, index: Dict[str, List[tuple]], key: str, n: int = None) -> List[Dict]:
+        self.flush()  # Inclui o que ainda estava no buffer
+        with self._write_lock:
+            self._refresh()
+            refs = index.get(key)
+            if not refs:
+                return []
+            selected = list(refs[-n:] if n else refs)
+        return self._read_refs(selected)
 
-        # Se nao tem suficiente, tenta ontem
-        if len(events) < n:
-            from datetime import timedelta
-            yesterday = date.today() - timedelta(days=1)
-            yesterday_file = self._get_log_file(yesterday)
-            events = self._read_log_file(yesterday_file) + events
+    # ---------------------------------------------------------------
+    # Consultas
+    # ---------------------------------------------------------------
 
-        return events[-n:]
+    def get_recent(self, n: int = 50) -> List[Dict]:
+        """Retorna N eventos mais recentes (dias anteriores se necessario)."""
+        if n <= 0:
+            return []
+        self.flush()
+        refs: List[tuple] = []
+        with self._write_lock:
+            self._refresh()
+            for day in sorted(self._positions, reverse=True):
+                refs = self._positions[day][-(n - len(refs)):] + refs
+                if len(refs) >= n:
+                    break
+        return self._read_refs(refs)
 
     def get_events_by_type(self, event_type: str, n: int = 50) -> List[Dict]:
         """Retorna eventos filtrados por tipo."""
-        recent = self.get_recent(n * 3)  # Busca mais para ter margem
-        filtered = [e for e in recent if e.get("type") == event_type]
-        return filtered[-n:]
+        return self._query(self._by_type, event_type, n)
 
     def get_events_by_agent(self, agent: str, n: int = 50) -> List[Dict]:
         """Retorna eventos filtrados por agente."""
-        recent = self.get_recent(n * 3)
-        filtered = [e for e in recent if e.get("agent") == agent]
-        return filtered[-n:]
+        return self._query(self._by_agent, agent, n)
 
     def replay_task(self, task_id: str) -> List[Dict]:
-        """Retorna todos eventos de uma task para replay."""
-        recent = self.get_recent(500)
-        return [e for e in recent if e.get("task_id") == task_id]
+        """Retorna todos eventos de uma task para replay (todos os dias retidos)."""
+        return self._query(self._by_task, task_id)
 
     def get_error_events(self, n: int = 20) -> List[Dict]:
         """Retorna eventos de erro recentes."""
         return self.get_events_by_type("error", n)
 
     def get_stats(self) -> Dict:
-        """Retorna estatisticas dos eventos de hoje."""
-        events = self._read_log_file(self._get_log_file())
-        if not events:
-            return {"total": 0, "errors": 0, "actions": 0, "agents": {}}
-
-        errors = sum(1 for e in events if e.get("type") == "error")
-        actions = sum(1 for e in events if e.get("type") in ("action_start", "action_end"))
-
-        agents = {}
-        for e in events:
-            agent = e.get("agent", "unknown")
-            agents[agent] = agents.get(agent, 0) + 1
-
-        risk_counts = {"green": 0, "yellow": 0, "red": 0}
-        for e in events:
-            risk = e.get("risk", "green")
-            if risk in risk_counts:
-                risk_counts[risk] += 1
+        """Retorna estatisticas dos eventos de hoje (contadores incrementais)."""
+        self.flush()
+        today = date.today().isoformat()
+        with self._write_lock:
+            self._refresh()
+            stats = self._day_stats.get(today)
+            if not stats:
+                return {"total": 0, "errors": 0, "actions": 0, "agents": {}}
+            return {
+                "total": stats["total"],
+                "errors": stats["errors"],
+                "actions": stats["actions"],
+                "agents": dict(stats["agents"]),
+                "risk_counts": dict(stats["risk_counts"]),
+                "date": today,
+            }
 
-        return {
-            "total": len(events),
-            "errors": errors,
-            "actions": actions,
-            "agents": agents,
-            "risk_counts": risk_counts,
-            "date": date.today().isoformat(),
-        }
-
-    def _read_log_file(self, filepath: str) -> List[Dict]:
-        """Le arquivo JSONL e retorna lista de dicts."""
-        events = []
-        if not os.path.exists(filepath):
-            return events
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        try:
-                            events.append(json.loads(line))
-                        except json.JSONDecodeError:
-                            continue
-        except Exception as e:
-            log.error(f"Erro ao ler log {filepath}: {e}")
-        return events
-
-    def clear_old_logs(self, keep_days: int = 30):
-        """Remove logs mais antigos que keep_days."""
-        from datetime import timedelta
+    def clear_old_logs(self, keep_days: int = None):
+        """Remove logs mais antigos que keep_days (padrao: retention_days)."""
+        keep_days = keep_days or self.retention_days
         cutoff = date.today() - timedelta(days=keep_days)
+        removed = set()
         try:
             for filename in os.listdir(self.log_dir):
-                if not filename.endswith(".jsonl"):
+                if not filename.endswith((".jsonl", ".idx")):
                     continue
+                day = filename.rsplit(".", 1)[0]
                 try:
-                    file_date = date.fromisoformat(filename.replace(".jsonl", ""))
+                    file_date = date.fromisoformat(day)
                     if file_date < cutoff:
                         os.remove(os.path.join(self.log_dir, filename))
+                        removed.add(day)
                         log.info(f"Log antigo removido: {filename}")
                 except ValueError:
                     continue
         except Exception as e:
             log.error(f"Erro ao limpar logs antigos: {e}")
+        if removed:
+            self._drop_days(removed)
+
+    def _drop_days(self, days: set):
+        """Tira dos indices os dias apagados."""
+        with self._write_lock:
+            self._forget_days(days)
+
+    def _forget_days(self, days: set):
+        """Tira os dias dos indices em memoria. Com o lock."""
+        for day in days:
+            self._positions.pop(day, None)
+            self._day_stats.pop(day, None)
+            self._indexed.pop(day, None)
+        for index in (self._by_task, self._by_type, self._by_agent):
+            for key in list(index):
+                kept = [ref for ref in index[key] if ref[0] not in days]
+                if kept:
+                    index[key] = kept
+                else:
+                    del index[key]
 
 
 # Singleton
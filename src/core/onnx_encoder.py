@@ -0,0 +1,78 @@
+"""
+ONNX Encoder - Encoder de embeddings so CPU, sem torch.
+Roda o export ONNX quantizado (int8) do all-MiniLM-L6-v2 com onnxruntime +
+tokenizers: encode mais rapido e bem menos RSS que o sentence-transformers.
+
+Dependencias OPCIONAIS: onnxruntime, tokenizers, huggingface_hub.
+"""
+
+import importlib.util
+import os
+from typing import List
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# Repositorio HF e arquivo quantizado (quint8/avx2 roda em qualquer x86-64)
+ONNX_REPO = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+MAX_SEQ_LENGTH = 256
+
+
+def onnx_available() -> bool:
+    """True se o caminho ONNX pode ser usado (checa sem importar)."""
+    return all(importlib.util.find_spec(m) is not None
+               for m in ("onnxruntime", "tokenizers", "huggingface_hub", "numpy"))
+
+
+class OnnxEncoder:
+    """
+    Mesmo contrato de SentenceTransformer.encode usado pelo SemanticSearch:
+    mean pooling pela attention mask + normalizacao L2 opcional.
+    """
+
+    def __init__(self, repo: str = ONNX_REPO, model_file: str = ONNX_MODEL_FILE,
+                 threads: int = None):
+        import numpy as np
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        self._np = np
+        model_path = hf_hub_download(repo, model_file)
+        tokenizer_path = hf_hub_download(repo, "tokenizer.json")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        log.info(f"OnnxEncoder: {repo}/{model_file} carregado")
+
+    def encode(self, texts: List[str], batch_size: int = 64,
+               normalize_embeddings: bool = True, **_):
+        """Embeddings float32 (len(texts) x dim)."""
+        np = self._np
+        out = []
+        for i in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[i:i + batch_size])
+            ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self.session.run(None, feeds)[0]            # (b, seq, dim)
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            if normalize_embeddings:
+                pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            out.append(pooled.astype(np.float32))
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(out)
@@ -252,15 +252,8 @@ class AgentOrchestrator:
             }
             log.info(f"Playbook encontrado: {playbook.name}")
 
-            # Cria task principal no queue
-            main_task = self.task_queue.create_task(
-                title=playbook.display_name,
-                description=f"Playbook: {playbook.description}",
-                command=message,
-                agent="general_agent",
-            )
-
             # Cria subtasks para cada step
+            subtasks = []
             for i, step in enumerate(playbook.steps):
                 # Substitui variaveis nos params
                 step_desc = step.description
@@ -271,14 +264,21 @@ class AgentOrchestrator:
                         if isinstance(v, str):
                             step_params[k] = v.replace(f"{{{var_name}}}", str(var_value))
 
-                self.task_queue.create_task(
-                    title=step_desc,
-                    description=f"Step {i+1}/{len(playbook.steps)}",
-                    command=step_desc,
-                    agent=step.agent,
-                    parent_id=main_task.id,
-                    order=i,
-                )
+                subtasks.append({
+                    "title": step_desc,
+                    "description": f"Step {i+1}/{len(playbook.steps)}",
+                    "command": step_desc,
+                    "agent": step.agent,
+                })
+
+            # Task principal + subtasks no queue (uma transacao)
+            self.task_queue.create_task_with_subtasks(
+                title=playbook.display_name,
+                description=f"Playbook: {playbook.description}",
+                command=message,
+                agent="general_agent",
+                subtasks=subtasks,
+            )
 
             # Executa primeiro step via delegacao ao brain
             first_step = playbook.steps[0]
@@ -372,7 +372,7 @@ class AgentOrchestrator:
         active_tasks = self.task_queue.get_active_tasks()
         return {
             "active_tasks": len(active_tasks),
-            "total_tasks": len(self.task_queue.tasks),
+            "total_tasks": len(self.task_queue),
             "roles_loaded": len(self.roles),
             "playbooks_loaded": len(self.playbook_manager.playbooks),
             "security_mode": self.risk_policy.mode,
@@ -0,0 +1,214 @@
+"""
+Response Cache - Cache de respostas do AIEngine (memoria + disco).
+Chave = provider + modelo + mensagens normalizadas + temperature + max_tokens.
+
+Dois niveis: LRU em memoria (acerto em microssegundos) e SQLite em
+data/cache/responses.db (sobrevive a reinicios). Entradas expiram por TTL.
+Quem decide se uma chamada e cacheavel e o AIEngine (temperature baixa ou
+cache=True explicito).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config.settings import settings
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+CACHE_DB = os.path.join(str(settings.CACHE_DIR), "responses.db")
+
+# Temperature padrao dos providers quando a chamada nao informa
+DEFAULT_TEMPERATURE = 0.7
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT,
+    model TEXT,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    elapsed REAL NOT NULL DEFAULT 0,
+    response TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses(expires);
+"""
+
+
+def _normalize(text: str) -> str:
+    """Normaliza o texto da mensagem (quebras de linha e espacos nas pontas)."""
+    if not isinstance(text, str):
+        return text
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def make_key(provider: str, model: str, message: str, context: Optional[List[Dict]],
+             temperature: float, max_tokens: Optional[int]) -> str:
+    """Chave estavel (sha256) da requisicao."""
+    messages = [{"role": m.get("role"), "content": _normalize(m.get("content"))}
+                for m in (context or []) if isinstance(m, dict)]
+    messages.append({"role": "user", "content": _normalize(message)})
+    payload = json.dumps({
+        "provider": provider,
+        "model": model,
+        "messages": messages,
+        "temperature": round(float(temperature), 3),
+        "max_tokens": max_tokens,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU em memoria na frente de uma tabela SQLite com TTL."""
+
+    def __init__(self, db_file: str = None, memory_items: int = None):
+        self.db_file = db_file or CACHE_DB
+        self.memory_items = memory_items or settings.RESPONSE_CACHE_MEMORY_ITEMS
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires, resposta, elapsed)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypass": 0,
+                         "stores": 0, "expired": 0, "saved_seconds": 0.0}
+        try:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SQLITE_SCHEMA)
+            self.purge_expired()
+        except Exception as e:
+            log.warning(f"Cache de respostas em disco indisponivel: {e}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Resposta cacheada e valida (memoria, depois disco) ou None."""
+        return self.get_any([key])
+
+    def get_any(self, keys: List[str]) -> Optional[str]:
+        """Primeira chave com resposta valida (uma requisicao = um acerto/erro)."""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                response = self._lookup(key, now)
+                if response is not None:
+                    return response
+            self._metrics["misses"] += 1
+            return None
+
+    def _lookup(self, key: str, now: float) -> Optional[str]:
+        """Busca em memoria e depois em disco. Chamar com o lock."""
+        item = self._memory.get(key)
+        if item is not None:
+            if item[0] > now:
+                self._memory.move_to_end(key)
+                self._metrics["memory_hits"] += 1
+                self._metrics["saved_seconds"] += item[2]
+                return item[1]
+            del self._memory[key]
+            self._metrics["expired"] += 1
+
+        if self._db is not None:
+            try:
+                row = self._db.execute(
+                    "SELECT expires, response, elapsed FROM responses WHERE key = ?",
+                    (key,)).fetchone()
+            except sqlite3.Error as e:
+                log.debug(f"Erro ao ler cache de respostas: {e}")
+                row = None
+            if row is not None and row[0] > now:
+                self._remember(key, row)
+                self._metrics["disk_hits"] += 1
+                self._metrics["saved_seconds"] += row[2]
+                return row[1]
+            if row is not None:
+                self._metrics["expired"] += 1
+        return None
+
+    def _remember(self, key: str, item: tuple):
+        """Coloca no LRU de memoria. Chamar com o lock."""
+        self._memory[key] = item
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, response: str, ttl: float, provider: str = "",
+            model: str = "", elapsed: float = 0.0):
+        """Guarda a resposta nos dois niveis."""
+        if not isinstance(response, str) or not response:
+            return
+        now = time.time()
+        item = (now + ttl, response, elapsed)
+        with self._lock:
+            self._remember(key, item)
+            self._metrics["stores"] += 1
+            if self._db is not None:
+                try:
+                    with self._db:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO responses(key, provider, model, created, "
+                            "expires, elapsed, response) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, provider, model, now, now + ttl, elapsed, response))
+                except sqlite3.Error as e:
+                    log.debug(f"Erro ao gravar cache de respostas: {e}")
+
+    def record_bypass(self):
+        self._metrics["bypass"] += 1
+
+    def purge_expired(self) -> int:
+        """Remove entradas vencidas do disco."""
+        if self._db is None:
+            return 0
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM responses WHERE expires <= ?",
+                                    (time.time(),)).rowcount
+
+    def clear(self):
+        """Esvazia memoria e disco."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM responses")
+
+    def get_stats(self) -> Dict:
+        """Metricas de acerto/erro do cache."""
+        with self._lock:
+            hits = self._metrics["memory_hits"] + self._metrics["disk_hits"]
+            lookups = hits + self._metrics["misses"]
+            disk_entries = 0
+            if self._db is not None:
+                try:
+                    disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                **self._metrics,
+                "saved_seconds": round(self._metrics["saved_seconds"], 2),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Singleton
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Retorna singleton do ResponseCache."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,199 @@
+"""
+Run Ledger - Historico append-only das execucoes do scheduler.
+Uma linha por execucao (inicio, fim, duracao, resultado, retries) em
+SQLite indexado: achar jobs lentos ou instaveis sem reler arquivos.
+
+record() so enfileira em memoria; uma thread grava em lotes, entao quem
+registra (worker ou loop do scheduler) nunca espera por disco.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+LEDGER_FILE = os.path.join(str(Path.home()), ".william", "scheduler_runs.db")
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    task_name TEXT,
+    scheduled_at TEXT,
+    started_at TEXT NOT NULL,
+    ended_at TEXT NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    retries INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_task ON runs(task_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_outcome ON runs(outcome, started_at);
+"""
+
+OUTCOMES = ("success", "failed", "timeout")
+
+# Lote gravado quando atinge este tamanho ou a cada FLUSH_INTERVAL segundos
+FLUSH_BATCH = 256
+FLUSH_INTERVAL = 1.0
+
+
+class RunLedger:
+    """Ledger de execucoes (so INSERT; leitura por consultas indexadas)."""
+
+    def __init__(self, db_file: str = None):
+        self.db_file = db_file or LEDGER_FILE
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._writer = None
+        try:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SQLITE_SCHEMA)
+        except Exception as e:
+            log.error(f"Erro ao abrir run ledger: {e}")
+            self._db = None
+
+    def record(self, task_id: str, task_name: str, started_at: float, ended_at: float,
+               outcome: str, retries: int = 0, error: str = None,
+               scheduled_at: float = None):
+        """Registra uma execucao (timestamps epoch). Nao toca no disco."""
+        if self._db is None:
+            return
+        iso = lambda ts: datetime.fromtimestamp(ts).isoformat() if ts else None
+        self._pending.append((
+            task_id, task_name, iso(scheduled_at), iso(started_at), iso(ended_at),
+            max(0.0, ended_at - started_at), outcome, retries,
+            (error or "")[:500] or None,
+        ))
+        if self._writer is None:
+            self._start_writer()
+        if len(self._pending) >= FLUSH_BATCH:
+            self._wake.set()
+
+    def _start_writer(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, daemon=True,
+                                                name="run-ledger-writer")
+                self._writer.start()
+
+    def _writer_loop(self):
+        while self._db is not None:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Grava as execucoes pendentes em uma transacao. Retorna quantas."""
+        if self._db is None or not self._pending:
+            return 0
+        with self._lock:
+            rows = []
+            while self._pending:
+                rows.append(self._pending.popleft())
+            if not rows or self._db is None:
+                return 0
+            try:
+                with self._db:
+                    self._db.executemany(
+                        "INSERT INTO runs(task_id, task_name, scheduled_at, started_at, "
+                        "ended_at, duration, outcome, retries, error) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            except Exception as e:
+                log.error(f"Erro ao gravar run ledger: {e}")
+                return 0
+        return len(rows)
+
+    def _select(self, sql: str, params: tuple) -> List[Dict]:
+        if self._db is None:
+            return []
+        self.flush()  # Consultas enxergam o que ja foi registrado
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def query(self, task_id: str = None, outcome: str = None, since: str = None,
+              min_duration: float = None, limit: int = 100) -> List[Dict]:
+        """
+        Execucoes mais recentes primeiro.
+
+        Args:
+            task_id: So desta tarefa
+            outcome: success, failed ou timeout
+            since: ISO datetime minimo de inicio
+            min_duration: So execucoes com duracao >= (segundos)
+        """
+        clauses, params = [], []
+        if task_id:
+            clauses.append("task_id = ?")
+            params.append(task_id)
+        if outcome:
+            clauses.append("outcome = ?")
+            params.append(outcome)
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if min_duration is not None:
+            clauses.append("duration >= ?")
+            params.append(min_duration)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        params.append(limit)
+        return self._select(
+            f"SELECT * FROM runs {where}ORDER BY started_at DESC LIMIT ?", tuple(params))
+
+    def task_stats(self, since: str = None, task_id: str = None) -> List[Dict]:
+        """
+        Agregados por tarefa: execucoes, falhas, taxa de falha, retries,
+        duracao media/maxima. Ordenado pela taxa de falha (jobs instaveis).
+        """
+        clauses, params = [], []
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if task_id:
+            clauses.append("task_id = ?")
+            params.append(task_id)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        rows = self._select(
+            "SELECT task_id, MAX(task_name) AS task_name, COUNT(*) AS runs, "
+            "SUM(outcome != 'success') AS failures, SUM(outcome = 'timeout') AS timeouts, "
+            "SUM(retries) AS retries, AVG(duration) AS avg_duration, "
+            "MAX(duration) AS max_duration, MAX(started_at) AS last_run "
+            f"FROM runs {where}GROUP BY task_id", tuple(params))
+        for row in rows:
+            row["failure_rate"] = row["failures"] / row["runs"] if row["runs"] else 0.0
+        rows.sort(key=lambda r: (r["failure_rate"], r["avg_duration"]), reverse=True)
+        return rows
+
+    def slowest(self, n: int = 10, since: str = None) -> List[Dict]:
+        """Tarefas com maior duracao media."""
+        return sorted(self.task_stats(since), key=lambda r: r["avg_duration"], reverse=True)[:n]
+
+    def prune(self, keep_days: int = 90) -> int:
+        """Remove execucoes mais antigas que keep_days (retencao)."""
+        if self._db is None:
+            return 0
+        cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat()
+        self.flush()
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,)).rowcount
+
+    def close(self):
+        self.flush()
+        self._wake.set()
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
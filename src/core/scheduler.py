@@ -2,31 +2,115 @@
 Scheduler / Heartbeat do William.
 Permite agendar tarefas proativas - monitora e executa em background.
 Similar ao 'heartbeat' do OpenClaw.
+
+Tarefas habilitadas ficam em um heap por horario de disparo; a thread do
+scheduler dorme numa Condition ate o proximo deadline e e acordada por
+add_task / pause_task / resume_task.
+
+Tarefas vencidas rodam em um pool de threads limitado: timeout por
+tarefa, retry com backoff exponencial reagendado no heap (sem sleep em
+thread nenhuma) e limite de execucoes simultaneas por tarefa. Tentativa
+que estoura o timeout continua segurando worker e slot ate o callback
+retornar: o retry so sai depois.
+
+Agendamento por intervalo, horario diario (run_at) ou expressao cron,
+com jitter deterministico por tarefa e politica de catch-up para os
+disparos perdidos enquanto o servico estava parado.
+
+O estado (scheduled_tasks.json) so e regravado quando algo mudou, com
+debounce: o disparo apenas marca sujo. Cada execucao vai para o run
+ledger append-only (src/core/run_ledger.py), consultavel por tarefa.
 """
 
+import atexit
+import heapq
 import threading
 import time
 import json
 import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Callable, Optional
+from config.settings import settings
+from src.core.run_ledger import RunLedger
+from src.utils.cron import parse_cron
 from src.utils.logger import get_logger
 
 log = get_logger(__name__)
 
 TASKS_FILE = os.path.join(str(Path.home()), ".william", "scheduled_tasks.json")
 
+# Backoff dos retries: 2, 4, 8... segundos, no maximo 30
+RETRY_BACKOFF_MAX = 30
+
+# Amostras guardadas para as metricas de latencia
+METRICS_WINDOW = 500
+
+# Disparos perdidos (servico parado):
+#   skip      descarta e segue do proximo horario futuro
+#   coalesce  roda uma vez ao subir (padrao - comportamento anterior)
+#   all       roda uma vez por disparo perdido, ate CATCHUP_MAX_RUNS
+CATCHUP_POLICIES = ("skip", "coalesce", "all")
+DEFAULT_CATCHUP = "coalesce"
+CATCHUP_MAX_RUNS = 24
+
+# Espera apos a primeira mudanca antes de regravar o estado em disco
+SAVE_DEBOUNCE_SECONDS = 2.0
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
 
 class TaskScheduler:
     """Gerencia tarefas agendadas e proativas."""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = None, ledger: RunLedger = None):
         self.tasks: List[Dict] = []
         self.running = False
         self._thread = None
         self._callbacks: List[Callable] = []
+        self._by_id: Dict[str, Dict] = {}
+        # Heap de (timestamp, seq, task_id); entradas obsoletas sao ignoradas
+        # comparando com _due (remocao preguicosa)
+        self._heap: List[tuple] = []
+        self._due: Dict[str, float] = {}
+        self._seq = 0
+        self._generation = 0
+        self._cond = threading.Condition(threading.RLock())
+
+        # Estagio de execucao
+        self.max_workers = max_workers or settings.SCHEDULER_WORKERS
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                        thread_name_prefix="scheduler-worker")
+        # Heap de (timestamp, seq, tipo, token) para retries e timeouts
+        self._timers: List[tuple] = []
+        self._attempts: Dict[int, Dict] = {}     # token -> tentativa em andamento
+        self._running: Dict[str, int] = {}       # task_id -> execucoes ativas
+        self._queued = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0,
+                          "timeouts": 0, "retries": 0, "skipped_overlap": 0}
+        self._lag = deque(maxlen=METRICS_WINDOW)        # atraso deadline -> inicio
+        self._durations = deque(maxlen=METRICS_WINDOW)  # duracao das tentativas
+
+        # Persistencia: flag de sujo + timer de debounce; historico no ledger
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
+        self.ledger = ledger or RunLedger()
+        atexit.register(self.flush)
         self._load_tasks()
+        now = datetime.now()
+        for task in self.tasks:
+            self._by_id[task["id"]] = task
+            self._apply_catchup(task, now)
+            self._schedule(task)
 
     def _load_tasks(self):
         """Carrega tarefas salvas."""
@@ -39,20 +123,168 @@ class TaskScheduler:
             self.tasks = []
 
     def _save_tasks(self):
-        """Salva tarefas."""
+        """Salva tarefas (escrita atomica: tmp + replace)."""
         try:
             os.makedirs(os.path.dirname(TASKS_FILE), exist_ok=True)
-            with open(TASKS_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.tasks, f, ensure_ascii=False, indent=2)
+            with self._cond:
+                data = json.dumps(self.tasks, ensure_ascii=False, indent=2)
+            with self._save_lock:
+                tmp = TASKS_FILE + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp, TASKS_FILE)
         except Exception as e:
             log.error(f"Erro ao salvar tasks: {e}")
 
+    def _mark_dirty(self):
+        """Estado mudou: agenda um unico save daqui a SAVE_DEBOUNCE_SECONDS."""
+        with self._cond:
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self) -> bool:
+        """Grava o estado agora se estiver sujo (e o ledger). True se salvou."""
+        with self._cond:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self._save_tasks()
+        self.ledger.flush()
+        return dirty
+
+    @staticmethod
+    def _next_fire(task: Dict, after: datetime) -> Optional[datetime]:
+        """Proximo horario nominal da tarefa depois de `after` (None = nao repete)."""
+        if task.get("cron"):
+            return parse_cron(task["cron"]).next_after(after)
+        if task.get("interval_minutes", 0) > 0:
+            return after + timedelta(minutes=task["interval_minutes"])
+        if task.get("run_at"):
+            h, m = map(int, task["run_at"].split(":"))
+            next_run = after.replace(hour=h, minute=m, second=0, microsecond=0)
+            if next_run <= after:
+                next_run += timedelta(days=1)
+            return next_run
+        return None
+
+    def _advance(self, task: Dict, now: datetime) -> Optional[datetime]:
+        """
+        Proximo horario nominal apos `now`, contado do next_run nominal anterior.
+
+        O disparo real (now) inclui jitter e atraso da fila; contar o intervalo
+        a partir dele faria a tarefa derivar a cada execucao.
+        """
+        try:
+            nominal = datetime.fromisoformat(task["next_run"])
+        except (KeyError, TypeError, ValueError):
+            return self._next_fire(task, now)
+        if task.get("cron") or task.get("interval_minutes", 0) <= 0:
+            return self._next_fire(task, max(nominal, now))
+        step = timedelta(minutes=task["interval_minutes"])
+        next_run = nominal + step
+        if next_run <= now:
+            next_run += step * (int((now - next_run) / step) + 1)
+        return next_run
+
+    @staticmethod
+    def _jitter(task: Dict) -> float:
+        """Atraso fixo por tarefa em [0, jitter_seconds): espalha frotas de jobs."""
+        jitter = task.get("jitter_seconds") or 0
+        if jitter <= 0:
+            return 0.0
+        return (zlib.crc32(task["id"].encode("utf-8")) % 1000) / 1000 * jitter
+
+    def _count_missed(self, task: Dict, first: datetime, now: datetime) -> int:
+        """Disparos nominais em [first, now], limitado a CATCHUP_MAX_RUNS + 1."""
+        if task.get("one_shot"):
+            return 1
+        count = 1
+        if task.get("cron"):
+            for fire in parse_cron(task["cron"]).iter_from(first):
+                if fire > now or count > CATCHUP_MAX_RUNS:
+                    break
+                count += 1
+        elif task.get("interval_minutes", 0) > 0:
+            count += int((now - first).total_seconds() // (task["interval_minutes"] * 60))
+        elif task.get("run_at"):
+            count += (now - first).days
+        return min(count, CATCHUP_MAX_RUNS + 1)
+
+    def _apply_catchup(self, task: Dict, now: datetime):
+        """Aplica a politica de catch-up a uma tarefa com next_run no passado."""
+        if not task.get("enabled") or not task.get("next_run"):
+            return
+        try:
+            first = datetime.fromisoformat(task["next_run"])
+        except (TypeError, ValueError):
+            return
+        if first > now:
+            return
+
+        missed = self._count_missed(task, first, now)
+        task["missed_runs"] = task.get("missed_runs", 0) + missed
+        policy = task.get("catchup", DEFAULT_CATCHUP)
+        if policy == "skip":
+            next_run = None if task.get("one_shot") else self._next_fire(task, now)
+            if next_run is None:
+                task["enabled"] = False
+            else:
+                task["next_run"] = next_run.isoformat()
+        elif policy == "all":
+            task["catchup_pending"] = min(missed, CATCHUP_MAX_RUNS) - 1
+        # coalesce: next_run fica no passado -> dispara uma vez ao iniciar
+        log.info(f"Tarefa {task['name']}: {missed} disparo(s) perdido(s), catch-up={policy}")
+
+    def _schedule(self, task: Dict):
+        """(Re)coloca a tarefa no heap pelo next_run (+ jitter). Chamar com o lock."""
+        self._due.pop(task["id"], None)
+        if not task.get("enabled") or not task.get("next_run"):
+            return
+        try:
+            ts = datetime.fromisoformat(task["next_run"]).timestamp() + self._jitter(task)
+        except (TypeError, ValueError):
+            log.warning(f"next_run invalido em {task.get('name')}: {task.get('next_run')}")
+            return
+        self._seq += 1
+        self._due[task["id"]] = ts
+        heapq.heappush(self._heap, (ts, self._seq, task["id"]))
+
+    def _pop_due(self, now: float) -> List[tuple]:
+        """Remove do heap as tarefas vencidas: [(tarefa, horario)]. Chamar com o lock."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            ts, _, task_id = heapq.heappop(self._heap)
+            if self._due.get(task_id) != ts:
+                continue  # Pausada, removida ou reagendada
+            del self._due[task_id]
+            task = self._by_id.get(task_id)
+            if task is not None:
+                due.append((task, ts))
+        return due
+
+    def _next_deadline(self) -> Optional[float]:
+        """Timestamp da proxima entrada valida do heap. Chamar com o lock."""
+        while self._heap:
+            ts, _, task_id = self._heap[0]
+            if self._due.get(task_id) == ts:
+                return ts
+            heapq.heappop(self._heap)
+        return None
+
     def add_callback(self, callback: Callable):
         """Adiciona callback para quando tarefas disparam."""
         self._callbacks.append(callback)
 
     def add_task(self, name: str, command: str, interval_minutes: int = 0,
-                 run_at: str = None, one_shot: bool = False) -> Dict:
+                 run_at: str = None, one_shot: bool = False,
+                 timeout_seconds: int = None, max_retries: int = 2,
+                 max_concurrency: int = 1, cron: str = None,
+                 jitter_seconds: int = 0, catchup: str = DEFAULT_CATCHUP) -> Dict:
         """
         Adiciona tarefa agendada.
 
@@ -62,7 +294,19 @@ class TaskScheduler:
             interval_minutes: Intervalo de repeticao em minutos (0 = nao repete)
             run_at: Horario para executar (formato HH:MM)
             one_shot: Se True, executa uma vez e remove
+            timeout_seconds: Tempo maximo por tentativa (padrao SCHEDULER_TASK_TIMEOUT)
+            max_retries: Retries com backoff exponencial apos falha/timeout
+            max_concurrency: Execucoes simultaneas permitidas desta tarefa
+                             (disparo com o limite atingido e pulado)
+            cron: Expressao cron (min hour day month weekday ou @daily...);
+                  tem prioridade sobre interval_minutes/run_at
+            jitter_seconds: Atraso fixo por tarefa em [0, jitter) segundos
+            catchup: Disparos perdidos com o servico parado: skip, coalesce, all
         """
+        if cron:
+            parse_cron(cron)  # ValueError se invalida
+        if catchup not in CATCHUP_POLICIES:
+            raise ValueError(f"catchup deve ser um de {CATCHUP_POLICIES}: {catchup}")
         task = {
             "id": f"task_{int(time.time())}_{len(self.tasks)}",
             "name": name,
@@ -75,32 +319,37 @@ class TaskScheduler:
             "next_run": None,
             "created": datetime.now().isoformat(),
             "run_count": 0,
+            "timeout_seconds": timeout_seconds or settings.SCHEDULER_TASK_TIMEOUT,
+            "max_retries": max_retries,
+            "max_concurrency": max_concurrency,
+            "cron": cron,
+            "jitter_seconds": jitter_seconds,
+            "catchup": catchup,
         }
 
         # Calcula proximo horario
-        if run_at:
-            h, m = map(int, run_at.split(":"))
-            now = datetime.now()
-            next_run = now.replace(hour=h, minute=m, second=0, microsecond=0)
-            if next_run <= now:
-                next_run += timedelta(days=1)
+        next_run = self._next_fire(task, datetime.now())
+        if next_run is not None:
             task["next_run"] = next_run.isoformat()
-        elif interval_minutes > 0:
-            task["next_run"] = (datetime.now() + timedelta(minutes=interval_minutes)).isoformat()
 
-        self.tasks.append(task)
-        self._save_tasks()
+        with self._cond:
+            self.tasks.append(task)
+            self._by_id[task["id"]] = task
+            self._schedule(task)
+            self._cond.notify()
+        self._mark_dirty()
         log.info(f"Tarefa adicionada: {name}")
         return task
 
     def remove_task(self, task_id: str) -> bool:
         """Remove tarefa pelo ID."""
-        before = len(self.tasks)
-        self.tasks = [t for t in self.tasks if t["id"] != task_id]
-        if len(self.tasks) < before:
-            self._save_tasks()
-            return True
-        return False
+        with self._cond:
+            if self._by_id.pop(task_id, None) is None:
+                return False
+            self._due.pop(task_id, None)
+            self.tasks = [t for t in self.tasks if t["id"] != task_id]
+        self._mark_dirty()
+        return True
 
     def list_tasks(self) -> List[Dict]:
         """Lista todas as tarefas."""
@@ -108,78 +357,208 @@ class TaskScheduler:
 
     def start(self):
         """Inicia o scheduler em background."""
-        if self.running:
-            return
-        self.running = True
-        self._thread = threading.Thread(target=self._loop, daemon=True)
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+            self._generation += 1
+            generation = self._generation
+        self._thread = threading.Thread(target=self._loop, args=(generation,), daemon=True)
         self._thread.start()
         log.info("Scheduler iniciado")
 
     def stop(self):
         """Para o scheduler."""
-        self.running = False
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        self.flush()
         log.info("Scheduler parado")
 
-    def _loop(self):
-        """Loop principal do scheduler."""
-        while self.running:
-            try:
-                now = datetime.now()
-                for task in self.tasks:
-                    if not task.get("enabled"):
-                        continue
-                    if not task.get("next_run"):
-                        continue
-
-                    next_run = datetime.fromisoformat(task["next_run"])
-                    if now >= next_run:
-                        # EXECUTA!
+    def close(self):
+        """Para o scheduler, grava o estado e libera pool e ledger."""
+        self.stop()
+        atexit.unregister(self.flush)
+        self._pool.shutdown(wait=False)
+        self.ledger.close()
+
+    def _loop(self, generation: int = None):
+        """Loop principal: dorme ate o proximo deadline (tarefa, retry ou timeout)."""
+        while True:
+            with self._cond:
+                # Um stop()+start() cria uma geracao nova; esta thread sai
+                if not self.running or generation != self._generation:
+                    return
+                now = time.time()
+                due = self._pop_due(now)
+                timers = []
+                while self._timers and self._timers[0][0] <= now:
+                    timers.append(heapq.heappop(self._timers))
+                if not due and not timers:
+                    deadlines = [d for d in (self._next_deadline(),
+                                             self._timers[0][0] if self._timers else None)
+                                 if d is not None]
+                    timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                    self._cond.wait(timeout)
+                    continue
+
+                for task, scheduled in due:
+                    try:
+                        # EXECUTA! (no pool - o loop nunca bloqueia em callback)
                         log.info(f"Executando tarefa: {task['name']}")
-                        self._fire_task(task)
-
-                        # Atualiza
-                        task["last_run"] = now.isoformat()
-                        task["run_count"] = task.get("run_count", 0) + 1
-
-                        if task.get("one_shot"):
-                            task["enabled"] = False
-                        elif task.get("interval_minutes", 0) > 0:
-                            task["next_run"] = (now + timedelta(
-                                minutes=task["interval_minutes"])).isoformat()
-                        elif task.get("run_at"):
-                            # Proximo dia
-                            h, m = map(int, task["run_at"].split(":"))
-                            next_run = now.replace(hour=h, minute=m, second=0)
-                            next_run += timedelta(days=1)
-                            task["next_run"] = next_run.isoformat()
-
-                        self._save_tasks()
-            except Exception as e:
-                log.error(f"Erro no scheduler loop: {e}")
+                        self._after_run(task)
+                        self._dispatch(task, scheduled)
+                    except Exception as e:
+                        log.error(f"Erro no scheduler loop: {e}")
+                for ts, _, kind, token in timers:
+                    if kind == "timeout":
+                        self._on_timeout(token)
+                    else:
+                        self._on_retry(token, ts)
+            if due:
+                self._mark_dirty()
+
+    def _after_run(self, task: Dict):
+        """Atualiza contadores e reagenda a tarefa que acabou de disparar."""
+        now = datetime.now()
+        with self._cond:
+            task["last_run"] = now.isoformat()
+            task["run_count"] = task.get("run_count", 0) + 1
+
+            if task.get("one_shot"):
+                task["enabled"] = False
+            else:
+                next_run = self._advance(task, now)
+                if next_run is not None:
+                    task["next_run"] = next_run.isoformat()
+
+            if task["id"] in self._by_id:
+                self._schedule(task)
+
+    # ---------------------------------------------------------------
+    # Estagio de execucao (pool de threads)
+    # ---------------------------------------------------------------
+
+    def _push_timer(self, ts: float, kind: str, token: int):
+        """Agenda retry/timeout no heap de timers. Chamar com o lock."""
+        self._seq += 1
+        heapq.heappush(self._timers, (ts, self._seq, kind, token))
+        self._cond.notify()
+
+    def _dispatch(self, task: Dict, scheduled: float):
+        """Disparo vindo do heap: respeita max_concurrency da tarefa."""
+        limit = task.get("max_concurrency", 1) or 1
+        if self._running.get(task["id"], 0) >= limit:
+            self._counters["skipped_overlap"] += 1
+            log.warning(f"Tarefa {task['name']} ainda em execucao - disparo pulado")
+            return
+        self._submit(task, attempt=0, scheduled=scheduled)
+        self._drain_catchup(task)
 
-            time.sleep(30)  # Checa a cada 30 segundos
+    def _drain_catchup(self, task: Dict) -> bool:
+        """
+        catch-up "all": submete disparos perdidos ate o limite de concorrencia.
+        O restante sai em _finish_attempt, conforme as execucoes terminam.
+        Chamar com o lock. True se submeteu algum.
+        """
+        limit = task.get("max_concurrency", 1) or 1
+        submitted = False
+        while task.get("catchup_pending", 0) > 0 and self._running.get(task["id"], 0) < limit:
+            task["catchup_pending"] -= 1
+            self._submit(task, attempt=0, scheduled=time.time())
+            submitted = True
+        if "catchup_pending" in task and task["catchup_pending"] <= 0:
+            del task["catchup_pending"]
+        return submitted
+
+    def _submit(self, task: Dict, attempt: int, scheduled: float,
+                run_started: float = None):
+        """Enfileira uma tentativa no pool. Chamar com o lock."""
+        self._seq += 1
+        token = self._seq
+        self._attempts[token] = {"task_id": task["id"], "attempt": attempt,
+                                 "scheduled": scheduled, "started": None,
+                                 "run_started": run_started}
+        self._running[task["id"]] = self._running.get(task["id"], 0) + 1
+        self._queued += 1
+        self._counters["submitted"] += 1
+        self._pool.submit(self._run_attempt, token, task)
+
+    def _run_attempt(self, token: int, task: Dict):
+        """Roda numa thread do pool: chama os callbacks da tarefa."""
+        with self._cond:
+            self._queued -= 1
+            attempt = self._attempts.get(token)
+            if attempt is None:
+                return
+            attempt["started"] = time.time()
+            if attempt.get("run_started") is None:
+                attempt["run_started"] = attempt["started"]
+            self._lag.append(attempt["started"] - attempt["scheduled"])
+            timeout = task.get("timeout_seconds") or settings.SCHEDULER_TASK_TIMEOUT
+            self._push_timer(attempt["started"] + timeout, "timeout", token)
+
+        # Sucesso se algum callback completar (como antes)
+        success = not self._callbacks
+        error = None
+        for cb in list(self._callbacks):
+            try:
+                cb(task["command"], task["name"])
+                success = True
+            except Exception as e:
+                error = str(e)
+                log.error(f"Erro ao executar callback (tentativa "
+                          f"{self._attempts.get(token, {}).get('attempt', 0) + 1}): {e}")
+        self._finish_attempt(token, task, success, error=error)
 
-    def _fire_task(self, task: Dict):
-        """Dispara tarefa - chama callbacks."""
-        max_retries = task.get("max_retries", 2)
-        retry_count = 0
-        success = False
-
-        while retry_count <= max_retries and not success:
-            for cb in self._callbacks:
-                try:
-                    cb(task["command"], task["name"])
-                    success = True
-                except Exception as e:
-                    retry_count += 1
-                    log.error(f"Erro ao executar callback (tentativa {retry_count}): {e}")
-                    if retry_count <= max_retries:
-                        # Backoff exponencial
-                        wait = min(2 ** retry_count, 30)
-                        log.info(f"Retry em {wait}s...")
-                        time.sleep(wait)
+    def _finish_attempt(self, token: int, task: Dict, success: bool,
+                        error: str = None, timed_out: bool = False):
+        """
+        Fecha a tentativa quando o callback retorna: contabiliza e decide
+        retry (reagendado no heap). Tentativa que passou do timeout conta
+        como timeout mesmo se terminou bem.
+        """
+        with self._cond:
+            attempt = self._attempts.pop(token, None)
+            if attempt is None:
+                return
+            if attempt.get("timed_out"):
+                success, error, timed_out = False, "timeout", True
+            self._running[task["id"]] = max(0, self._running.get(task["id"], 1) - 1)
+            ended = time.time()
+            if attempt["started"] is not None:
+                self._durations.append(ended - attempt["started"])
+
+            n = attempt["attempt"]
             if success:
-                break
+                self._counters["completed"] += 1
+            elif n < task.get("max_retries", 2) and task["id"] in self._by_id:
+                # Backoff exponencial sem bloquear thread nenhuma
+                wait = min(2 ** (n + 1), RETRY_BACKOFF_MAX)
+                log.info(f"Retry de {task['name']} em {wait}s...")
+                self._counters["retries"] += 1
+                self._seq += 1
+                retry_token = self._seq
+                self._attempts[retry_token] = {"task_id": task["id"], "attempt": n + 1,
+                                               "scheduled": time.time() + wait,
+                                               "started": None, "pending_retry": True,
+                                               "run_started": attempt.get("run_started")}
+                self._push_timer(time.time() + wait, "retry", retry_token)
+                return
+            else:
+                self._counters["failed"] += 1
+            drained = (task["id"] in self._by_id and task.get("enabled")
+                       and self._drain_catchup(task))
+        if drained:
+            self._mark_dirty()
+
+        # Uma linha por execucao (inicio da 1a tentativa ate o resultado final)
+        self.ledger.record(
+            task["id"], task.get("name"),
+            started_at=attempt.get("run_started") or ended, ended_at=ended,
+            outcome="success" if success else ("timeout" if timed_out else "failed"),
+            retries=n, error=error, scheduled_at=attempt.get("scheduled"),
+        )
 
         # Log no observability
         try:
@@ -191,37 +570,116 @@ class TaskScheduler:
                     "task": task.get("name"),
                     "command": task.get("command", "")[:100],
                     "success": success,
-                    "retries": retry_count,
+                    "retries": n,
+                    "timed_out": timed_out,
+                    "error": error,
                 }
             )
         except Exception:
             pass
 
+    def _on_timeout(self, token: int):
+        """
+        Tentativa passou do timeout: so marca. A thread nao e morta, entao
+        o slot de concorrencia e o worker seguem ocupados e o retry (ou o
+        proximo disparo) so sai quando o callback retornar. Chamar com o lock.
+        """
+        attempt = self._attempts.get(token)
+        if attempt is None or attempt.get("pending_retry") or attempt.get("timed_out"):
+            return
+        attempt["timed_out"] = True
+        self._counters["timeouts"] += 1
+        task = self._by_id.get(attempt["task_id"])
+        name = task["name"] if task else attempt["task_id"]
+        timeout = task.get("timeout_seconds") if task else "?"
+        log.warning(f"Tarefa {name} excedeu timeout de {timeout}s (worker segue ocupado)")
+
+    def _on_retry(self, token: int, scheduled: float):
+        """Backoff venceu: re-enfileira a tentativa no pool."""
+        attempt = self._attempts.pop(token, None)
+        if attempt is None:
+            return
+        task = self._by_id.get(attempt["task_id"])
+        if task is None or (not task.get("enabled", True) and not task.get("one_shot")):
+            return  # Removida ou pausada durante o backoff
+        self._submit(task, attempt["attempt"], scheduled, attempt.get("run_started"))
+
+    def _fire_task(self, task: Dict):
+        """Dispara tarefa agora (fora do heap) pelo pool de execucao."""
+        with self._cond:
+            self._submit(task, attempt=0, scheduled=time.time())
+
+    def get_metrics(self) -> Dict:
+        """Metricas do estagio de execucao (fila, latencia, resultados)."""
+        with self._cond:
+            lag = list(self._lag)
+            durations = list(self._durations)
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running_jobs": sum(self._running.values()),
+                "overdue_jobs": sum(1 for a in self._attempts.values() if a.get("timed_out")),
+                "pending_retries": sum(1 for a in self._attempts.values() if a.get("pending_retry")),
+                **self._counters,
+                "lag_p50": _percentile(lag, 0.50),
+                "lag_p95": _percentile(lag, 0.95),
+                "duration_p50": _percentile(durations, 0.50),
+                "duration_p95": _percentile(durations, 0.95),
+            }
+
     # ===== Metodos v4 =====
 
     def pause_task(self, task_id: str) -> bool:
         """Pausa uma tarefa especifica."""
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["enabled"] = False
-                self._save_tasks()
-                log.info(f"Tarefa pausada: {task['name']}")
-                return True
-        return False
+        with self._cond:
+            task = self._by_id.get(task_id)
+            if task is None:
+                return False
+            task["enabled"] = False
+            self._schedule(task)   # Invalida a entrada no heap
+            self._cond.notify()
+        self._mark_dirty()
+        log.info(f"Tarefa pausada: {task['name']}")
+        return True
 
     def resume_task(self, task_id: str) -> bool:
         """Retoma uma tarefa pausada."""
-        for task in self.tasks:
-            if task["id"] == task_id:
-                task["enabled"] = True
-                # Recalcula next_run
-                if task.get("interval_minutes", 0) > 0:
-                    task["next_run"] = (datetime.now() + timedelta(
-                        minutes=task["interval_minutes"])).isoformat()
-                self._save_tasks()
-                log.info(f"Tarefa retomada: {task['name']}")
-                return True
-        return False
+        with self._cond:
+            task = self._by_id.get(task_id)
+            if task is None:
+                return False
+            task["enabled"] = True
+            # Recalcula next_run
+            if task.get("interval_minutes", 0) > 0 or task.get("cron"):
+                task["next_run"] = self._next_fire(task, datetime.now()).isoformat()
+            self._schedule(task)
+            self._cond.notify()
+        self._mark_dirty()
+        log.info(f"Tarefa retomada: {task['name']}")
+        return True
+
+    def get_run_history(self, task_id: str = None, outcome: str = None,
+                        since: str = None, min_duration: float = None,
+                        limit: int = 100) -> List[Dict]:
+        """
+        Execucoes registradas no ledger, mais recentes primeiro.
+
+        Args:
+            task_id: So desta tarefa
+            outcome: success, failed ou timeout
+            since: ISO datetime minimo de inicio
+            min_duration: So execucoes com duracao >= (segundos)
+        """
+        return self.ledger.query(task_id=task_id, outcome=outcome, since=since,
+                                 min_duration=min_duration, limit=limit)
+
+    def get_flaky_tasks(self, since: str = None, limit: int = 10) -> List[Dict]:
+        """Tarefas com falha, pela taxa de falha (agregado do ledger)."""
+        return [r for r in self.ledger.task_stats(since=since) if r["failures"]][:limit]
+
+    def get_slow_tasks(self, since: str = None, limit: int = 10) -> List[Dict]:
+        """Tarefas com maior duracao media (agregado do ledger)."""
+        return self.ledger.slowest(limit, since=since)
 
     def get_task_by_name(self, name: str) -> Optional[Dict]:
         """Busca tarefa pelo nome."""
@@ -241,6 +699,8 @@ class TaskScheduler:
             "paused": total - active,
             "total_runs": total_runs,
             "running": self.running,
+            "queue_depth": self._queued,
+            "running_jobs": sum(self._running.values()),
         }
 
 
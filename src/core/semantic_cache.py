@@ -0,0 +1,281 @@
+"""
+Semantic Cache - Cache de respostas por similaridade (parafrases).
+Complementa o cache exato (response_cache.py): "estrategia para oficina
+mecanica" e "estratégia p/ oficina mecânica" reaproveitam a mesma resposta.
+
+O prompt normalizado vira embedding com o modelo do SemanticSearch. Cada
+entrada pertence a um escopo = tipo do IntelligenceRouter.classify + system
+prompt, entao codigo nunca reutiliza resposta de negocio. Cada tipo tem
+seu limiar de similaridade. Opt-in (SEMANTIC_CACHE_ENABLED ou
+semantic_cache=True na chamada).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Optional
+from config.settings import settings
+from src.core.response_cache import CACHE_DB
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Limiar de similaridade coseno por tipo de tarefa (mais alto = mais estrito)
+DEFAULT_THRESHOLDS = {
+    "business": 0.92,
+    "creative": 0.95,
+    "general": 0.93,
+    "search": 0.96,
+    "quick": 0.97,
+    "code": 0.98,
+}
+
+# Validade por tipo (segundos); tipos fora daqui usam RESPONSE_CACHE_TTL
+TYPE_TTL = {
+    "search": 3600,  # Noticias envelhecem rapido
+}
+
+# Entradas mantidas por escopo (sai a mais antiga)
+MAX_ENTRIES_PER_SCOPE = 2000
+
+# Abreviacoes comuns em mensagens digitadas
+ABBREVIATIONS = {
+    "p/": "para", "pra": "para", "q": "que", "vc": "voce", "vcs": "voces",
+    "tb": "tambem", "tbm": "tambem", "pq": "porque", "c/": "com", "s/": "sem",
+    "msg": "mensagem", "qto": "quanto", "qdo": "quando",
+}
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS semantic_responses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_semantic_scope ON semantic_responses(scope, id);
+"""
+
+
+def normalize_prompt(text: str) -> str:
+    """Minusculas, sem acentos, abreviacoes expandidas e espacos colapsados."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(ABBREVIATIONS.get(word, word) for word in text.split())
+
+
+def parse_thresholds(spec: str) -> Dict[str, float]:
+    """'business:0.9,code:0.99' -> limiares (sobre os padroes)."""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for part in (spec or "").split(","):
+        if ":" not in part:
+            continue
+        name, value = part.split(":", 1)
+        try:
+            thresholds[name.strip()] = float(value)
+        except ValueError:
+            log.warning(f"Limiar invalido em SEMANTIC_CACHE_THRESHOLDS: {part}")
+    return thresholds
+
+
+class _Scope:
+    """Entradas de um escopo: matriz de embeddings + respostas."""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.vectors: List["np.ndarray"] = []
+        self.responses: List[str] = []
+        self.expires: List[float] = []
+        self._matrix = None
+
+    def add(self, entry_id: int, vector, response: str, expires: float) -> Optional[int]:
+        """Adiciona a entrada; retorna o id da mais antiga se ela saiu (limite do escopo)."""
+        self.ids.append(entry_id)
+        self.vectors.append(vector)
+        self.responses.append(response)
+        self.expires.append(expires)
+        self._matrix = None
+        if len(self.ids) > MAX_ENTRIES_PER_SCOPE:
+            evicted = self.ids[0]
+            self.remove(0)
+            return evicted
+        return None
+
+    def remove(self, i: int):
+        for items in (self.ids, self.vectors, self.responses, self.expires):
+            del items[i]
+        self._matrix = None
+
+    def best(self, query) -> tuple:
+        """(indice, similaridade) da entrada mais proxima."""
+        if self._matrix is None:
+            self._matrix = np.stack(self.vectors).astype(np.float32)
+        sims = self._matrix @ query
+        i = int(np.argmax(sims))
+        return i, float(sims[i])
+
+
+class SemanticCache:
+    """Cache de respostas por similaridade, escopado por tipo de tarefa."""
+
+    def __init__(self, db_file: str = None, embed: Callable[[str], Optional["np.ndarray"]] = None,
+                 thresholds: Dict[str, float] = None):
+        """
+        Args:
+            db_file: SQLite das entradas (padrao: data/cache/responses.db)
+            embed: Funcao texto -> embedding normalizado (padrao: modelo do
+                   SemanticSearch; None enquanto o modelo carrega)
+            thresholds: Limiar por tipo (padrao: SEMANTIC_CACHE_THRESHOLDS)
+        """
+        self.db_file = db_file or CACHE_DB
+        self._embed = embed
+        self.thresholds = thresholds or parse_thresholds(settings.SEMANTIC_CACHE_THRESHOLDS)
+        self._scopes: Dict[str, _Scope] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._metrics = {"hits": 0, "misses": 0, "stores": 0, "unavailable": 0,
+                         "hits_by_type": {}}
+        if np is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SQLITE_SCHEMA)
+            self._load()
+        except Exception as e:
+            log.warning(f"Cache semantico em disco indisponivel: {e}")
+            self._db = None
+
+    def _load(self):
+        now = time.time()
+        with self._db:
+            self._db.execute("DELETE FROM semantic_responses WHERE expires <= ?", (now,))
+        evicted = []
+        for entry_id, scope, blob, response, expires in self._db.execute(
+                "SELECT id, scope, embedding, response, expires FROM semantic_responses ORDER BY id"):
+            vector = np.frombuffer(blob, dtype=np.float32)
+            old = self._scopes.setdefault(scope, _Scope()).add(entry_id, vector, response, expires)
+            if old is not None:
+                evicted.append(old)
+        self._delete(evicted)
+
+    def _delete(self, entry_ids: List[int]):
+        """Apaga do disco as entradas que sairam da memoria (limite por escopo)."""
+        entry_ids = [(i,) for i in entry_ids if i is not None and i >= 0]
+        if not entry_ids or self._db is None:
+            return
+        try:
+            with self._db:
+                self._db.executemany("DELETE FROM semantic_responses WHERE id = ?", entry_ids)
+        except sqlite3.Error as e:
+            log.debug(f"Erro ao apagar do cache semantico: {e}")
+
+    @staticmethod
+    def scope_for(task_type: str, context: Optional[List[Dict]]) -> str:
+        """Escopo = tipo + hash dos system prompts."""
+        system = "\n".join(m.get("content", "") for m in (context or [])
+                           if isinstance(m, dict) and m.get("role") == "system")
+        digest = hashlib.sha1(system.encode("utf-8")).hexdigest()[:12]
+        return f"{task_type}:{digest}"
+
+    def _vector(self, prompt: str):
+        """Embedding do prompt normalizado (None se o modelo nao esta pronto)."""
+        if np is None:
+            return None
+        embed = self._embed
+        if embed is None:
+            from src.core.semantic_search import get_semantic_search
+            embed = get_semantic_search()._get_embedding
+        vector = embed(normalize_prompt(prompt))
+        if vector is None:
+            return None
+        return np.asarray(vector, dtype=np.float32)
+
+    def get(self, prompt: str, task_type: str, context: Optional[List[Dict]] = None) -> Optional[str]:
+        """Resposta de um prompt parecido no mesmo escopo, ou None."""
+        vector = self._vector(prompt)
+        if vector is None:
+            self._metrics["unavailable"] += 1
+            return None
+        scope_key = self.scope_for(task_type, context)
+        threshold = self.thresholds.get(task_type, max(self.thresholds.values()))
+        now = time.time()
+        with self._lock:
+            scope = self._scopes.get(scope_key)
+            while scope is not None and scope.ids:
+                i, similarity = scope.best(vector)
+                if scope.expires[i] <= now:
+                    scope.remove(i)  # Vencida: tenta a proxima mais parecida
+                    continue
+                if similarity >= threshold:
+                    self._metrics["hits"] += 1
+                    by_type = self._metrics["hits_by_type"]
+                    by_type[task_type] = by_type.get(task_type, 0) + 1
+                    log.debug(f"Cache semantico: {task_type} sim={similarity:.3f}")
+                    return scope.responses[i]
+                break
+            self._metrics["misses"] += 1
+            return None
+
+    def put(self, prompt: str, response: str, task_type: str,
+            context: Optional[List[Dict]] = None, ttl: float = None):
+        """Guarda a resposta do prompt no escopo do tipo."""
+        if not isinstance(response, str) or not response:
+            return
+        vector = self._vector(prompt)
+        if vector is None:
+            return
+        ttl = ttl or TYPE_TTL.get(task_type, settings.RESPONSE_CACHE_TTL)
+        scope_key = self.scope_for(task_type, context)
+        now = time.time()
+        with self._lock:
+            entry_id = -1
+            if self._db is not None:
+                try:
+                    with self._db:
+                        entry_id = self._db.execute(
+                            "INSERT INTO semantic_responses(scope, prompt, embedding, response, "
+                            "created, expires) VALUES (?, ?, ?, ?, ?, ?)",
+                            (scope_key, prompt[:2000], vector.tobytes(), response,
+                             now, now + ttl)).lastrowid
+                except sqlite3.Error as e:
+                    log.debug(f"Erro ao gravar cache semantico: {e}")
+            evicted = self._scopes.setdefault(scope_key, _Scope()).add(
+                entry_id, vector, response, now + ttl)
+            self._delete([evicted])
+            self._metrics["stores"] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._metrics["hits"] + self._metrics["misses"]
+            return {
+                **self._metrics,
+                "hits_by_type": dict(self._metrics["hits_by_type"]),
+                "hit_rate": round(self._metrics["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": sum(len(s.ids) for s in self._scopes.values()),
+                "scopes": len(self._scopes),
+                "thresholds": dict(self.thresholds),
+            }
+
+
+# Singleton
+_semantic_cache = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Retorna singleton do SemanticCache."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+    return _semantic_cache
@@ -1,30 +1,59 @@
 """
 Semantic Search - Busca hibrida keyword + embeddings.
 Fallback para keyword se sentence-transformers nao instalado.
+O modelo de embeddings carrega em background: ate ficar pronto, as buscas
+retornam resultados so keyword.
 Item 5 do plano arquitetural.
 """
 
+import importlib.util
+import os
 import re
 import math
+import threading
 from typing import Dict, List, Optional, Tuple
 from collections import Counter
 from src.utils.logger import get_logger
+from src.core.embedding_cache import EmbeddingCache, DEFAULT_MAX_BYTES, _cache_key
+from src.core.ann_index import (
+    FlatIndex, VectorIndex, create_index, load_index, resolve_backend,
+)
+from src.core.onnx_encoder import onnx_available
 
 log = get_logger(__name__)
 
-# Tenta importar sentence-transformers (OPCIONAL)
-_embeddings_available = False
-_model = None
-
+# Checa dependencias OPCIONAIS sem importar (sentence-transformers/torch
+# levam segundos; o import real acontece na thread de carga do modelo)
 try:
-    from sentence_transformers import SentenceTransformer
     import numpy as np
-    _embeddings_available = True
-    log.info("sentence-transformers disponivel - busca semantica ativada")
 except ImportError:
+    np = None
+
+_sentence_transformers_available = importlib.util.find_spec("sentence_transformers") is not None
+_onnx_available = onnx_available()
+_embeddings_available = np is not None and (_sentence_transformers_available or _onnx_available)
+
+if _embeddings_available:
+    log.info("embeddings disponiveis - busca semantica ativada")
+else:
     log.info("sentence-transformers nao instalado - usando busca por keyword")
 
 
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Encoders: "torch" (sentence-transformers) ou "onnx" (int8, so CPU)
+EMBEDDING_ENCODERS = ("torch", "onnx")
+
+# Textos por chamada ao model.encode
+ENCODE_BATCH_SIZE = 64
+
+# Corpus indexado: troca a busca exata pelo indice ANN a partir desse tamanho
+ANN_MIN_DOCS = 20000
+
+# Persiste o indice ANN apos esse numero de alteracoes
+ANN_SAVE_EVERY = 5000
+
+
 # Stop words PT-BR para busca keyword
 STOP_WORDS_PTBR = {
     "a", "o", "e", "de", "do", "da", "em", "um", "uma", "para", "com",
@@ -49,36 +78,114 @@ def _tokenize(text: str) -> List[str]:
     return [w for w in words if w not in STOP_WORDS_PTBR]
 
 
-def _keyword_score(query_tokens: List[str], doc_tokens: List[str]) -> float:
+# Parametros BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def _bm25_idf(n_docs: int, df: int) -> float:
+    """IDF do BM25 (variante sempre positiva)."""
+    return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+def _bm25_term(tf: int, doc_len: int, avg_dl: float) -> float:
+    """Parte do BM25 que depende da frequencia do termo no documento."""
+    return tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * (doc_len / avg_dl)))
+
+
+def _keyword_score(query_tokens: List[str], doc_tokens: List[str],
+                   idf: Dict[str, float] = None, avg_dl: float = 50.0) -> float:
     """
-    Calcula score BM25-like entre query e documento.
-    Simplificado para performance.
+    Calcula score BM25 entre query e documento.
+
+    Args:
+        idf: IDF por termo do corpus (sem ele, idf = 1.0)
+        avg_dl: Tamanho medio dos documentos do corpus
     """
     if not query_tokens or not doc_tokens:
         return 0.0
 
     doc_counter = Counter(doc_tokens)
     doc_len = len(doc_tokens)
-    avg_dl = 50.0  # Estimativa de tamanho medio
-
-    k1 = 1.5
-    b = 0.75
     score = 0.0
 
     for term in query_tokens:
         tf = doc_counter.get(term, 0)
         if tf == 0:
             continue
+        term_idf = idf.get(term, 1.0) if idf else 1.0
+        score += term_idf * _bm25_term(tf, doc_len, avg_dl or 1.0)
 
-        # IDF simplificado (assume que termos da query sao importantes)
-        idf = 1.0
+    return score
 
-        # BM25 formula simplificada
-        numerator = tf * (k1 + 1)
-        denominator = tf + k1 * (1 - b + b * (doc_len / avg_dl))
-        score += idf * (numerator / denominator)
 
-    return score
+class BM25Index:
+    """
+    Indice invertido para o modo corpus indexado do SemanticSearch.
+
+    Documentos sao tokenizados uma vez no add; a busca so percorre as
+    postings dos termos da query, com IDF e tamanho medio reais do corpus.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}   # termo -> {doc_id: tf}
+        self.doc_lens: Dict[str, int] = {}
+        self.docs: Dict[str, Tuple[Dict, str]] = {}     # doc_id -> (doc, texto)
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @property
+    def avg_dl(self) -> float:
+        return self._total_len / len(self.doc_lens) if self.doc_lens else 1.0
+
+    def add(self, doc_id: str, doc: Dict, text: str):
+        """Adiciona (ou substitui) um documento."""
+        tokens = _tokenize(text)
+        with self._lock:
+            if doc_id in self.docs:
+                self._remove(doc_id)
+            self.docs[doc_id] = (doc, text)
+            self.doc_lens[doc_id] = len(tokens)
+            self._total_len += len(tokens)
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str) -> bool:
+        """Remove documento do indice."""
+        with self._lock:
+            if doc_id not in self.docs:
+                return False
+            self._remove(doc_id)
+            return True
+
+    def _remove(self, doc_id: str):
+        _, text = self.docs.pop(doc_id)
+        self._total_len -= self.doc_lens.pop(doc_id, 0)
+        for term in set(_tokenize(text)):
+            plist = self.postings.get(term)
+            if plist is not None:
+                plist.pop(doc_id, None)
+                if not plist:
+                    del self.postings[term]
+
+    def score(self, query_tokens: List[str]) -> Dict[str, float]:
+        """Scores BM25 so dos documentos que contem algum termo da query."""
+        scores: Dict[str, float] = {}
+        with self._lock:
+            n_docs = len(self.docs)
+            avg_dl = self.avg_dl
+            for term in set(query_tokens):
+                plist = self.postings.get(term)
+                if not plist:
+                    continue
+                idf = _bm25_idf(n_docs, len(plist))
+                for doc_id, tf in plist.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + \
+                        idf * _bm25_term(tf, self.doc_lens[doc_id], avg_dl)
+        return scores
 
 
 def _exact_match_bonus(query: str, text: str) -> float:
@@ -91,75 +198,273 @@ def _exact_match_bonus(query: str, text: str) -> float:
     return 0.0
 
 
+class _ModelLoader:
+    """Carrega um encoder em thread daemon; compartilhado entre instancias."""
+
+    def __init__(self, encoder: str):
+        self.encoder = encoder
+        self.model = None
+        self.error: Optional[Exception] = None
+        self.ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"embedding-loader-{encoder}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            log.info(f"Carregando modelo de embeddings ({self.encoder}) em background...")
+            if self.encoder == "onnx":
+                from src.core.onnx_encoder import OnnxEncoder
+                self.model = OnnxEncoder()
+            else:
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer(EMBEDDING_MODEL)
+            log.info("Modelo de embeddings carregado")
+        except Exception as e:
+            self.error = e
+            log.warning(f"Falha ao carregar modelo de embeddings: {e}")
+        finally:
+            self.ready.set()
+
+    @property
+    def state(self) -> str:
+        if not self.ready.is_set():
+            return "loading"
+        return "ready" if self.model is not None else "failed"
+
+
+_loaders: Dict[str, _ModelLoader] = {}
+_loaders_lock = threading.Lock()
+
+
+def _get_loader(encoder: str) -> _ModelLoader:
+    """Loader (unico por encoder) - dispara a carga na primeira chamada."""
+    with _loaders_lock:
+        loader = _loaders.get(encoder)
+        if loader is None:
+            loader = _loaders[encoder] = _ModelLoader(encoder)
+        return loader
+
+
+def resolve_encoder(encoder: str = None) -> str:
+    """'auto' = onnx se onnxruntime/tokenizers instalados, senao torch."""
+    encoder = (encoder or os.getenv("EMBEDDING_ENCODER", "torch")).lower()
+    if encoder == "auto":
+        return "onnx" if _onnx_available else "torch"
+    if encoder == "onnx" and not _onnx_available:
+        log.warning("onnxruntime/tokenizers nao instalados - usando sentence-transformers")
+        return "torch"
+    if encoder not in EMBEDDING_ENCODERS:
+        raise ValueError(f"Encoder de embeddings desconhecido: {encoder}")
+    return encoder
+
+
 class SemanticSearch:
     """
     Busca hibrida: keyword + embeddings (se disponivel).
     Funciona sem sentence-transformers (fallback keyword puro).
+
+    Dois modos:
+        - ad-hoc: search(query, documents) pontua a lista recebida
+        - corpus indexado: add_documents() uma vez, depois search(query)
     """
 
-    def __init__(self, use_embeddings: bool = True):
+    def __init__(self, use_embeddings: bool = True, cache_dir: str = None,
+                 cache_max_bytes: int = DEFAULT_MAX_BYTES, ann_backend: str = None,
+                 ann_min_docs: int = ANN_MIN_DOCS, ann_effort: int = None,
+                 ann_dir: str = None, encoder: str = None):
         """
         Args:
             use_embeddings: Se True, tenta usar embeddings.
                           Se False ou indisponivel, usa keyword.
+                          O modelo carrega em background (ver wait_until_ready)
+            cache_dir: Diretorio do cache persistente de embeddings
+                       (padrao: data/cache/embeddings)
+            cache_max_bytes: Orcamento em bytes do cache (eviction LRU)
+            ann_backend: Indice ANN do corpus indexado: "auto", "ivf",
+                         "hnsw" ou None (sempre busca exata)
+            ann_min_docs: Tamanho do corpus a partir do qual usa o ANN
+            ann_effort: Knob recall/latencia (nprobe no IVF, ef no HNSW)
+            ann_dir: Diretorio do indice ANN (padrao: data/cache/ann/<backend>)
+            encoder: "torch" (sentence-transformers), "onnx" (int8, so CPU)
+                     ou "auto" (padrao: EMBEDDING_ENCODER ou torch)
         """
         self.use_embeddings = use_embeddings and _embeddings_available
-        self._model = None
-        self._embeddings_cache: Dict[str, list] = {}
-
+        self.encoder = resolve_encoder(encoder) if self.use_embeddings else None
+        # Vetores de encoders diferentes nao se misturam no cache
+        self.model_name = EMBEDDING_MODEL if self.encoder != "onnx" else f"{EMBEDDING_MODEL}-onnx-int8"
+        self._loader: Optional[_ModelLoader] = None
+        self._embeddings_cache: Optional[EmbeddingCache] = None
         if self.use_embeddings:
-            try:
-                self._load_model()
-            except Exception as e:
-                log.warning(f"Falha ao carregar modelo de embeddings: {e}")
-                self.use_embeddings = False
-
-    def _load_model(self):
-        """Carrega modelo de embeddings (lazy load)."""
-        global _model
-        if _model is None:
-            log.info("Carregando modelo de embeddings...")
-            _model = SentenceTransformer('all-MiniLM-L6-v2')
-            log.info("Modelo de embeddings carregado")
-        self._model = _model
-
-    def _get_embedding(self, text: str) -> Optional[list]:
-        """Gera embedding para texto."""
-        if not self.use_embeddings or not self._model:
-            return None
-
-        if text in self._embeddings_cache:
-            return self._embeddings_cache[text]
+            self._embeddings_cache = EmbeddingCache(
+                self.model_name, cache_dir=cache_dir, max_bytes=cache_max_bytes)
+        self._index = BM25Index()
+        self._pending_embed: Dict[str, str] = {}  # doc_id -> texto ainda sem embedding
+
+        self.ann_backend = resolve_backend(ann_backend) if ann_backend else None
+        self.ann_min_docs = ann_min_docs
+        self.ann_effort = ann_effort
+        self._ann_dir = ann_dir
+        self._vectors: Optional[VectorIndex] = None
+        self._purge_stale = False  # Indice do disco pode ter ids fora do corpus atual
+        if self.use_embeddings:
+            if self.ann_backend:
+                self._vectors = load_index(self.ann_backend, ann_dir)
+                self._purge_stale = self._vectors is not None
+            if self._vectors is None:
+                self._vectors = FlatIndex()
 
-        try:
-            embedding = self._model.encode(text).tolist()
-            # Cache limitado
-            if len(self._embeddings_cache) > 1000:
-                # Remove metade do cache (FIFO simples)
-                keys = list(self._embeddings_cache.keys())
-                for k in keys[:500]:
-                    del self._embeddings_cache[k]
-            self._embeddings_cache[text] = embedding
-            return embedding
-        except Exception as e:
-            log.debug(f"Erro ao gerar embedding: {e}")
-            return None
+        if self.use_embeddings:
+            self._loader = _get_loader(self.encoder)
 
-    def _cosine_similarity(self, a: list, b: list) -> float:
-        """Calcula similaridade coseno entre dois vetores."""
-        if not a or not b or len(a) != len(b):
-            return 0.0
+    @property
+    def _model(self):
+        """Encoder carregado, ou None enquanto carrega (ou se falhou)."""
+        return self._loader.model if self._loader is not None else None
 
-        dot = sum(x * y for x, y in zip(a, b))
-        norm_a = math.sqrt(sum(x * x for x in a))
-        norm_b = math.sqrt(sum(x * x for x in b))
+    @property
+    def model_ready(self) -> bool:
+        return self._model is not None
 
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Bloqueia ate o modelo carregar. Retorna se embeddings estao ativos."""
+        if self._loader is None:
+            return False
+        self._loader.ready.wait(timeout)
+        return self.model_ready
 
-        return dot / (norm_a * norm_b)
+    def _encode_batch(self, texts: List[str]) -> Optional["np.ndarray"]:
+        """
+        Embeddings normalizados (float32) para varios textos.
+        So os textos fora do cache persistente vao ao modelo, em um unico
+        encode em lote; o resultado e gravado no cache.
+        """
+        if not self.use_embeddings or self._model is None:
+            return None  # Modelo ainda carregando: chamador cai no keyword
 
-    def search(self, query: str, documents: List[Dict],
+        hits = self._embeddings_cache.get_many(texts) if self._embeddings_cache is not None else {}
+        missing = list(dict.fromkeys(t for t in texts if t not in hits))
+        if missing:
+            try:
+                encoded = self._model.encode(
+                    missing, batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True,
+                    normalize_embeddings=True, show_progress_bar=False,
+                ).astype(np.float32)
+            except Exception as e:
+                log.debug(f"Erro ao gerar embeddings: {e}")
+                return None
+            hits.update(zip(missing, encoded))
+            if self._embeddings_cache is not None:
+                try:
+                    self._embeddings_cache.put_many(missing, encoded)
+                except Exception as e:
+                    log.debug(f"Erro ao gravar cache de embeddings: {e}")
+
+        return np.stack([hits[t] for t in texts]) if texts else None
+
+    def _get_embedding(self, text: str) -> Optional["np.ndarray"]:
+        """Gera embedding (normalizado) para texto."""
+        vectors = self._encode_batch([text])
+        return vectors[0] if vectors is not None else None
+
+    def _flush_pending_embeddings(self):
+        """Codifica em lote os documentos indexados que ainda nao tem embedding."""
+        if not self._pending_embed or self._vectors is None or not self.model_ready:
+            return
+        pending, self._pending_embed = self._pending_embed, {}
+        if self._purge_stale:
+            self._drop_stale_vectors()
+        # Documentos ja presentes com o mesmo texto (indice ANN carregado do disco)
+        keys = {d: _cache_key(self.model_name, t) for d, t in pending.items()}
+        doc_ids = [d for d in pending if self._vectors.keys.get(d) != keys[d]]
+        for i in range(0, len(doc_ids), ENCODE_BATCH_SIZE * 16):
+            chunk = doc_ids[i:i + ENCODE_BATCH_SIZE * 16]
+            vectors = self._encode_batch([pending[d] for d in chunk])
+            if vectors is None:
+                # Modelo falhou - tenta de novo na proxima busca
+                self._pending_embed.update({d: pending[d] for d in doc_ids[i:]})
+                break
+            self._vectors.add(chunk, vectors, [keys[d] for d in chunk])
+        self._maybe_upgrade_index()
+        if self._vectors.changes >= ANN_SAVE_EVERY:
+            self.save_index()
+
+    def _drop_stale_vectors(self):
+        """Tira do indice carregado do disco os ids que nao estao no corpus."""
+        self._purge_stale = False
+        stale = [d for d in list(self._vectors.keys) if d not in self._index.docs]
+        for doc_id in stale:
+            self._vectors.remove(doc_id)
+        if stale:
+            log.info(f"SemanticSearch: {len(stale)} vetores fora do corpus removidos do indice")
+
+    def _maybe_upgrade_index(self):
+        """Migra da busca exata para o indice ANN quando o corpus cresce."""
+        if not self.ann_backend or not isinstance(self._vectors, FlatIndex) \
+                or len(self._vectors) < self.ann_min_docs:
+            return
+        doc_ids, vectors = self._vectors.items()
+        ann = create_index(self.ann_backend, effort=self.ann_effort)
+        ann.add(doc_ids, vectors, [self._vectors.keys[d] for d in doc_ids])
+        self._vectors = ann
+        log.info(f"SemanticSearch: {len(doc_ids)} documentos migrados para indice {ann.backend}")
+        self.save_index()
+
+    def save_index(self):
+        """Persiste o indice ANN (busca exata nao precisa: vem do cache de embeddings)."""
+        if self._vectors is None:
+            return
+        try:
+            self._vectors.save(self._ann_dir)
+        except Exception as e:
+            log.warning(f"Erro ao salvar indice ANN: {e}")
+
+    # ---------------------------------------------------------------
+    # Corpus indexado
+    # ---------------------------------------------------------------
+
+    def add_document(self, doc_id: str, doc: Dict, text_field: str = "content"):
+        """Registra documento no corpus indexado (substitui se ja existe)."""
+        text = doc.get(text_field, "")
+        if text:
+            self._index.add(str(doc_id), doc, text)
+            if self._vectors is not None:
+                # Embedding gerado em lote na proxima busca
+                self._pending_embed[str(doc_id)] = text[:500]  # Limita texto
+
+    def add_documents(self, documents: List[Dict], id_field: str = "id",
+                      text_field: str = "content") -> int:
+        """Registra varios documentos. Retorna quantos foram indexados."""
+        count = 0
+        for i, doc in enumerate(documents):
+            if doc.get(text_field):
+                self.add_document(doc.get(id_field, i), doc, text_field)
+                count += 1
+        return count
+
+    def remove_document(self, doc_id: str) -> bool:
+        """Remove documento do corpus indexado."""
+        doc_id = str(doc_id)
+        if self._vectors is not None:
+            self._pending_embed.pop(doc_id, None)
+            self._vectors.remove(doc_id)
+        return self._index.remove(doc_id)
+
+    @staticmethod
+    def _score(query: str, text: str, kw_score: float,
+               sem_score: Optional[float] = None) -> float:
+        """Combina keyword + semantico + match exato em um score final."""
+        # Bonus match exato
+        exact_bonus = _exact_match_bonus(query, text)
+
+        # Score final: combina keyword + semantico + exact
+        if sem_score is not None:
+            # 40% keyword + 40% semantico + 20% exact
+            return (kw_score * 0.4) + (sem_score * 5.0 * 0.4) + (exact_bonus * 0.2)
+        # 70% keyword + 30% exact
+        return (kw_score * 0.7) + (exact_bonus * 0.3)
+
+    def search(self, query: str, documents: List[Dict] = None,
                text_field: str = "content", limit: int = 10,
                min_score: float = 0.1) -> List[Tuple[Dict, float]]:
         """
@@ -167,7 +472,8 @@ class SemanticSearch:
 
         Args:
             query: Texto de busca
-            documents: Lista de dicts com campo texto
+            documents: Lista de dicts com campo texto. Se None, busca no
+                       corpus indexado (add_documents)
             text_field: Nome do campo de texto nos documentos
             limit: Maximo de resultados
             min_score: Score minimo para incluir
@@ -175,50 +481,110 @@ class SemanticSearch:
         Returns:
             Lista de (documento, score) ordenada por relevancia
         """
-        if not query or not documents:
+        if not query:
+            return []
+        if documents is None:
+            return self._search_index(query, limit, min_score)
+        if not documents:
             return []
 
         query_tokens = _tokenize(query)
         results = []
 
-        # Gera embedding da query (se disponivel)
-        query_embedding = self._get_embedding(query) if self.use_embeddings else None
+        # Estatisticas do corpus recebido (IDF e tamanho medio reais)
+        texts = [doc.get(text_field, "") for doc in documents]
+        doc_tokens = [_tokenize(t) if t else [] for t in texts]
+        n_docs = sum(1 for t in texts if t)
+        avg_dl = (sum(len(t) for t in doc_tokens) / n_docs) if n_docs else 1.0
+        query_terms = set(query_tokens)
+        df = Counter(term for tokens in doc_tokens for term in query_terms & set(tokens))
+        idf = {term: _bm25_idf(n_docs, df[term]) for term in query_terms}
+
+        # Score semantico: embeddings em lote + um produto matriz-vetor
+        sem_scores = None
+        if self.use_embeddings:
+            query_embedding = self._get_embedding(query)
+            valid = [i for i, t in enumerate(texts) if t]
+            doc_matrix = self._encode_batch([texts[i][:500] for i in valid])  # Limita texto
+            if query_embedding is not None and doc_matrix is not None:
+                sem_scores = dict(zip(valid, (doc_matrix @ query_embedding).tolist()))
 
-        for doc in documents:
-            text = doc.get(text_field, "")
+        for i, (doc, text, tokens) in enumerate(zip(documents, texts, doc_tokens)):
             if not text:
                 continue
 
-            # Score keyword (BM25-like)
-            doc_tokens = _tokenize(text)
-            kw_score = _keyword_score(query_tokens, doc_tokens)
-
-            # Bonus match exato
-            exact_bonus = _exact_match_bonus(query, text)
-
-            # Score semantico (embeddings)
-            sem_score = 0.0
-            if query_embedding:
-                doc_embedding = self._get_embedding(text[:500])  # Limita texto
-                if doc_embedding:
-                    sem_score = self._cosine_similarity(query_embedding, doc_embedding)
-
-            # Score final: combina keyword + semantico + exact
-            if self.use_embeddings and query_embedding:
-                # 40% keyword + 40% semantico + 20% exact
-                final_score = (kw_score * 0.4) + (sem_score * 5.0 * 0.4) + (exact_bonus * 0.2)
-            else:
-                # 70% keyword + 30% exact
-                final_score = (kw_score * 0.7) + (exact_bonus * 0.3)
+            # Score keyword (BM25)
+            kw_score = _keyword_score(query_tokens, tokens, idf=idf, avg_dl=avg_dl)
+            sem_score = sem_scores.get(i, 0.0) if sem_scores is not None else None
+            final_score = self._score(query, text, kw_score, sem_score)
 
             if final_score >= min_score:
                 results.append((doc, final_score))
 
-        # Ordena por score
+        # Top `limit` por argpartition (O(n)); so esses sao ordenados
+        if np is not None and 0 < limit < len(results):
+            scores = np.fromiter((score for _, score in results), dtype=np.float64,
+                                 count=len(results))
+            results = [results[i] for i in np.argpartition(-scores, limit - 1)[:limit]]
         results.sort(key=lambda x: x[1], reverse=True)
 
         return results[:limit]
 
+    def _search_index(self, query: str, limit: int,
+                      min_score: float) -> List[Tuple[Dict, float]]:
+        """Busca no corpus indexado: keyword so toca as postings da query."""
+        kw_scores = self._index.score(_tokenize(query))
+
+        query_embedding = None
+        if self.use_embeddings and self.model_ready:
+            self._flush_pending_embeddings()
+            query_embedding = self._get_embedding(query)
+
+        if query_embedding is None:
+            results = []
+            for doc_id, kw_score in kw_scores.items():
+                entry = self._index.docs.get(doc_id)
+                if not entry:
+                    continue
+                doc, text = entry
+                final_score = self._score(query, text, kw_score)
+                if final_score >= min_score:
+                    results.append((doc, final_score))
+            results.sort(key=lambda x: x[1], reverse=True)
+            return results[:limit]
+
+        # Candidatos semanticos: top-k do indice de vetores (exato ou ANN).
+        # Sobra para ids do indice que ja sairam do corpus.
+        sem_scores = dict(self._vectors.search(
+            query_embedding, limit + 10, effort=self.ann_effort))
+        # Documentos com termos da query entram mesmo fora do top-k semantico
+        missing = [d for d in kw_scores if d not in sem_scores]
+        if missing:
+            vecs = self._vectors.get_vectors(missing)
+            if vecs:
+                sims = np.stack(list(vecs.values())) @ query_embedding
+                sem_scores.update(zip(vecs.keys(), sims.tolist()))
+
+        results = []
+        for doc_id in sem_scores.keys() | kw_scores.keys():
+            entry = self._index.docs.get(doc_id)
+            if not entry:
+                continue
+            sim = sem_scores.get(doc_id)
+            kw_score = kw_scores.get(doc_id)
+            if sim is None:
+                # Sem vetor ainda (embedding pendente): score so keyword
+                score = self._score(query, entry[1], kw_score)
+            else:
+                # 40% de sem * 5.0; keyword + exact so para documentos com termos da query
+                score = sim * (5.0 * 0.4)
+                if kw_score is not None:
+                    score += self._score(query, entry[1], kw_score, 0.0)
+            if score >= min_score:
+                results.append((entry[0], score))
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:limit]
+
     def find_similar(self, text: str, documents: List[Dict],
                      text_field: str = "content", limit: int = 5) -> List[Tuple[Dict, float]]:
         """
@@ -241,8 +607,13 @@ class SemanticSearch:
         return {
             "embeddings_available": _embeddings_available,
             "embeddings_active": self.use_embeddings,
-            "model": "all-MiniLM-L6-v2" if self.use_embeddings else "keyword-only",
-            "cache_size": len(self._embeddings_cache),
+            "model": self.model_name if self.use_embeddings else "keyword-only",
+            "encoder": self.encoder,
+            "model_state": self._loader.state if self._loader is not None else "disabled",
+            "cache_size": len(self._embeddings_cache) if self._embeddings_cache is not None else 0,
+            "cache": self._embeddings_cache.get_stats() if self._embeddings_cache is not None else {},
+            "indexed_docs": len(self._index),
+            "vector_index": self._vectors.get_stats() if self._vectors is not None else {},
         }
 
 
@@ -251,8 +622,9 @@ _search_engine = None
 
 
 def get_semantic_search() -> SemanticSearch:
-    """Retorna singleton do SemanticSearch."""
+    """Retorna singleton do SemanticSearch (indice ANN via SEMANTIC_ANN_BACKEND)."""
     global _search_engine
     if _search_engine is None:
-        _search_engine = SemanticSearch()
+        _search_engine = SemanticSearch(
+            ann_backend=os.getenv("SEMANTIC_ANN_BACKEND", "").lower() or None)
     return _search_engine
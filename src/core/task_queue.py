@@ -1,16 +1,18 @@
 """
 Task Queue - Fila de tarefas com state machine.
-Gerencia tarefas multi-step com estados e persistencia.
+Gerencia tarefas multi-step com estados e persistencia (SQLite indexado).
 Item 15 do plano arquitetural.
 """
 
 import json
 import os
+import sqlite3
+import threading
 import time
 from enum import Enum
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from src.utils.logger import get_logger
 
@@ -85,44 +87,151 @@ class Task:
         return self.state in ("pending", "in_progress", "waiting_confirm")
 
 
-class TaskQueue:
-    """Fila de tarefas com estado. Persiste em JSON."""
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL,
+    parent_id TEXT,
+    ord INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    rev INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(state, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_id, ord) WHERE parent_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_tasks_updated ON tasks(updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_rev ON tasks(rev);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+ACTIVE_STATES = ("pending", "in_progress", "waiting_confirm")
+TERMINAL_STATES = ("done", "failed", "cancelled")
+KANBAN_STATES = ("pending", "in_progress", "waiting_confirm", "done", "failed")
+KANBAN_COLUMN_LIMIT = 20
 
-    def __init__(self, tasks_file: str = None):
+
+class TaskQueue:
+    """
+    Fila de tarefas com estado. Persiste em SQLite (task_queue.db).
+
+    Cada task e uma linha (colunas indexadas state / parent_id / updated_at
+    + o dict completo em `data`): create e transicao gravam so a propria
+    linha. Contagens por estado ficam em memoria; o Kanban so recalcula
+    as colunas cujo estado mudou. `rev` cresce a cada escrita e permite
+    buscar so o que mudou (get_changes). O task_queue.json antigo e
+    importado na primeira abertura.
+    """
+
+    def __init__(self, tasks_file: str = None, db_file: str = None):
         self.tasks_file = tasks_file or TASKS_FILE
-        self.tasks: Dict[str, Task] = {}
+        self.db_file = db_file or os.path.splitext(self.tasks_file)[0] + ".db"
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._counts: Dict[str, int] = {}
+        self._rev = 0
+        self._next_seq = 1
+        self._kanban: Dict[str, List[Dict]] = {state: [] for state in KANBAN_STATES}
+        self._kanban_dirty = set(KANBAN_STATES)
         self._load()
 
     def _load(self):
-        """Carrega tarefas do arquivo."""
+        """Abre task_queue.db, migra o JSON na primeira vez e carrega contadores."""
         try:
-            if os.path.exists(self.tasks_file):
-                with open(self.tasks_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                for task_data in data:
-                    task = Task.from_dict(task_data)
-                    self.tasks[task.id] = task
-                log.info(f"TaskQueue: {len(self.tasks)} tarefas carregadas")
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SQLITE_SCHEMA)
+
+            migrated = self._db.execute(
+                "SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+            if not migrated:
+                self._migrate_json()
+
+            self._reload_counters()
+            log.info(f"TaskQueue: {len(self)} tarefas no banco")
         except Exception as e:
             log.error(f"Erro ao carregar task queue: {e}")
-            self.tasks = {}
 
-    def _save(self):
-        """Salva tarefas no arquivo."""
-        try:
-            os.makedirs(os.path.dirname(self.tasks_file), exist_ok=True)
-            data = [task.to_dict() for task in self.tasks.values()]
-            with open(self.tasks_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            log.error(f"Erro ao salvar task queue: {e}")
+    def _migrate_json(self):
+        """Importa task_queue.json para o SQLite (uma vez, em uma transacao)."""
+        count = 0
+        if os.path.exists(self.tasks_file):
+            with open(self.tasks_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._db:
+                for task_data in data:
+                    self._rev += 1
+                    self._upsert_row(Task.from_dict(task_data))
+                    count += 1
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_from', ?)",
+                (self.tasks_file,))
+        if count:
+            log.info(f"TaskQueue: {count} tarefas migradas de {self.tasks_file}")
+
+    def _reload_counters(self):
+        """Contagem por estado, ultimo rev e proximo seq (via indices)."""
+        with self._lock:
+            self._counts = {
+                row["state"]: row["n"] for row in self._db.execute(
+                    "SELECT state, COUNT(*) AS n FROM tasks GROUP BY state")
+            }
+            row = self._db.execute(
+                "SELECT COALESCE(MAX(rev), 0) AS rev, COALESCE(MAX(seq), 0) AS seq "
+                "FROM tasks").fetchone()
+            self._rev = max(self._rev, row["rev"])
+            self._next_seq = row["seq"] + 1
+            self._kanban_dirty = set(KANBAN_STATES)
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> Task:
+        return Task.from_dict(json.loads(row["data"]))
+
+    def _upsert_row(self, task: Task):
+        self._db.execute(
+            "INSERT INTO tasks(id, state, parent_id, ord, created_at, updated_at, rev, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET state = excluded.state, "
+            "parent_id = excluded.parent_id, ord = excluded.ord, "
+            "updated_at = excluded.updated_at, rev = excluded.rev, data = excluded.data",
+            (task.id, task.state, task.parent_id, task.order, task.created_at,
+             task.updated_at, self._rev,
+             json.dumps(task.to_dict(), ensure_ascii=False)),
+        )
 
-    def create_task(self, title: str, description: str = "",
-                    command: str = "", agent: str = "general_agent",
-                    parent_id: str = None, order: int = 0) -> Task:
-        """Cria nova tarefa."""
-        task_id = f"task_{int(time.time())}_{len(self.tasks)}"
-        task = Task(
+    def _query(self, sql: str, params: tuple = ()) -> List[Task]:
+        with self._lock:
+            return [self._row_to_task(row) for row in self._db.execute(sql, params)]
+
+    def close(self):
+        """Fecha o banco."""
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+    @property
+    def tasks(self) -> Dict[str, Task]:
+        """Todas as tasks por id (le o banco inteiro - prefira as consultas)."""
+        return {t.id: t for t in self._query("SELECT data FROM tasks ORDER BY seq")}
+
+    # ---------------------------------------------------------------
+    # Escrita
+    # ---------------------------------------------------------------
+
+    def _new_task(self, title: str, description: str, command: str,
+                  agent: str, parent_id: Optional[str], order: int) -> Task:
+        task_id = f"task_{int(time.time())}_{self._next_seq}"
+        self._next_seq += 1
+        return Task(
             id=task_id,
             title=title,
             description=description,
@@ -131,40 +240,82 @@ class TaskQueue:
             parent_id=parent_id,
             order=order,
         )
-        self.tasks[task_id] = task
-        self._save()
 
+    def _insert(self, tasks: List[Task]) -> bool:
+        """Grava tasks novas em uma transacao e atualiza contadores."""
+        try:
+            with self._lock, self._db:
+                for task in tasks:
+                    self._rev += 1
+                    self._upsert_row(task)
+        except Exception as e:
+            log.error(f"Erro ao salvar task queue: {e}")
+            return False
+        with self._lock:
+            for task in tasks:
+                self._counts[task.state] = self._counts.get(task.state, 0) + 1
+                self._kanban_dirty.add(task.state)
+        return True
+
+    def _log_created(self, task: Task):
         # Log no observability
         try:
             from src.core.observability import get_event_log
             get_event_log().log_event(
-                "task_created", agent=agent,
-                data={"task_id": task_id, "title": title},
-                task_id=task_id
+                "task_created", agent=task.assigned_agent,
+                data={"task_id": task.id, "title": task.title},
+                task_id=task.id
             )
         except Exception:
             pass
 
-        log.info(f"Task criada: {task_id} - {title}")
+        log.info(f"Task criada: {task.id} - {task.title}")
+
+    def create_task(self, title: str, description: str = "",
+                    command: str = "", agent: str = "general_agent",
+                    parent_id: str = None, order: int = 0) -> Task:
+        """Cria nova tarefa."""
+        with self._lock:
+            task = self._new_task(title, description, command, agent, parent_id, order)
+            self._insert([task])
+        self._log_created(task)
         return task
 
-    def update_state(self, task_id: str, new_state: str,
-                     result_message: str = "", result_success: bool = None,
-                     result_proof: str = None) -> bool:
+    def create_task_with_subtasks(self, title: str, description: str = "",
+                                  command: str = "", agent: str = "general_agent",
+                                  subtasks: List[Dict] = None) -> Tuple[Task, List[Task]]:
         """
-        Transicao de estado com validacao.
-        Retorna True se transicao valida, False se invalida.
-        """
-        task = self.tasks.get(task_id)
-        if not task:
-            log.error(f"Task nao encontrada: {task_id}")
-            return False
+        Cria task principal + subtasks em uma unica transacao.
+
+        Args:
+            subtasks: dicts com title, description, command, agent
+                      (order = posicao na lista)
 
+        Returns:
+            (task principal, subtasks)
+        """
+        with self._lock:
+            main = self._new_task(title, description, command, agent, None, 0)
+            subs = [
+                self._new_task(
+                    st.get("title", ""), st.get("description", ""),
+                    st.get("command", ""), st.get("agent", "general_agent"),
+                    main.id, i,
+                )
+                for i, st in enumerate(subtasks or [])
+            ]
+            self._insert([main] + subs)
+        for task in [main] + subs:
+            self._log_created(task)
+        return main, subs
+
+    def _transition(self, task: Task, new_state: str, result_message: str = "",
+                    result_success: bool = None, result_proof: str = None) -> bool:
         # Valida transicao
         current = TaskState(task.state)
         target = TaskState(new_state)
         if target not in VALID_TRANSITIONS.get(current, set()):
-            log.warning(f"Transicao invalida: {current.value} -> {target.value} para {task_id}")
+            log.warning(f"Transicao invalida: {current.value} -> {target.value} para {task.id}")
             return False
 
         task.state = new_state
@@ -176,77 +327,108 @@ class TaskQueue:
         if result_proof:
             task.result_proof = result_proof
 
-        self._save()
+        try:
+            with self._lock, self._db:
+                self._rev += 1
+                self._upsert_row(task)
+        except Exception as e:
+            log.error(f"Erro ao salvar task queue: {e}")
+            return False
+        with self._lock:
+            self._counts[current.value] = self._counts.get(current.value, 1) - 1
+            self._counts[new_state] = self._counts.get(new_state, 0) + 1
+            self._kanban_dirty.update((current.value, new_state))
 
         # Log
         try:
             from src.core.observability import get_event_log
             get_event_log().log_event(
                 "task_state_change", agent=task.assigned_agent,
-                data={"from": current.value, "to": new_state, "task_id": task_id},
-                task_id=task_id
+                data={"from": current.value, "to": new_state, "task_id": task.id},
+                task_id=task.id
             )
         except Exception:
             pass
 
-        log.info(f"Task {task_id}: {current.value} -> {new_state}")
+        log.info(f"Task {task.id}: {current.value} -> {new_state}")
         return True
 
+    def update_state(self, task_id: str, new_state: str,
+                     result_message: str = "", result_success: bool = None,
+                     result_proof: str = None) -> bool:
+        """
+        Transicao de estado com validacao.
+        Retorna True se transicao valida, False se invalida.
+        """
+        task = self.get_task(task_id)
+        if not task:
+            log.error(f"Task nao encontrada: {task_id}")
+            return False
+        return self._transition(task, new_state, result_message,
+                                result_success, result_proof)
+
+    # ---------------------------------------------------------------
+    # Consultas (todas via indice)
+    # ---------------------------------------------------------------
+
     def get_task(self, task_id: str) -> Optional[Task]:
         """Retorna task por ID."""
-        return self.tasks.get(task_id)
+        found = self._query("SELECT data FROM tasks WHERE id = ?", (task_id,))
+        return found[0] if found else None
 
     def get_subtasks(self, parent_id: str) -> List[Task]:
         """Retorna subtasks de uma task, ordenadas."""
-        subtasks = [t for t in self.tasks.values() if t.parent_id == parent_id]
-        return sorted(subtasks, key=lambda t: t.order)
+        return self._query(
+            "SELECT data FROM tasks WHERE parent_id = ? ORDER BY ord", (parent_id,))
 
     def get_active_tasks(self) -> List[Task]:
         """Retorna tasks ativas (nao terminais)."""
-        return [t for t in self.tasks.values() if t.is_active]
+        return self._query(
+            f"SELECT data FROM tasks WHERE state IN ({','.join('?' * len(ACTIVE_STATES))}) "
+            "ORDER BY seq", ACTIVE_STATES)
+
+    def get_tasks_by_state(self, state: str, limit: int = None) -> List[Task]:
+        """Tasks de um estado, mais recentes (updated_at) primeiro."""
+        sql = "SELECT data FROM tasks WHERE state = ? ORDER BY updated_at DESC"
+        if limit:
+            return self._query(sql + " LIMIT ?", (state, limit))
+        return self._query(sql, (state,))
 
     def get_recent_tasks(self, n: int = 20) -> List[Task]:
         """Retorna N tasks mais recentes."""
-        sorted_tasks = sorted(
-            self.tasks.values(),
-            key=lambda t: t.created_at,
-            reverse=True
-        )
-        return sorted_tasks[:n]
+        # seq segue a ordem de criacao
+        return self._query("SELECT data FROM tasks ORDER BY seq DESC LIMIT ?", (n,))
+
+    def get_changes(self, since_rev: int = 0) -> Tuple[List[Task], int]:
+        """
+        Tasks criadas/alteradas depois de `since_rev`.
+        Retorna (tasks, rev atual) - passe o rev na proxima chamada.
+        """
+        with self._lock:
+            rev = self._rev
+            return self._query(
+                "SELECT data FROM tasks WHERE rev > ? ORDER BY rev", (since_rev,)), rev
 
     def get_kanban_view(self) -> Dict[str, List[Dict]]:
         """Retorna tasks agrupadas por estado (para Kanban)."""
-        kanban = {
-            "pending": [],
-            "in_progress": [],
-            "waiting_confirm": [],
-            "done": [],
-            "failed": [],
-        }
-
-        for task in self.tasks.values():
-            state = task.state
-            if state in kanban:
-                kanban[state].append(task.to_dict())
-
-        # Ordena cada coluna por updated_at (mais recente primeiro)
-        for state in kanban:
-            kanban[state].sort(key=lambda t: t.get("updated_at", ""), reverse=True)
-            # Limita a 20 por coluna
-            kanban[state] = kanban[state][:20]
-
-        return kanban
+        with self._lock:
+            # So as colunas que mudaram desde a ultima chamada vao ao banco
+            for state in self._kanban_dirty:
+                if state in self._kanban:
+                    # Mais recente primeiro, limitado a 20 por coluna
+                    self._kanban[state] = [
+                        t.to_dict() for t in self.get_tasks_by_state(state, KANBAN_COLUMN_LIMIT)
+                    ]
+            self._kanban_dirty = set()
+            return {state: list(tasks) for state, tasks in self._kanban.items()}
 
     def get_stats(self) -> Dict:
         """Estatisticas da fila."""
-        total = len(self.tasks)
-        states = {}
-        for task in self.tasks.values():
-            states[task.state] = states.get(task.state, 0) + 1
-
+        with self._lock:
+            states = {s: n for s, n in self._counts.items() if n}
         return {
-            "total": total,
-            "active": len(self.get_active_tasks()),
+            "total": sum(states.values()),
+            "active": sum(states.get(s, 0) for s in ACTIVE_STATES),
             "states": states,
         }
 
@@ -254,26 +436,29 @@ class TaskQueue:
         """Remove tasks terminais mais antigas que keep_days."""
         from datetime import timedelta
         cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat()
-        to_remove = [
-            tid for tid, task in self.tasks.items()
-            if task.is_terminal and task.updated_at < cutoff
-        ]
-        for tid in to_remove:
-            del self.tasks[tid]
-        if to_remove:
-            self._save()
-            log.info(f"Removidas {len(to_remove)} tasks antigas")
+        try:
+            with self._lock, self._db:
+                removed = self._db.execute(
+                    f"DELETE FROM tasks WHERE updated_at < ? AND state IN "
+                    f"({','.join('?' * len(TERMINAL_STATES))})",
+                    (cutoff,) + TERMINAL_STATES).rowcount
+        except Exception as e:
+            log.error(f"Erro ao limpar task queue: {e}")
+            return
+        if removed:
+            self._reload_counters()
+            log.info(f"Removidas {removed} tasks antigas")
 
     def retry_task(self, task_id: str) -> bool:
         """Tenta re-executar uma task falha."""
-        task = self.tasks.get(task_id)
+        task = self.get_task(task_id)
         if not task or task.state != "failed":
             return False
         if task.retry_count >= task.max_retries:
             log.warning(f"Task {task_id} excedeu max retries ({task.max_retries})")
             return False
         task.retry_count += 1
-        return self.update_state(task_id, "pending")
+        return self._transition(task, "pending")
 
 
 # Singleton
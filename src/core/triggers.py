@@ -2,6 +2,26 @@
 Event Triggers - Gatilhos baseados em eventos do sistema.
 Complementa o Scheduler com triggers reativos.
 Item 8 do plano arquitetural.
+
+As regras sao compiladas ao entrar (condicoes ja normalizadas) e indexadas
+por tipo de evento -> trie de prefixo do path -> extensao; cada evento so
+avalia as regras candidatas em vez de todas.
+
+Eventos de arquivo passam por um estagio de coalescencia: rajadas no mesmo
+path (copia grande = dezenas de "modified") viram um evento so apos uma
+janela de silencio, e cada regra recebe um disparo agregado com a lista de
+arquivos afetados. Lote que chega com a regra em cooldown nao e descartado:
+fica retido e sai agregado quando o cooldown termina.
+
+Todos os diretorios observados dividem um unico Observer do watchdog: o
+registro de watches junta paths repetidos e os aninhados sob uma regra
+recursiva (condition "recursive") e conta referencias por regra. Regras
+nao recursivas so casam com os filhos diretos do seu path.
+
+Triggers de processo vem de snapshots periodicos de psutil.pids(): o diff
+dos conjuntos gera process_started/process_stopped e so os PIDs novos
+pagam a consulta do nome. O intervalo encurta quando ha mudanca e cresce
+enquanto nada muda.
 """
 
 import os
@@ -10,10 +30,22 @@ import threading
 from typing import Dict, List, Optional, Callable
 from dataclasses import dataclass, field
 from datetime import datetime
+from config.settings import settings
 from src.utils.logger import get_logger
 
 log = get_logger(__name__)
 
+# Teto de espera de um path que nunca fica quieto (arquivo crescendo sem parar)
+COALESCE_MAX_DELAY = 10.0
+
+# Paths que vencem ate esta fracao da janela depois saem no mesmo lote
+COALESCE_BATCH_GRACE = 0.25
+
+# Intervalo adaptativo do monitor de processos (segundos)
+PROCESS_POLL_MIN = 1.0
+PROCESS_POLL_MAX = 10.0
+PROCESS_POLL_BACKOFF = 1.5
+
 # Tenta importar watchdog
 _watchdog_available = False
 try:
@@ -23,6 +55,13 @@ try:
 except ImportError:
     log.debug("watchdog nao instalado - file triggers indisponiveis")
 
+_psutil_available = False
+try:
+    import psutil
+    _psutil_available = True
+except ImportError:
+    log.debug("psutil nao instalado - process triggers indisponiveis")
+
 
 @dataclass
 class TriggerRule:
@@ -39,6 +78,413 @@ class TriggerRule:
     trigger_count: int = 0
 
 
+def _path_parts(path: str) -> List[str]:
+    """Componentes do path normalizado (chaves do trie de prefixos)."""
+    if not path:
+        return []
+    norm = os.path.normcase(os.path.abspath(path)).replace("\\", "/")
+    return [p for p in norm.split("/") if p]
+
+
+@dataclass
+class _CompiledRule:
+    """Regra com as condicoes pre-normalizadas (lowercase uma vez so)."""
+    rule: TriggerRule
+    seq: int
+    path_parts: List[str]
+    extensions: frozenset   # ".pdf", ".zip"...
+    pattern: str
+    path_contains: str
+    process_name: str
+    recursive: bool
+
+    @classmethod
+    def compile(cls, rule: TriggerRule, seq: int) -> "_CompiledRule":
+        condition = rule.condition or {}
+        is_file = rule.trigger_type.startswith("file_")
+        return cls(
+            rule=rule,
+            seq=seq,
+            path_parts=_path_parts(condition.get("path", "")) if is_file else [],
+            extensions=frozenset("." + str(e).lower().lstrip(".")
+                                 for e in condition.get("extensions", []) or []),
+            pattern=(condition.get("pattern", "") or "").lower(),
+            path_contains=(condition.get("path_contains", "") or "").lower(),
+            process_name=(condition.get("process_name", "") or "").lower(),
+            recursive=bool(condition.get("recursive", False)),
+        )
+
+    def covers(self, depth: int) -> bool:
+        """Evento com `depth` componentes de path esta no alcance da regra?"""
+        return self.recursive or not self.path_parts or depth == len(self.path_parts) + 1
+
+    def matches(self, filename: str, filepath: str, process_name: str) -> bool:
+        """Condicoes que o indice nao cobre (argumentos ja em lowercase)."""
+        if self.pattern and self.pattern not in filename:
+            return False
+        if self.path_contains and self.path_contains not in filepath:
+            return False
+        if self.process_name and self.process_name not in process_name:
+            return False
+        return True
+
+
+class _PathNode:
+    """No do trie: regras cujo path termina aqui, separadas por extensao."""
+    __slots__ = ("children", "by_ext", "any_ext")
+
+    def __init__(self):
+        self.children: Dict[str, "_PathNode"] = {}
+        self.by_ext: Dict[str, List[_CompiledRule]] = {}
+        self.any_ext: List[_CompiledRule] = []
+
+
+class _TriggerIndex:
+    """Indice das regras: tipo de evento -> trie de path -> extensao."""
+
+    def __init__(self):
+        self._roots: Dict[str, _PathNode] = {}
+
+    def add(self, compiled: _CompiledRule):
+        node = self._roots.setdefault(compiled.rule.trigger_type, _PathNode())
+        for part in compiled.path_parts:
+            node = node.children.setdefault(part, _PathNode())
+        if compiled.extensions:
+            for ext in compiled.extensions:
+                node.by_ext.setdefault(ext, []).append(compiled)
+        else:
+            node.any_ext.append(compiled)
+
+    def has_type(self, event_type: str) -> bool:
+        return event_type in self._roots
+
+    def candidates(self, event_type: str, path_parts: List[str], ext: str) -> List[_CompiledRule]:
+        """Regras do tipo cujo path e prefixo do evento e cuja extensao casa."""
+        node = self._roots.get(event_type)
+        if node is None:
+            return []
+        found: List[_CompiledRule] = []
+        buckets = 0
+        i = 0
+        while node is not None:
+            for bucket in (node.by_ext.get(ext), node.any_ext):
+                if bucket:
+                    found.extend(bucket)
+                    buckets += 1
+            if i >= len(path_parts):
+                break
+            node = node.children.get(path_parts[i])
+            i += 1
+        if buckets > 1:
+            found.sort(key=lambda c: c.seq)  # Ordem de cadastro, como antes
+        return found
+
+
+class _EventCoalescer:
+    """
+    Agrupa eventos de arquivo por path. Um path so e emitido depois de
+    `quiet` segundos sem eventos novos (ou COALESCE_MAX_DELAY desde o
+    primeiro); os paths prontos saem juntos em um lote.
+    """
+
+    def __init__(self, emit: Callable[[List[tuple]], None], quiet: float):
+        self._emit = emit
+        self.quiet = quiet
+        # path -> [event_type, event_data, primeiro, ultimo]
+        self._pending: Dict[str, list] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.stats = {"received": 0, "emitted": 0, "batches": 0}
+
+    @staticmethod
+    def _merge(previous: str, new: str) -> Optional[str]:
+        """Tipo resultante de dois eventos seguidos no mesmo path (None = anula)."""
+        if previous == "file_created":
+            if new == "file_modified":
+                return previous
+            if new == "file_deleted":
+                return None   # Arquivo temporario: criado e apagado na janela
+        if previous == "file_deleted" and new == "file_created":
+            return "file_modified"  # Save atomico de editor (apaga + recria)
+        return new
+
+    def submit(self, event_type: str, event_data: Dict):
+        now = time.monotonic()
+        path = event_data.get("path", "")
+        with self._cond:
+            self.stats["received"] += 1
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [event_type, event_data, now, now]
+                if self._thread is None:
+                    self._stopped = False
+                    self._thread = threading.Thread(target=self._loop, daemon=True,
+                                                    name="trigger-coalescer")
+                    self._thread.start()
+                self._cond.notify()
+                return
+            merged = self._merge(entry[0], event_type)
+            if merged is None:
+                del self._pending[path]
+            else:
+                entry[0], entry[1], entry[3] = merged, event_data, now
+
+    def _take_ready(self, now: float, force: bool = False) -> tuple:
+        """(eventos prontos, proximo deadline). Chamar com o lock."""
+        dues = {path: min(last + self.quiet, first + COALESCE_MAX_DELAY)
+                for path, (_, _, first, last) in self._pending.items()}
+        if not dues:
+            return [], None
+        if force:
+            horizon = float("inf")
+        elif min(dues.values()) <= now:
+            # Alguem venceu: leva junto quem vence logo em seguida
+            horizon = now + self.quiet * COALESCE_BATCH_GRACE
+        else:
+            return [], min(dues.values())
+
+        ready, deadline = [], None
+        for path, due in dues.items():
+            if due <= horizon:
+                event_type, data = self._pending.pop(path)[:2]
+                ready.append((event_type, data))
+            elif deadline is None or due < deadline:
+                deadline = due
+        self.stats["emitted"] += len(ready)
+        self.stats["batches"] += 1
+        return ready, deadline
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                ready, deadline = self._take_ready(now)
+                if not ready:
+                    self._cond.wait(None if deadline is None else max(0.0, deadline - now))
+                    continue
+            try:
+                self._emit(ready)
+            except Exception as e:
+                log.error(f"Erro ao emitir lote de eventos: {e}")
+
+    def flush(self):
+        """Emite tudo que esta pendente agora (sem esperar a janela)."""
+        with self._cond:
+            ready, _ = self._take_ready(time.monotonic(), force=True)
+        if ready:
+            self._emit(ready)
+
+    def stop(self):
+        self.flush()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+
+class _WatchRegistry:
+    """
+    Watches do watchdog em um Observer compartilhado. Cada regra adquire o
+    path que observa; paths iguais dividem o watch, paths abaixo de um
+    pedido recursivo entram no watch dele e um watch sai quando a ultima
+    regra o libera. Watch so e recursivo se alguma regra pediu.
+    """
+
+    def __init__(self, handler):
+        self._handler = handler
+        self._observer = None
+        self._refs: Dict[str, int] = {}       # path normalizado -> regras
+        self._recursive: Dict[str, int] = {}  # path normalizado -> regras recursivas
+        self._paths: Dict[str, str] = {}      # path normalizado -> path original
+        self._watches: Dict[str, tuple] = {}  # raiz -> (recursivo, ObservedWatch)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path)).rstrip("\\/") or os.sep
+
+    @staticmethod
+    def _is_under(child: str, parent: str) -> bool:
+        return child != parent and child.startswith(parent.rstrip("\\/") + os.sep)
+
+    def _roots(self) -> Dict[str, bool]:
+        """Menor conjunto de watches que cobre os pedidos: raiz -> recursivo."""
+        roots: Dict[str, bool] = {}
+        for key in sorted(self._refs):  # Pai sempre antes dos filhos
+            if not any(rec and self._is_under(key, root) for root, rec in roots.items()):
+                roots[key] = key in self._recursive
+        return roots
+
+    def acquire(self, path: str, recursive: bool = False):
+        key = self._key(path)
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 0) + 1
+            if recursive:
+                self._recursive[key] = self._recursive.get(key, 0) + 1
+            self._paths.setdefault(key, os.path.abspath(path))
+            self._reconcile()
+
+    def release(self, path: str, recursive: bool = False):
+        key = self._key(path)
+        with self._lock:
+            if key not in self._refs:
+                return
+            self._refs[key] -= 1
+            if self._refs[key] <= 0:
+                del self._refs[key]
+                del self._paths[key]
+            if recursive and key in self._recursive:
+                self._recursive[key] -= 1
+                if self._recursive[key] <= 0 or key not in self._refs:
+                    del self._recursive[key]
+            self._reconcile()
+
+    def _reconcile(self):
+        """Agenda as raizes novas antes de tirar as antigas (sem buraco). Com o lock."""
+        roots = self._roots()
+        if roots and self._observer is None:
+            self._observer = Observer()
+            self._observer.start()
+        stale = []
+        for root, recursive in roots.items():
+            current = self._watches.get(root)
+            if current is not None and current[0] == recursive:
+                continue
+            try:
+                watch = self._observer.schedule(self._handler, self._paths[root],
+                                                recursive=recursive)
+                log.info(f"File watcher iniciado: {self._paths[root]} (recursivo={recursive})")
+            except Exception as e:
+                log.error(f"Erro ao iniciar file watcher: {e}")
+                continue
+            if current is not None:
+                stale.append(current[1])  # Mudou a recursividade: troca o watch
+            self._watches[root] = (recursive, watch)
+        for root in [r for r in self._watches if r not in roots]:
+            stale.append(self._watches.pop(root)[1])
+        for watch in stale:
+            try:
+                self._observer.unschedule(watch)
+            except Exception:
+                pass
+
+    def stop(self):
+        with self._lock:
+            self._refs.clear()
+            self._recursive.clear()
+            self._paths.clear()
+            self._watches.clear()
+            observer, self._observer = self._observer, None
+        if observer is not None:
+            try:
+                observer.stop()
+                observer.join(timeout=5)
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "watched_paths": len(self._refs),
+                "watches": len(self._watches),
+                "observer_running": self._observer is not None,
+            }
+
+
+class _ProcessMonitor:
+    """
+    Fonte de eventos de processo: diff de conjuntos entre snapshots de
+    psutil.pids(). Nome consultado uma vez por PID novo e guardado para o
+    evento de saida; os do baseline vem numa passada so de process_iter.
+    """
+
+    def __init__(self, manager, min_interval: float = PROCESS_POLL_MIN,
+                 max_interval: float = PROCESS_POLL_MAX):
+        self.manager = manager
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._known: Optional[Dict[int, str]] = None   # pid -> nome
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"snapshots": 0, "started": 0, "stopped": 0, "lookups": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not _psutil_available or self.running:
+            return
+        self._stop = threading.Event()  # Um por thread: stop()+start() nao revive a antiga
+        self._known = None
+        self._thread = threading.Thread(target=self._loop, args=(self._stop,), daemon=True,
+                                        name="trigger-process-monitor")
+        self._thread.start()
+        log.info("Monitor de processos iniciado")
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _name(self, pid: int) -> str:
+        self.stats["lookups"] += 1
+        try:
+            return psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return ""
+
+    def poll(self) -> int:
+        """Um snapshot + diff. Retorna quantos eventos gerou."""
+        pids = set(psutil.pids())
+        self.stats["snapshots"] += 1
+        if self._known is None:
+            # Baseline: processos ja rodando nao geram evento, mas o nome fica
+            # guardado para o process_stopped deles
+            self._known = {pid: "" for pid in pids}
+            for proc in psutil.process_iter(["name"]):
+                if proc.pid in self._known:
+                    self._known[proc.pid] = proc.info.get("name") or ""
+            return 0
+
+        known = self._known
+        started = pids - known.keys()
+        stopped = known.keys() - pids
+        for pid in stopped:
+            name = known.pop(pid)
+            self.stats["stopped"] += 1
+            if self.manager._index.has_type("process_stopped"):
+                self.manager._fire_event("process_stopped", {"pid": pid, "process_name": name})
+        for pid in started:
+            name = self._name(pid)
+            known[pid] = name
+            self.stats["started"] += 1
+            if self.manager._index.has_type("process_started"):
+                self.manager._fire_event("process_started", {"pid": pid, "process_name": name})
+        return len(started) + len(stopped)
+
+    def _loop(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                changes = self.poll()
+            except Exception as e:
+                log.error(f"Erro no monitor de processos: {e}")
+                changes = 0
+            # Mudou algo: volta ao minimo; parado: espaca ate o maximo
+            if changes:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.max_interval, self.interval * PROCESS_POLL_BACKOFF)
+            stop_event.wait(self.interval)
+
+
 class _FileEventHandler(FileSystemEventHandler if _watchdog_available else object):
     """Handler de eventos do file system."""
 
@@ -49,24 +495,15 @@ class _FileEventHandler(FileSystemEventHandler if _watchdog_available else objec
 
     def on_created(self, event):
         if not event.is_directory:
-            self.manager._fire_event("file_created", {
-                "path": event.src_path,
-                "filename": os.path.basename(event.src_path),
-            })
+            self.manager._on_file_event("file_created", event.src_path)
 
     def on_modified(self, event):
         if not event.is_directory:
-            self.manager._fire_event("file_modified", {
-                "path": event.src_path,
-                "filename": os.path.basename(event.src_path),
-            })
+            self.manager._on_file_event("file_modified", event.src_path)
 
     def on_deleted(self, event):
         if not event.is_directory:
-            self.manager._fire_event("file_deleted", {
-                "path": event.src_path,
-                "filename": os.path.basename(event.src_path),
-            })
+            self.manager._on_file_event("file_deleted", event.src_path)
 
 
 class TriggerManager:
@@ -75,12 +512,27 @@ class TriggerManager:
     Suporta: file watchers, process monitors.
     """
 
-    def __init__(self):
+    def __init__(self, quiet_seconds: float = None):
+        """
+        Args:
+            quiet_seconds: Janela de silencio por path antes de disparar
+                           (padrao TRIGGER_QUIET_SECONDS; 0 = sem agrupar)
+        """
         self.rules: Dict[str, TriggerRule] = {}
         self.callbacks: List[Callable] = []  # Callbacks quando trigger dispara
-        self._observers: Dict[str, object] = {}  # Watchdog observers
+        self._watch_registry = _WatchRegistry(_FileEventHandler(self))
+        self._rule_paths: Dict[str, tuple] = {}  # rule_id -> (path observado, recursivo)
         self._running = False
-        self._monitor_thread: Optional[threading.Thread] = None
+        self._process_monitor = _ProcessMonitor(self)
+        self._index = _TriggerIndex()
+        self._seq = 0
+        self._dispatch_stats = {"events": 0, "evaluated": 0}
+        if quiet_seconds is None:
+            quiet_seconds = settings.TRIGGER_QUIET_SECONDS
+        self._coalescer = _EventCoalescer(self._fire_batch, quiet_seconds)
+        # rule_id -> (event_type, [event_data], Timer): lotes retidos pelo cooldown
+        self._held: Dict[str, tuple] = {}
+        self._held_lock = threading.Lock()
 
     def add_rule(self, name: str, trigger_type: str, condition: Dict,
                  action: str, cooldown: int = 30) -> TriggerRule:
@@ -90,7 +542,9 @@ class TriggerManager:
         Args:
             name: Nome descritivo
             trigger_type: Tipo de evento
-            condition: Condicoes do trigger
+            condition: Condicoes do trigger (path, extensions, pattern,
+                       path_contains, process_name; recursive=True para
+                       incluir subpastas do path)
             action: Comando a executar
             cooldown: Segundos entre disparos
 
@@ -107,13 +561,21 @@ class TriggerManager:
             cooldown_seconds=cooldown,
         )
         self.rules[rule_id] = rule
+        self._seq += 1
+        self._index.add(_CompiledRule.compile(rule, self._seq))
         log.info(f"Trigger adicionado: {name} ({trigger_type})")
 
         # Se e file trigger, inicia watcher
         if trigger_type.startswith("file_") and _watchdog_available:
             watch_path = condition.get("path", "")
             if watch_path and os.path.exists(watch_path):
-                self._start_file_watcher(watch_path)
+                recursive = bool(condition.get("recursive", False))
+                self._watch_registry.acquire(watch_path, recursive)
+                self._rule_paths[rule_id] = (watch_path, recursive)
+
+        # Process trigger: liga o monitor de processos (um para todas as regras)
+        if trigger_type.startswith("process_"):
+            self._process_monitor.start()
 
         return rule
 
@@ -121,108 +583,128 @@ class TriggerManager:
         """Remove regra de trigger."""
         if rule_id in self.rules:
             del self.rules[rule_id]
+            self._rebuild_index()
+            watched = self._rule_paths.pop(rule_id, None)
+            if watched:
+                self._watch_registry.release(*watched)
+            if not any(r.trigger_type.startswith("process_") for r in self.rules.values()):
+                self._process_monitor.stop()
             log.info(f"Trigger removido: {rule_id}")
             return True
         return False
 
+    def _rebuild_index(self):
+        """Recompila todas as regras (troca o indice de uma vez)."""
+        index = _TriggerIndex()
+        for seq, rule in enumerate(self.rules.values(), start=1):
+            index.add(_CompiledRule.compile(rule, seq))
+        self._seq = len(self.rules)
+        self._index = index
+
     def on_trigger(self, callback: Callable):
         """Registra callback para quando triggers disparam."""
         self.callbacks.append(callback)
 
-    def _fire_event(self, event_type: str, event_data: Dict):
-        """Dispara evento e verifica regras."""
-        for rule in self.rules.values():
-            if not rule.enabled or rule.trigger_type != event_type:
-                continue
-
-            # Verifica cooldown
-            now = time.time()
-            if now - rule.last_triggered < rule.cooldown_seconds:
-                continue
-
-            # Verifica condicoes
-            if self._check_condition(rule, event_data):
-                rule.last_triggered = now
-                rule.trigger_count += 1
-                log.info(f"Trigger disparado: {rule.name} ({event_type})")
-
-                # Notifica callbacks
-                for cb in self.callbacks:
-                    try:
-                        cb(rule, event_data)
-                    except Exception as e:
-                        log.error(f"Erro em callback de trigger: {e}")
-
-                # Log no observability
-                try:
-                    from src.core.observability import get_event_log
-                    get_event_log().log_event(
-                        "trigger_fired",
-                        data={
-                            "rule": rule.name,
-                            "type": event_type,
-                            "action": rule.action[:100],
-                            "count": rule.trigger_count,
-                        }
-                    )
-                except Exception:
-                    pass
-
-    def _check_condition(self, rule: TriggerRule, event_data: Dict) -> bool:
-        """Verifica se condicoes de uma regra sao satisfeitas."""
-        condition = rule.condition
-
-        # File triggers: verifica pattern/extensao
-        if rule.trigger_type.startswith("file_"):
-            filename = event_data.get("filename", "")
-            filepath = event_data.get("path", "")
-
-            # Pattern de nome
-            pattern = condition.get("pattern", "")
-            if pattern and pattern not in filename.lower():
-                return False
-
-            # Extensao
-            extensions = condition.get("extensions", [])
-            if extensions:
-                ext = os.path.splitext(filename)[1].lower()
-                if ext not in extensions and ext.lstrip(".") not in extensions:
-                    return False
-
-            # Path deve conter
-            path_contains = condition.get("path_contains", "")
-            if path_contains and path_contains.lower() not in filepath.lower():
-                return False
-
-            return True
-
-        # Process triggers
-        if rule.trigger_type.startswith("process_"):
-            process_name = event_data.get("process_name", "")
-            target = condition.get("process_name", "")
-            if target and target.lower() not in process_name.lower():
-                return False
-            return True
+    def _on_file_event(self, event_type: str, path: str):
+        """Evento do watchdog: passa pela coalescencia (ou direto se quiet=0)."""
+        event_data = {"path": path, "filename": os.path.basename(path)}
+        if self._coalescer.quiet > 0:
+            self._coalescer.submit(event_type, event_data)
+        else:
+            self._fire_event(event_type, event_data)
+
+    def _match_rules(self, event_type: str, event_data: Dict) -> List[TriggerRule]:
+        """Regras habilitadas cujas condicoes casam (so candidatas do indice)."""
+        filepath = event_data.get("path", "") or ""
+        filename = (event_data.get("filename", "") or "").lower()
+        parts = _path_parts(filepath) if filepath else []
+        candidates = self._index.candidates(event_type, parts, os.path.splitext(filename)[1])
+        self._dispatch_stats["events"] += 1
+        self._dispatch_stats["evaluated"] += len(candidates)
+        if not candidates:
+            return []
+        filepath = filepath.lower()
+        process_name = (event_data.get("process_name", "") or "").lower()
+        return [c.rule for c in candidates
+                if c.rule.enabled and c.covers(len(parts))
+                and c.matches(filename, filepath, process_name)]
 
-        return True
+    def _fire_event(self, event_type: str, event_data: Dict):
+        """Dispara evento e verifica so as regras candidatas do indice."""
+        for rule in self._match_rules(event_type, event_data):
+            self._fire_rule(rule, event_type, event_data)
+
+    def _fire_batch(self, events: List[tuple]):
+        """Lote do coalescer: um disparo por regra com todos os arquivos afetados."""
+        per_rule: Dict[str, tuple] = {}
+        for event_type, event_data in events:
+            for rule in self._match_rules(event_type, event_data):
+                per_rule.setdefault(rule.id, (rule, event_type, []))[2].append(event_data)
+        for rule, event_type, items in per_rule.values():
+            with self._held_lock:
+                wait = rule.last_triggered + rule.cooldown_seconds - time.time()
+                held = self._held.get(rule.id)
+                if held is not None:
+                    held[1].extend(items)
+                    continue
+                if wait > 0:
+                    timer = threading.Timer(wait, self._release_held, args=(rule.id,))
+                    timer.daemon = True
+                    self._held[rule.id] = (event_type, items, timer)
+                    timer.start()
+                    continue
+            self._fire_rule(rule, event_type, self._aggregate(items))
+
+    @staticmethod
+    def _aggregate(items: List[Dict]) -> Dict:
+        """Evento unico de um lote: dados do ultimo + lista de arquivos (sem repetir)."""
+        files = list(dict.fromkeys(d.get("path", "") for d in items))
+        aggregated = dict(items[-1])
+        aggregated["files"] = files
+        aggregated["count"] = len(files)
+        return aggregated
+
+    def _release_held(self, rule_id: str):
+        """Cooldown terminou: dispara o lote retido da regra."""
+        with self._held_lock:
+            held = self._held.pop(rule_id, None)
+        rule = self.rules.get(rule_id)
+        if held is None or rule is None or not rule.enabled:
+            return
+        rule.last_triggered = 0.0
+        self._fire_rule(rule, held[0], self._aggregate(held[1]))
 
-    def _start_file_watcher(self, path: str):
-        """Inicia file watcher para um diretorio."""
-        if not _watchdog_available:
+    def _fire_rule(self, rule: TriggerRule, event_type: str, event_data: Dict):
+        """Aplica o cooldown e notifica callbacks + observability."""
+        now = time.time()
+        if now - rule.last_triggered < rule.cooldown_seconds:
             return
+        rule.last_triggered = now
+        rule.trigger_count += 1
+        log.info(f"Trigger disparado: {rule.name} ({event_type})")
 
-        if path in self._observers:
-            return  # Ja tem watcher
+        # Notifica callbacks
+        for cb in self.callbacks:
+            try:
+                cb(rule, event_data)
+            except Exception as e:
+                log.error(f"Erro em callback de trigger: {e}")
 
+        # Log no observability
         try:
-            handler = _FileEventHandler(self)
-            observer = Observer()
-            observer.schedule(handler, path, recursive=False)
-            observer.start()
-            self._observers[path] = observer
-            log.info(f"File watcher iniciado: {path}")
-        except Exception as e:
-            log.error(f"Erro ao iniciar file watcher: {e}")
+            from src.core.observability import get_event_log
+            get_event_log().log_event(
+                "trigger_fired",
+                data={
+                    "rule": rule.name,
+                    "type": event_type,
+                    "action": rule.action[:100],
+                    "count": rule.trigger_count,
+                    "files": event_data.get("count", 1),
+                }
+            )
+        except Exception:
+            pass
 
     def start(self):
         """Inicia monitoramento de triggers."""
@@ -236,14 +718,17 @@ class TriggerManager:
         """Para monitoramento."""
         self._running = False
 
-        # Para file watchers
-        for path, observer in self._observers.items():
-            try:
-                observer.stop()
-                observer.join(timeout=5)
-            except Exception:
-                pass
-        self._observers.clear()
+        # Para o observer compartilhado e o monitor de processos
+        self._watch_registry.stop()
+        self._process_monitor.stop()
+        self._rule_paths.clear()
+        self._coalescer.stop()  # Dispara o que ainda estava na janela
+        with self._held_lock:
+            held_ids = list(self._held)
+            for _, _, timer in self._held.values():
+                timer.cancel()
+        for rule_id in held_ids:
+            self._release_held(rule_id)
 
         log.info("TriggerManager parado")
 
@@ -264,12 +749,23 @@ class TriggerManager:
 
     def get_stats(self) -> Dict:
         """Estatisticas dos triggers."""
+        watch_stats = self._watch_registry.get_stats()
         return {
             "total_rules": len(self.rules),
             "active_rules": sum(1 for r in self.rules.values() if r.enabled),
             "total_fired": sum(r.trigger_count for r in self.rules.values()),
-            "watchers": len(self._observers),
+            "watchers": watch_stats["watches"],
+            "watched_paths": watch_stats["watched_paths"],
+            "events_dispatched": self._dispatch_stats["events"],
+            "rules_evaluated": self._dispatch_stats["evaluated"],
+            "quiet_seconds": self._coalescer.quiet,
+            "events_received": self._coalescer.stats["received"],
+            "events_coalesced": self._coalescer.stats["emitted"],
+            "pending_events": self._coalescer.pending,
             "watchdog_available": _watchdog_available,
+            "psutil_available": _psutil_available,
+            "process_monitor": self._process_monitor.running,
+            "process_poll_interval": self._process_monitor.interval,
             "running": self._running,
         }
 
@@ -5,8 +5,9 @@ PRIORIDADE: SEMPRE trazer resposta no chat. NUNCA abrir navegador.
 """
 
 import re
-import requests
 from typing import Optional, Dict, List
+from urllib.parse import quote
+from src.core.http_pool import get_http_pool
 from src.utils.logger import get_logger
 
 log = get_logger(__name__)
@@ -22,10 +23,12 @@ class WebSearchEngine:
     """Busca na web e retorna a resposta direto no chat."""
 
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
         self._ddgs = None
 
+    def _get(self, url: str, timeout: float):
+        """GET pelo pool HTTP compartilhado (keep-alive por host)."""
+        return get_http_pool().get(url, headers=HEADERS, timeout=timeout)
+
     def _get_ddgs(self):
         """Lazy init da biblioteca duckduckgo-search."""
         if self._ddgs is None:
@@ -137,8 +140,8 @@ class WebSearchEngine:
     def _search_ddg_api(self, query: str) -> Optional[Dict]:
         """Busca usando API instant answer do DuckDuckGo."""
         try:
-            url = f"https://api.duckduckgo.com/?q={requests.utils.quote(query)}&format=json&no_html=1&skip_disambig=1"
-            resp = self.session.get(url, timeout=8)
+            url = f"https://api.duckduckgo.com/?q={quote(query)}&format=json&no_html=1&skip_disambig=1"
+            resp = self._get(url, timeout=8)
             data = resp.json()
 
             # Abstract (resposta direta)
@@ -203,8 +206,8 @@ class WebSearchEngine:
         """Busca no DuckDuckGo HTML (scraping direto)."""
         try:
             from bs4 import BeautifulSoup
-            url = f"https://html.duckduckgo.com/html/?q={requests.utils.quote(query)}"
-            resp = self.session.get(url, timeout=10)
+            url = f"https://html.duckduckgo.com/html/?q={quote(query)}"
+            resp = self._get(url, timeout=10)
             resp.raise_for_status()
 
             soup = BeautifulSoup(resp.text, "html.parser")
@@ -248,8 +251,8 @@ class WebSearchEngine:
         """Busca no Google (scraping)."""
         try:
             from bs4 import BeautifulSoup
-            url = f"https://www.google.com/search?q={requests.utils.quote(query)}&hl=pt-BR&num={max_results + 2}"
-            resp = self.session.get(url, timeout=10)
+            url = f"https://www.google.com/search?q={quote(query)}&hl=pt-BR&num={max_results + 2}"
+            resp = self._get(url, timeout=10)
             resp.raise_for_status()
 
             soup = BeautifulSoup(resp.text, "html.parser")
@@ -324,15 +327,15 @@ class WebSearchEngine:
         """Busca na Wikipedia como ultimo recurso."""
         try:
             # Primeiro busca em PT-BR
-            search_url = f"https://pt.wikipedia.org/w/api.php?action=query&list=search&srsearch={requests.utils.quote(query)}&format=json&srlimit=3"
-            resp = self.session.get(search_url, timeout=8)
+            search_url = f"https://pt.wikipedia.org/w/api.php?action=query&list=search&srsearch={quote(query)}&format=json&srlimit=3"
+            resp = self._get(search_url, timeout=8)
             data = resp.json()
 
             results = data.get("query", {}).get("search", [])
             if not results:
                 # Tenta em ingles
-                search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={requests.utils.quote(query)}&format=json&srlimit=3"
-                resp = self.session.get(search_url, timeout=8)
+                search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={quote(query)}&format=json&srlimit=3"
+                resp = self._get(search_url, timeout=8)
                 data = resp.json()
                 results = data.get("query", {}).get("search", [])
                 wiki_lang = "en"
@@ -344,8 +347,8 @@ class WebSearchEngine:
 
             # Pega o resumo do primeiro resultado
             title = results[0]["title"]
-            summary_url = f"https://{wiki_lang}.wikipedia.org/api/rest_v1/page/summary/{requests.utils.quote(title)}"
-            resp = self.session.get(summary_url, timeout=8)
+            summary_url = f"https://{wiki_lang}.wikipedia.org/api/rest_v1/page/summary/{quote(title)}"
+            resp = self._get(summary_url, timeout=8)
             summary_data = resp.json()
 
             extract = summary_data.get("extract", "")
@@ -10,6 +10,7 @@ from rich.markdown import Markdown
 from rich.prompt import Prompt
 
 from src.core.ai_engine import get_engine
+from src.core.context_window import ContextWindow, summarizer_for
 from src.utils.logger import setup_logging, get_logger
 from src.utils.exceptions import AIProviderError
 from config.settings import settings
@@ -30,7 +31,7 @@ class WilliamCLI:
     def __init__(self):
         """Inicializa a CLI."""
         self.engine = None
-        self.conversation_history = []
+        self.context_window = ContextWindow()  # Historico dentro do orcamento de tokens
         self.running = True
 
     def initialize(self):
@@ -38,6 +39,10 @@ class WilliamCLI:
         try:
             console.print("[bold cyan]Inicializando Assistente William...[/bold cyan]")
             self.engine = get_engine()
+            self.context_window = ContextWindow(
+                provider=self.engine.default_provider,
+                summarizer=summarizer_for(settings.CONTEXT_SUMMARY_MODE, self.engine),
+            )
 
             status = self.engine.get_status()
             console.print(f"[green][OK][/green] Motor IA inicializado")
@@ -117,13 +122,14 @@ O assistente irá processar e responder!
 - Providers disponíveis: `{', '.join(status['providers_available'])}`
 - Total de providers: `{status['total_providers']}`
 - Status: `{status['status']}`
-- Mensagens na conversa: `{len(self.conversation_history)}`
+- Mensagens no contexto: `{len(self.context_window)}`
+- Tokens do contexto: `{self.context_window.get_stats()['tokens']}/{self.context_window.budget}`
 """
             console.print(Panel(Markdown(status_text), title="Status", border_style="green"))
             return True
 
         elif command == "/clear":
-            self.conversation_history = []
+            self.context_window.clear()
             console.print("[green][OK] Histórico limpo![/green]")
             return True
 
@@ -140,25 +146,17 @@ O assistente irá processar e responder!
             message: Mensagem do usuário
         """
         try:
-            # Adiciona ao histórico
-            self.conversation_history.append({
-                "role": "user",
-                "content": message
-            })
-
             # Mostra que está processando
             with console.status("[bold cyan]Pensando...[/bold cyan]", spinner="dots"):
-                # Processa com IA
+                # Processa com IA (so o historico que cabe no orcamento de tokens)
                 response = self.engine.chat(
                     message=message,
-                    context=self.conversation_history[:-1] if len(self.conversation_history) > 1 else None
+                    context=self.context_window.context_for(message) or None
                 )
 
-            # Adiciona resposta ao histórico
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": response
-            })
+            # Adiciona o turno ao histórico
+            self.context_window.add("user", message)
+            self.context_window.add("assistant", response)
 
             # Exibe resposta
             console.print()
@@ -235,10 +235,10 @@ class BrowserSkill(BaseSkill):
             return SkillResult(success=False, message="URL necessaria para extrair texto.")
 
         try:
-            import requests
             from bs4 import BeautifulSoup
+            from src.core.http_pool import get_http_pool
 
-            resp = requests.get(url, timeout=15, headers={
+            resp = get_http_pool().get(url, timeout=15, headers={
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
             })
             soup = BeautifulSoup(resp.text, "html.parser")
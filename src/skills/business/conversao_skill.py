@@ -18,7 +18,7 @@ def _get_ai_response(prompt: str, fallback: str = "") -> str:
     try:
         from src.core.ai_engine import get_engine
         engine = get_engine()
-        response = engine.chat_with_fallback(prompt)
+        response = engine.chat_with_fallback(prompt, cache=True)  # Prompts fixos se repetem
         if response and len(response) > 20:
             return response
     except Exception as e:
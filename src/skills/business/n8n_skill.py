@@ -7,6 +7,7 @@ import json
 import uuid
 from pathlib import Path
 from datetime import datetime
+from src.core.http_pool import get_http_pool
 from src.skills.base_skill import BaseSkill, SkillResult
 from src.utils.logger import get_logger
 
@@ -48,9 +49,8 @@ class N8nSkill(BaseSkill):
     def _n8n_disponivel(self) -> bool:
         """Verifica se n8n está rodando."""
         try:
-            import requests
             cfg = self._get_n8n_config()
-            r = requests.get(f"{cfg['base_url']}/healthz", timeout=3)
+            r = get_http_pool().get(f"{cfg['base_url']}/healthz", timeout=3)
             return r.status_code == 200
         except Exception:
             return False
@@ -58,13 +58,13 @@ class N8nSkill(BaseSkill):
     def _postar_workflow(self, workflow_json: dict) -> dict:
         """Posta workflow na API do n8n."""
         try:
-            import requests
+            http = get_http_pool()
             cfg = self._get_n8n_config()
             headers = {"Content-Type": "application/json"}
             if cfg["api_key"]:
                 headers["X-N8N-API-KEY"] = cfg["api_key"]
 
-            r = requests.post(
+            r = http.post(
                 f"{cfg['base_url']}/api/v1/workflows",
                 json=workflow_json,
                 headers=headers,
@@ -75,7 +75,7 @@ class N8nSkill(BaseSkill):
                 # Ativa o workflow
                 wf_id = data.get("id")
                 if wf_id:
-                    requests.post(
+                    http.post(
                         f"{cfg['base_url']}/api/v1/workflows/{wf_id}/activate",
                         headers=headers,
                         timeout=5
@@ -0,0 +1,163 @@
+"""
+Expressões cron para o Assistente IA William.
+
+Parser de cron de 5 campos (min hora dia mês dia-da-semana) com listas,
+ranges, passos (*/5, 1-10/2), nomes (jan, mon) e macros (@daily...).
+O próximo disparo é calculado pulando direto para o próximo valor válido
+de cada campo, sem varrer minuto a minuto.
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, List, Optional
+
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun",
+     "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+DAY_NAMES = {name: i for i, name in enumerate(
+    ["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# (nome, mínimo, máximo, nomes aceitos)
+FIELDS = [
+    ("minuto", 0, 59, None),
+    ("hora", 0, 23, None),
+    ("dia", 1, 31, None),
+    ("mês", 1, 12, MONTH_NAMES),
+    ("dia da semana", 0, 7, DAY_NAMES),
+]
+
+# Limite de busca do próximo disparo (ex: "0 0 30 2 *" nunca dispara)
+MAX_SEARCH_YEARS = 5
+
+
+def _parse_value(token: str, names: Optional[dict], field: str) -> int:
+    token = token.lower()
+    if names and token in names:
+        return names[token]
+    try:
+        return int(token)
+    except ValueError:
+        raise ValueError(f"Valor inválido no campo {field}: {token!r}")
+
+
+def _parse_field(text: str, field: str, lo: int, hi: int,
+                 names: Optional[dict]) -> List[int]:
+    values = set()
+    for part in text.split(","):
+        if not part:
+            raise ValueError(f"Lista vazia no campo {field}")
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Passo inválido no campo {field}: {step_text!r}")
+            step = int(step_text)
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = _parse_value(a, names, field), _parse_value(b, names, field)
+        else:
+            start = _parse_value(part, names, field)
+            # "5/15" = de 5 até o fim, de 15 em 15
+            end = hi if step > 1 else start
+        if not (lo <= start <= hi and lo <= end <= hi) or start > end:
+            raise ValueError(f"Valor fora do range no campo {field}: {part!r} ({lo}-{hi})")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+class CronExpression:
+    """
+    Expressão cron compilada.
+
+    Semântica do Vixie cron: se dia do mês E dia da semana forem
+    restritos, basta um dos dois casar. 0 e 7 são domingo.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        text = MACROS.get(self.expression.lower(), self.expression)
+        parts = text.split()
+        if len(parts) != 5:
+            raise ValueError("Expressão cron deve ter 5 partes: min hour day month weekday")
+
+        parsed = [_parse_field(p, *spec) for p, spec in zip(parts, FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = sorted({d % 7 for d in weekdays})
+        self._dom_any = parts[2].startswith("*")
+        self._dow_any = parts[4].startswith("*")
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays  # cron: 0 = domingo
+        if self._dom_any and self._dow_any:
+            return True
+        if self._dom_any:
+            return dow
+        if self._dow_any:
+            return dom
+        return dom or dow
+
+    def next_after(self, after: datetime) -> datetime:
+        """Primeiro disparo estritamente depois de `after` (mesmo tzinfo)."""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after.year + MAX_SEARCH_YEARS
+
+        while dt.year <= limit:
+            if dt.month not in self.months:
+                i = bisect_left(self.months, dt.month)
+                if i < len(self.months):
+                    dt = dt.replace(month=self.months[i], day=1, hour=0, minute=0)
+                else:
+                    dt = dt.replace(year=dt.year + 1, month=self.months[0], day=1,
+                                    hour=0, minute=0)
+                continue
+            if not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.hour not in self.hours:
+                i = bisect_left(self.hours, dt.hour)
+                if i < len(self.hours):
+                    dt = dt.replace(hour=self.hours[i], minute=0)
+                else:
+                    dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                i = bisect_left(self.minutes, dt.minute)
+                if i < len(self.minutes):
+                    dt = dt.replace(minute=self.minutes[i])
+                else:
+                    dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            return dt
+
+        raise ValueError(f"Expressão cron nunca dispara: {self.expression}")
+
+    def iter_from(self, start: datetime) -> Iterator[datetime]:
+        """Iterador dos próximos disparos depois de `start`."""
+        dt = start
+        while True:
+            dt = self.next_after(dt)
+            yield dt
+
+
+@lru_cache(maxsize=256)
+def parse_cron(expression: str) -> CronExpression:
+    """CronExpression compilada (cache por string)."""
+    return CronExpression(expression)
@@ -11,6 +11,7 @@ from typing import Any, List, Optional
 from urllib.parse import urlparse
 import validators as val
 
+from .cron import parse_cron
 from .exceptions import ValidationError, InvalidInputError
 
 
@@ -377,27 +378,11 @@ class AutomationValidator:
 
     @staticmethod
     def validate_cron_expression(expression: str) -> bool:
-        """Valida expressão cron."""
-        # Expressão cron simples: min hour day month weekday
-        parts = expression.split()
-
-        if len(parts) != 5:
-            raise ValidationError("Expressão cron deve ter 5 partes: min hour day month weekday")
-
-        # Validação básica de ranges
-        ranges = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
-
-        for i, (part, (min_val, max_val)) in enumerate(zip(parts, ranges)):
-            if part == '*':
-                continue
-
-            try:
-                value = int(part)
-                if not (min_val <= value <= max_val):
-                    raise ValidationError(f"Valor fora do range na posição {i+1}: {value}")
-            except ValueError:
-                # Pode ser expressão complexa (*/5, 1-5, etc)
-                pass
+        """Valida expressão cron (5 campos: min hour day month weekday, ou @macro)."""
+        try:
+            parse_cron(expression)
+        except ValueError as e:
+            raise ValidationError(str(e))
 
         return True
 
@@ -131,6 +131,10 @@ try:
     r = ss.search('Python programacao', documents=docs, limit=2)
     assert len(r) > 0
     assert r[0][0]["id"] == "doc1"
+    many = [{"id": f"m{i}", "content": "motor " * (1 + i % 7) + f"peca {i}"} for i in range(200)]
+    top = ss.search('motor', documents=many, limit=5)
+    full = ss.search('motor', documents=many, limit=len(many))
+    assert [sc for _, sc in top] == [sc for _, sc in full[:5]]   # top-k por argpartition
     func_ok += 1
     print('  [OK] SemanticSearch keyword search')
 except Exception as e:
@@ -328,6 +332,934 @@ try:
 except Exception as e:
     print(f'  [FAIL] SkillStore: {e}')
 
+# Test 21: MemoryWAL (deltas + replay + compactacao)
+func_total += 1
+try:
+    import tempfile
+    from pathlib import Path
+    from src.core.memory_wal import MemoryWAL, apply_delta
+    snap = Path(tempfile.mkdtemp()) / 'mem.json'
+    wal = MemoryWAL(snap)
+    state = {'count': 0, 'items': []}
+    for i in range(5):
+        state['count'] = i + 1
+        state['items'].append(i)
+        wal.commit([{'op': 'set', 'p': ['count'], 'v': i + 1},
+                    {'op': 'append', 'p': ['items'], 'v': i, 'max': 3}])
+    state['items'] = state['items'][-3:]
+    wal.compact(state, background=False)
+    wal.commit([{'op': 'set', 'p': ['count'], 'v': 6}])
+    wal.close()
+    snapshot, records = MemoryWAL(snap).load()
+    for r in records:
+        apply_delta(snapshot, r)
+    assert snapshot == {'count': 6, 'items': [2, 3, 4]}, snapshot
+    func_ok += 1
+    print(f'  [OK] MemoryWAL: snapshot + {len(records)} delta(s) reaplicados')
+except Exception as e:
+    print(f'  [FAIL] MemoryWAL: {e}')
+
+# Test 22: InteractionLog (indice invertido + tail)
+func_total += 1
+try:
+    import tempfile
+    from pathlib import Path
+    from src.core.interaction_log import InteractionLog
+    ilog = InteractionLog(Path(tempfile.mkdtemp()) / 'interactions')
+    for i in range(50):
+        day = '2026-01-01' if i < 25 else '2026-01-02'
+        ilog.append({'ts': f'{day}T00:00:{i:02d}',
+                     'user_msg': f'abrir chrome {i}' if i % 5 == 0 else f'criar pasta {i}'})
+    found = ilog.search('chrome', limit=3)
+    assert [e['ts'][-2:] for e in found] == ['45', '40', '35'], found
+    assert [e['ts'][-2:] for e in ilog.tail(2)] == ['48', '49']
+    segs = ilog.get_segments()
+    assert [s['lines'] for s in segs] == [25, 25], segs
+    ilog.close()
+
+    import time as _time
+    from datetime import datetime as _dt
+    from config.settings import settings as _settings
+    from src.core.memory import WilliamMemory
+    import inspect as _inspect
+    assert 'INTERACTIONS_RETENTION_DAYS' in _inspect.getsource(WilliamMemory.__init__)
+    ilog = InteractionLog(Path(tempfile.mkdtemp()) / 'interactions', retention_days=30)
+    ilog.append({'ts': '2020-01-01T00:00:00', 'user_msg': 'antigo'})
+    ilog.append({'ts': '2020-01-02T00:00:00', 'user_msg': 'antigo'})
+    for _ in range(50):   # compressao do primeiro segmento roda em thread
+        if ilog.get_segments()[0]['compressed']:
+            break
+        _time.sleep(0.05)
+    ilog.append({'ts': _dt.now().isoformat(), 'user_msg': 'recente'})
+    assert [s['day'] for s in ilog.get_segments()][0] == '20200102'   # 20200101 apagado
+    assert ilog.search('antigo', limit=5)[0]['ts'].startswith('2020-01-02')
+    assert _settings.INTERACTIONS_RETENTION_DAYS > 0
+    ilog.close()
+    func_ok += 1
+    print(f'  [OK] InteractionLog: {len(segs)} segmentos, busca indexada + tail + retencao')
+except Exception as e:
+    print(f'  [FAIL] InteractionLog: {e}')
+
+# Test 23: KnowledgeBase engine sqlite (FTS5 + migracao do JSON)
+func_total += 1
+try:
+    import json as _json
+    import tempfile
+    from src.core.knowledge_base import KnowledgeBase
+    kb_json = os.path.join(tempfile.mkdtemp(), 'knowledge.json')
+    with open(kb_json, 'w', encoding='utf-8') as f:
+        _json.dump([{'id': 'kb_1', 'content': 'Alternador do Gol G4 custa R$ 450', 'category': 'business'}], f)
+    kb = KnowledgeBase(kb_file=kb_json, engine='sqlite')
+    kb.add_fact('Python foi criado por Guido van Rossum', category='tech')
+    assert kb.query('alternador gol')[0].id == 'kb_1'
+    assert kb.query('python', category='business') == []
+    kb.close()
+    kb = KnowledgeBase(kb_file=kb_json, engine='sqlite')
+    assert len(kb.facts) == 2 and kb.facts['kb_1'].access_count == 1
+    kb.close()
+    func_ok += 1
+    print('  [OK] KnowledgeBase sqlite: migracao + FTS5 + access_count em lote')
+except Exception as e:
+    print(f'  [FAIL] KnowledgeBase sqlite: {e}')
+
+# Test 24: SemanticSearch corpus indexado (BM25 com IDF real)
+func_total += 1
+try:
+    from src.core.semantic_search import SemanticSearch
+    ss = SemanticSearch(use_embeddings=False)
+    ss.add_documents([
+        {"id": "p1", "content": "alternador gol motor ap"},
+        {"id": "p2", "content": "motor ap bomba de oleo"},
+        {"id": "p3", "content": "pastilha de freio motor"},
+    ])
+    r = ss.search('alternador motor')
+    assert r[0][0]["id"] == "p1"
+    ss.remove_document("p1")
+    assert all(doc["id"] != "p1" for doc, _ in ss.search('alternador motor'))
+
+    # Embeddings ativos, mas um documento ainda sem vetor: cai no score keyword
+    import numpy as np
+    from types import SimpleNamespace
+    from src.core.ann_index import FlatIndex
+    ss.use_embeddings, ss._vectors = True, FlatIndex()
+    ss._loader = SimpleNamespace(model=object(), state="ready")
+    ss._encode_batch = lambda texts: np.stack(
+        [np.eye(8, dtype=np.float32)[len(t) % 8] for t in texts])
+    ss.add_document("p4", {"id": "p4", "content": "embreagem gol"})
+    ss.search('motor')                  # codifica os pendentes
+    ss._vectors.remove("p4")
+    assert [doc["id"] for doc, _ in ss.search('embreagem')] == ["p4"]
+    func_ok += 1
+    print(f'  [OK] SemanticSearch indexado: {ss.get_status()["indexed_docs"]} docs')
+except Exception as e:
+    print(f'  [FAIL] SemanticSearch indexado: {e}')
+
+# Test 25: EmbeddingCache persistente (memmap + LRU)
+func_total += 1
+try:
+    import tempfile
+    import numpy as np
+    from src.core.embedding_cache import EmbeddingCache
+    cache_dir = tempfile.mkdtemp()
+    vecs = np.random.rand(40, 8).astype(np.float32)
+    cache = EmbeddingCache('teste', cache_dir=cache_dir, max_bytes=8 * 4 * 30)
+    cache.put_many([f'texto {i}' for i in range(40)], vecs)
+    assert len(cache) <= 30
+    cache.flush()
+    reopened = EmbeddingCache('teste', cache_dir=cache_dir, max_bytes=8 * 4 * 30)
+    hit = reopened.get_many(['texto 39', 'texto 0'])
+    assert 'texto 0' not in hit and np.allclose(hit['texto 39'], vecs[39])
+    func_ok += 1
+    print(f'  [OK] EmbeddingCache: {len(reopened)} vetores persistidos (LRU)')
+except Exception as e:
+    print(f'  [FAIL] EmbeddingCache: {e}')
+
+# Test 26: Indice ANN IVF-flat (insert/delete incremental + persistencia)
+func_total += 1
+try:
+    import tempfile
+    import numpy as np
+    from src.core import ann_index
+    vecs = np.random.rand(600, 16).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    ids = [f'doc{i}' for i in range(600)]
+    ivf = ann_index.IVFFlatIndex(nlist=8)
+    ivf.add(ids[:500], vecs[:500])
+    ivf.train()
+    ivf.add(ids[500:], vecs[500:])
+    assert ivf.search(vecs[550], 1, effort=8)[0][0] == 'doc550'
+    ivf.remove('doc550')
+    assert 'doc550' not in [d for d, _ in ivf.search(vecs[550], 5, effort=8)]
+    ann_dir = tempfile.mkdtemp()
+    ivf.save(ann_dir)
+    loaded = ann_index.IVFFlatIndex.load(ann_dir)
+    assert len(loaded) == 599 and loaded.search(vecs[3], 1, effort=8)[0][0] == 'doc3'
+    try:
+        ann_index.VectorIndex()
+        raise AssertionError('VectorIndex deveria ser abstrata')
+    except TypeError:
+        pass
+    # Indice recarregado: ids que sairam do corpus sao descartados
+    from src.core.semantic_search import SemanticSearch
+    ss = SemanticSearch(use_embeddings=False)
+    ss.add_documents([{'id': f'doc{i}', 'content': f'texto {i}'} for i in range(100)])
+    ss._vectors = loaded
+    ss._drop_stale_vectors()
+    assert len(loaded) == 100 and 'doc300' not in loaded
+    func_ok += 1
+    print(f'  [OK] ANN IVF-flat: {len(loaded)} vetores, {len(loaded.lists)} listas')
+except Exception as e:
+    print(f'  [FAIL] ANN IVF-flat: {e}')
+
+# Test 27: TaskQueue SQLite (batch parent + subtasks, kanban incremental)
+func_total += 1
+try:
+    import tempfile
+    from src.core.task_queue import TaskQueue
+    tq = TaskQueue(tasks_file=os.path.join(tempfile.mkdtemp(), 'task_queue.json'))
+    main, subs = tq.create_task_with_subtasks(
+        'Playbook', subtasks=[{'title': 'passo 1'}, {'title': 'passo 2', 'agent': 'file_agent'}])
+    assert [t.title for t in tq.get_subtasks(main.id)] == ['passo 1', 'passo 2']
+    assert len(tq.get_kanban_view()['pending']) == 3
+    _, rev = tq.get_changes()
+    tq.update_state(subs[0].id, 'in_progress')
+    changed, _ = tq.get_changes(rev)
+    assert [t.id for t in changed] == [subs[0].id]
+    assert tq.get_kanban_view()['in_progress'][0]['id'] == subs[0].id
+    assert tq.get_stats()['active'] == 3
+    tq.close()
+    func_ok += 1
+    print('  [OK] TaskQueue SQLite: batch transacional + kanban incremental')
+except Exception as e:
+    print(f'  [FAIL] TaskQueue SQLite: {e}')
+
+# Test 28: Scheduler heap + Condition (dispara no deadline, sem polling)
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile, time as _time
+    from datetime import datetime as _dt, timedelta as _td
+    from src.core.scheduler import TaskScheduler
+    from src.core import scheduler as _scheduler_mod
+    from src.core.run_ledger import RunLedger
+    _tmp = _tempfile.mkdtemp()  # Nada em ~/.william
+    _scheduler_mod.TASKS_FILE = _os.path.join(_tmp, 'scheduled_tasks.json')
+    sched = TaskScheduler(ledger=RunLedger(_os.path.join(_tmp, 'runs.db')))
+    fired = []
+    sched.add_callback(lambda command, name: fired.append(_time.time()))
+    sched.start()
+    st = sched.add_task('teste_heap', 'cmd', run_at='00:00', one_shot=True)
+    sched.pause_task(st['id'])
+    st['next_run'] = (_dt.now() + _td(seconds=0.3)).isoformat()
+    t0 = _time.time()
+    sched.resume_task(st['id'])
+    _time.sleep(1.0)
+    sched.remove_task(st['id'])
+    sched.close()
+    assert len(fired) == 1 and fired[0] - t0 < 0.6
+    func_ok += 1
+    print(f'  [OK] Scheduler heap: disparou em {fired[0] - t0:.2f}s')
+except Exception as e:
+    print(f'  [FAIL] Scheduler heap: {e}')
+
+# Test 29: Scheduler pool de execucao (jobs vencidos rodam em paralelo)
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile, time as _time
+    from datetime import datetime as _dt, timedelta as _td
+    from src.core.scheduler import TaskScheduler
+    from src.core import scheduler as _scheduler_mod
+    from src.core.run_ledger import RunLedger
+    _tmp = _tempfile.mkdtemp()  # Nada em ~/.william
+    _scheduler_mod.TASKS_FILE = _os.path.join(_tmp, 'scheduled_tasks.json')
+    sched = TaskScheduler(max_workers=8, ledger=RunLedger(_os.path.join(_tmp, 'runs.db')))
+    sched.add_callback(lambda command, name: _time.sleep(0.5))
+    sched.start()
+    when = (_dt.now() + _td(seconds=0.2)).isoformat()
+    jobs = [sched.add_task(f'relatorio_{i}', 'cmd', run_at='08:00', one_shot=True) for i in range(6)]
+    for job in jobs:
+        sched.pause_task(job['id'])
+        job['next_run'] = when
+        sched.resume_task(job['id'])
+    _time.sleep(1.0)
+    metrics = sched.get_metrics()
+    for job in jobs:
+        sched.remove_task(job['id'])
+    sched.close()
+    assert metrics['completed'] == 6, metrics
+    func_ok += 1
+    print(f'  [OK] Scheduler pool: 6 jobs de 0.5s em <1s (p95 lag {metrics["lag_p95"]:.3f}s)')
+except Exception as e:
+    print(f'  [FAIL] Scheduler pool: {e}')
+
+# Test 30: Cron + politicas de catch-up do scheduler
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile
+    from datetime import datetime as _dt, timedelta as _td
+    from src.utils.cron import CronExpression, parse_cron
+    from src.core.scheduler import TaskScheduler
+    cron = CronExpression('0 8 * * mon-fri')
+    assert cron.next_after(_dt(2026, 10, 17, 12, 0)) == _dt(2026, 10, 19, 8, 0)  # sabado -> segunda
+    try:
+        parse_cron('61 * * * *')  # mesmo parser do AutomationValidator
+        raise AssertionError('cron invalido aceito')
+    except ValueError:
+        pass
+    from src.core import scheduler as _scheduler_mod
+    from src.core.run_ledger import RunLedger
+    _tmp = _tempfile.mkdtemp()  # Nada em ~/.william
+    _scheduler_mod.TASKS_FILE = _os.path.join(_tmp, 'scheduled_tasks.json')
+    sched = TaskScheduler(ledger=RunLedger(_os.path.join(_tmp, 'runs.db')))
+    now = _dt.now()
+    missed = {'id': 'x', 'name': 'x', 'cron': '0 * * * *', 'enabled': True,
+              'next_run': (now - _td(hours=3)).isoformat()}
+    skip = dict(missed, catchup='skip')
+    sched._apply_catchup(skip, now)
+    assert _dt.fromisoformat(skip['next_run']) > now
+    run_all = dict(missed, catchup='all')
+    sched._apply_catchup(run_all, now)
+    assert run_all['catchup_pending'] >= 2
+    every = {'id': 'y', 'name': 'y', 'interval_minutes': 10, 'jitter_seconds': 30,
+             'next_run': now.isoformat()}
+    assert sched._advance(every, now + _td(seconds=25)) == now + _td(minutes=10)  # sem deriva
+    # catch-up 'all' passa pelo limite de concorrencia (um disparo por vez)
+    import threading as _threading, time as _time
+    active, peak, done = [0], [0], []
+    _gate = _threading.Lock()
+    def _catchup_cb(command, name):
+        with _gate:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        _time.sleep(0.05)
+        with _gate:
+            active[0] -= 1
+            done.append(name)
+    sched.add_callback(_catchup_cb)
+    burst = dict(run_all, id='z', name='z', command='cmd', max_concurrency=1)
+    sched._by_id['z'] = burst
+    with sched._cond:
+        sched._dispatch(burst, _time.time())
+    _time.sleep(0.5)
+    del sched._by_id['z']
+    sched.close()
+    assert len(done) == run_all['catchup_pending'] + 1 and peak[0] == 1, (done, peak)
+    func_ok += 1
+    print(f'  [OK] Cron + catch-up: skip -> {skip["next_run"][11:16]}, all -> {run_all["missed_runs"]} perdidos')
+except Exception as e:
+    print(f'  [FAIL] Cron + catch-up: {e}')
+
+# Test 31: Scheduler save com debounce + run ledger consultavel
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile, time as _time
+    from src.core.scheduler import TaskScheduler
+    from src.core import scheduler as _scheduler_mod
+    from src.core.run_ledger import RunLedger
+    _tmp = _tempfile.mkdtemp()  # Nada em ~/.william
+    _scheduler_mod.TASKS_FILE = _os.path.join(_tmp, 'scheduled_tasks.json')
+    sched = TaskScheduler(max_workers=4, ledger=RunLedger(_os.path.join(_tmp, 'runs.db')))
+    def _cb(command, name):
+        if command == 'falha':
+            raise RuntimeError('boom')
+    sched.add_callback(_cb)
+    ok_task = sched.add_task('ledger_ok', 'ok', interval_minutes=60, max_retries=0)
+    bad_task = sched.add_task('ledger_falha', 'falha', interval_minutes=60, max_retries=0)
+    assert sched._dirty and sched.flush() and not sched.flush()  # 1 save para 2 mudancas
+    for _ in range(3):
+        sched._fire_task(ok_task)
+        sched._fire_task(bad_task)
+    _time.sleep(0.3)
+    history = sched.get_run_history(task_id=ok_task['id'])
+    flaky = sched.get_flaky_tasks()
+    sched.remove_task(ok_task['id'])
+    sched.remove_task(bad_task['id'])
+    sched.close()
+    assert len(history) == 3 and history[0]['outcome'] == 'success'
+    assert flaky[0]['task_id'] == bad_task['id'] and flaky[0]['failure_rate'] == 1.0
+    func_ok += 1
+    print(f'  [OK] Scheduler ledger: {len(history)} execucoes, instavel = {flaky[0]["task_name"]}')
+except Exception as e:
+    print(f'  [FAIL] Scheduler ledger: {e}')
+
+# Test 32: Benchmark de dispatch indexado do TriggerManager
+func_total += 1
+try:
+    import os as _os, time as _time
+    from src.core.triggers import TriggerManager
+    tm = TriggerManager()
+    _base = _os.path.abspath('_bench_triggers')  # nao existe: sem watchers
+    _types = ['file_created', 'file_modified', 'file_deleted', 'process_started']
+    _exts = [f'x{i}' for i in range(25)]
+    for i in range(1000):
+        tm.add_rule(f'r{i}', _types[i % 4],
+                    {'path': _os.path.join(_base, f'd{i % 10}'), 'extensions': [_exts[i % 25]],
+                     'pattern': 'relatorio'}, 'cmd', cooldown=3600)
+    fired = []
+    tm.on_trigger(lambda rule, data: fired.append(rule.name))
+    events = [(_types[i % 3], {'path': _os.path.join(_base, f'd{i % 10}', f'foto_{i}.x{i % 25}'),
+                               'filename': f'foto_{i}.x{i % 25}'}) for i in range(20000)]
+    t0 = _time.perf_counter()
+    for etype, data in events:
+        tm._fire_event(etype, data)
+    indexed = _time.perf_counter() - t0
+    # Referencia: varredura linear de todas as regras (comportamento anterior)
+    t0 = _time.perf_counter()
+    for etype, data in events[:2000]:
+        for r in tm.rules.values():
+            if r.trigger_type == etype and r.condition['pattern'] in data['filename'].lower():
+                _os.path.splitext(data['filename'])[1].lower() in r.condition['extensions']
+    linear = (_time.perf_counter() - t0) * 10
+    tm._fire_event('file_created', {'path': _os.path.join(_base, 'd0', 'relatorio.x0'),
+                                    'filename': 'relatorio.x0'})
+    stats = tm.get_stats()
+    assert fired == [f'r{i}' for i in range(0, 1000, 100)], fired
+    assert stats['rules_evaluated'] / stats['events_dispatched'] < 10
+    func_ok += 1
+    print(f'  [OK] Trigger dispatch: {len(events) / indexed:,.0f} eventos/s com 1000 regras '
+          f'({linear / indexed:.0f}x vs linear)')
+except Exception as e:
+    print(f'  [FAIL] Trigger dispatch: {e}')
+
+# Test 33: Coalescencia de eventos de arquivo (janela de silencio por path)
+func_total += 1
+try:
+    import os as _os, time as _time
+    from src.core.triggers import TriggerManager
+    tm = TriggerManager(quiet_seconds=0.2)
+    _base = _os.path.abspath('_coalesce_triggers')
+    tm.add_rule('novos_pdfs', 'file_created', {'path': _base, 'extensions': ['pdf']}, 'organizar',
+                cooldown=1)
+    batches = []
+    tm.on_trigger(lambda rule, data: batches.append(data))
+    for i in range(5):
+        _path = _os.path.join(_base, f'doc{i}.pdf')
+        tm._on_file_event('file_created', _path)
+        for _ in range(20):  # copia grande: rajada de modified
+            tm._on_file_event('file_modified', _path)
+    tm._on_file_event('file_created', _os.path.join(_base, 'tmp.pdf'))
+    tm._on_file_event('file_deleted', _os.path.join(_base, 'tmp.pdf'))
+    _time.sleep(0.6)
+    stats = tm.get_stats()
+    assert len(batches) == 1 and batches[0]['count'] == 5, batches
+    assert stats['events_received'] == 107 and stats['events_coalesced'] == 5
+    tm._on_file_event('file_created', _os.path.join(_base, 'doc5.pdf'))  # chega no cooldown
+    _time.sleep(0.9)
+    tm.stop()
+    assert len(batches) == 2 and batches[1]['files'][0].endswith('doc5.pdf'), batches
+    func_ok += 1
+    print(f'  [OK] Trigger coalescing: {stats["events_received"]} eventos -> 1 disparo com {batches[0]["count"]} arquivos')
+except Exception as e:
+    print(f'  [FAIL] Trigger coalescing: {e}')
+
+# Test 34: Observer unico com watches deduplicados (recursivo so quando pedido)
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile, threading as _threading, time as _time
+    from src.core.triggers import TriggerManager, _watchdog_available
+    if _watchdog_available:
+        _root = _tempfile.mkdtemp()
+        _sub = _os.path.join(_root, 'sub')
+        _other = _tempfile.mkdtemp()
+        _os.makedirs(_sub)
+        tm = TriggerManager(quiet_seconds=0.1)
+        threads_before = _threading.active_count()
+        r_root = tm.add_rule('raiz', 'file_created', {'path': _root, 'recursive': True}, 'a')
+        r_root2 = tm.add_rule('raiz_pdf', 'file_created', {'path': _root, 'extensions': ['pdf']}, 'b')
+        r_sub = tm.add_rule('sub', 'file_created', {'path': _sub}, 'c')
+        tm.add_rule('outro', 'file_created', {'path': _other}, 'd')
+        assert tm.get_stats()['watchers'] == 2 and tm.get_stats()['watched_paths'] == 3
+        assert _threading.active_count() - threads_before <= 1 + 2 * 2  # observer + emitter/buffer por watch
+        _deep = _os.path.join(_sub, 'a.pdf')
+        matched = [r.name for r in tm._match_rules('file_created', {'path': _deep, 'filename': 'a.pdf'})]
+        assert matched == ['raiz', 'sub'], matched  # raiz_pdf nao e recursiva
+        fired = []
+        tm.on_trigger(lambda rule, data: fired.append(rule.name))
+        tm.remove_rule(r_root.id)
+        assert tm.get_stats()['watchers'] == 3  # raiz_pdf fica, sem recursao: sub vira watch
+        tm.remove_rule(r_root2.id)
+        assert tm.get_stats()['watchers'] == 2 and tm.get_stats()['watched_paths'] == 2  # sub vira raiz
+        with open(_os.path.join(_sub, 'novo.txt'), 'w') as _f:
+            _f.write('x')
+        _time.sleep(0.8)
+        tm.stop()
+        assert fired == ['sub'], fired
+    func_ok += 1
+    print(f'  [OK] Watch registry: 3 paths -> 2 watches em 1 observer (watchdog={_watchdog_available})')
+except Exception as e:
+    print(f'  [FAIL] Watch registry: {e}')
+
+# Test 35: Triggers de processo por diff de snapshots do psutil
+func_total += 1
+try:
+    import os as _os, subprocess as _subprocess, sys as _sys, time as _time
+    from src.core.triggers import TriggerManager, _psutil_available
+    if _psutil_available:
+        _early = _subprocess.Popen([_sys.executable, '-c', 'import time; time.sleep(0.6)'])
+        tm = TriggerManager()
+        tm._process_monitor.min_interval = tm._process_monitor.interval = 0.05
+        tm._process_monitor.max_interval = 0.1
+        events = []
+        tm.on_trigger(lambda rule, data: events.append((rule.trigger_type, data['pid'])))
+        _exe = _os.path.basename(_sys.executable).lower()
+        tm.add_rule('py_start', 'process_started', {'process_name': _exe[:6]}, 'a', cooldown=0)
+        tm.add_rule('py_stop', 'process_stopped', {'process_name': _exe[:6]}, 'b', cooldown=0)
+        _time.sleep(0.2)  # baseline
+        _proc = _subprocess.Popen([_sys.executable, '-c', 'import time; time.sleep(0.5)'])
+        _proc.wait()
+        _early.wait()
+        _time.sleep(0.4)
+        monitor = tm._process_monitor.stats
+        tm.stop()
+        assert ('process_started', _proc.pid) in events and ('process_stopped', _proc.pid) in events, events
+        assert ('process_stopped', _early.pid) in events, events  # PID do baseline tem nome
+        assert monitor['lookups'] == monitor['started']  # nome so para PIDs novos
+    func_ok += 1
+    print(f'  [OK] Process triggers: start/stop detectados (psutil={_psutil_available})')
+except Exception as e:
+    print(f'  [FAIL] Process triggers: {e}')
+
+# Test 36: EventLog com buffer em memoria e flusher em lote
+func_total += 1
+try:
+    import tempfile as _tempfile, time as _time
+    from src.core.observability import EventLog
+    elog = EventLog(log_dir=_tempfile.mkdtemp(), flush_interval=0.2, fsync='batch')
+    t0 = _time.perf_counter()
+    for i in range(5000):
+        elog.log_event('bench', data={'i': i})
+    per_event_us = (_time.perf_counter() - t0) / 5000 * 1e6
+    _time.sleep(0.5)  # flusher por tempo/tamanho
+    writer = elog.get_writer_stats()
+    assert writer['written'] == 5000 and writer['flushes'] < 100, writer
+    elog.log_event('ultimo', task_id='t1')
+    assert elog.get_recent(1)[0]['type'] == 'ultimo'  # leitura faz flush antes
+    elog.close()
+    func_ok += 1
+    print(f'  [OK] EventLog buffer: {per_event_us:.1f}us/evento, {writer["flushes"]} lotes')
+except Exception as e:
+    print(f'  [FAIL] EventLog buffer: {e}')
+
+# Test 37: EventLog indexado (sidecars) - replay em todos os dias retidos
+func_total += 1
+try:
+    import json as _json, os as _os, tempfile as _tempfile
+    from datetime import date as _date, timedelta as _td
+    from src.core.observability import EventLog
+    _dir = _tempfile.mkdtemp()
+    # Dia anterior sem sidecar (formato anterior): reindexado na primeira consulta
+    _old_day = (_date.today() - _td(days=3)).isoformat()
+    with open(_os.path.join(_dir, f'{_old_day}.jsonl'), 'w', encoding='utf-8') as _f:
+        for i in range(300):
+            _f.write(_json.dumps({'ts': f'{_old_day}T10:00:00', 'type': 'action_start',
+                                  'agent': 'file_agent', 'task_id': 'antiga' if i == 7 else None,
+                                  'risk': 'green', 'message': '', 'data': {'i': i}}) + '\n')
+    # Dia fora da janela de retencao: nunca indexado
+    _expired = (_date.today() - _td(days=40)).isoformat()
+    with open(_os.path.join(_dir, f'{_expired}.jsonl'), 'w', encoding='utf-8') as _f:
+        _f.write(_json.dumps({'ts': f'{_expired}T10:00:00', 'type': 'action_start',
+                              'agent': 'file_agent', 'task_id': 'antiga'}) + '\n')
+    elog = EventLog(log_dir=_dir, retention_days=30)
+    assert not elog._indexed  # Nada carregado ate a primeira consulta
+    for i in range(2000):
+        elog.log_event('decision' if i % 2 else 'error', agent='router', task_id=f't{i % 50}')
+    elog.log_event('action_end', agent='file_agent', task_id='antiga')
+    replay = elog.replay_task('antiga')
+    assert [e['type'] for e in replay] == ['action_start', 'action_end'], replay
+    assert len(elog.replay_task('t3')) == 40
+    assert len(elog.get_events_by_type('error', 10)) == 10
+    assert elog.get_events_by_agent('file_agent', 500)[0]['data']['i'] == 0
+    stats = elog.get_stats()
+    assert stats['total'] == 2001 and stats['errors'] == 1000 and stats['agents']['router'] == 2000
+    other = EventLog(log_dir=_dir)
+    assert len(other.replay_task('t3')) == 40  # sidecar persistido
+    other.log_event('error', agent='outro_processo', task_id='t3')
+    other.close()
+    assert len(elog.replay_task('t3')) == 41  # append externo visto pelo tamanho
+    elog.close()
+    func_ok += 1
+    print(f'  [OK] EventLog indexado: replay cruzando dias, stats={stats["total"]} sem rescan')
+except Exception as e:
+    print(f'  [FAIL] EventLog indexado: {e}')
+
+# Test 38: Cache de respostas do AIEngine (memoria + disco, TTL, bypass)
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile, time as _time
+    import src.core.response_cache as _rc
+    _db = _os.path.join(_tempfile.mkdtemp(), 'responses.db')
+    cache = _rc.ResponseCache(db_file=_db, memory_items=2)
+    k1 = _rc.make_key('groq', 'm', 'Resuma em 3 linhas: X', None, 0.2, 300)
+    assert k1 == _rc.make_key('groq', 'm', 'Resuma em 3 linhas: X  \r\n', None, 0.2, 300)
+    assert k1 != _rc.make_key('groq', 'm', 'Resuma em 3 linhas: X', None, 0.2, 500)
+    cache.put(k1, 'resumo', ttl=60, elapsed=1.5)
+    cache.put('k2', 'b', ttl=60)
+    cache.put('k3', 'c', ttl=0.05)
+    assert cache.get(k1) == 'resumo'           # saiu do LRU (2 itens), volta do disco
+    _time.sleep(0.1)
+    assert cache.get('k3') is None             # TTL vencido
+    assert _rc.ResponseCache(db_file=_db).get(k1) == 'resumo'  # sobrevive a reinicio
+    stats = cache.get_stats()
+    assert stats['disk_hits'] == 1 and stats['misses'] == 1 and stats['saved_seconds'] == 1.5
+
+    import importlib.util as _ilu, types as _types
+    if _ilu.find_spec('groq') is None:
+        # SDK do Groq ausente: stub minimo so para importar o AIEngine
+        _groq, _groq_exc = _types.ModuleType('groq'), _types.ModuleType('groq._exceptions')
+        class _StubClient:
+            def __init__(self, *args, **kwargs):
+                self.kwargs = kwargs
+        _groq.Groq = type('Groq', (_StubClient,), {})
+        _groq.AsyncGroq = type('AsyncGroq', (_StubClient,), {})
+        _groq_exc.APIError = type('APIError', (Exception,), {})
+        _groq._exceptions = _groq_exc
+        sys.modules['groq'], sys.modules['groq._exceptions'] = _groq, _groq_exc
+    from src.core.ai_engine import AIEngine
+    class _FakeProvider:
+        model = 'fake-1'
+        calls = 0
+        def chat(self, message, context=None, **kwargs):
+            _FakeProvider.calls += 1
+            return f'resposta {_FakeProvider.calls}'
+    _rc._response_cache = _rc.ResponseCache(db_file=_os.path.join(_tempfile.mkdtemp(), 'r.db'))
+    engine = AIEngine.__new__(AIEngine)
+    engine.providers = {'fake': _FakeProvider()}
+    engine.default_provider = 'fake'
+    engine.fallback_order = ['fake']
+    engine._provider_errors, engine._rate_limited_until = {}, {}
+    engine._latencies, engine._hedge_stats, engine._loop = {}, {}, None
+    r1 = engine.chat('Resuma: X', temperature=0.2, max_tokens=300)
+    r2 = engine.chat('Resuma: X', temperature=0.2, max_tokens=300)
+    r3 = engine.chat('Resuma: X', temperature=0.9)            # bypass (amostragem alta)
+    r4 = engine.chat_with_fallback('prompt fixo', cache=True)
+    r5 = engine.chat_with_fallback('prompt fixo', cache=True)
+    _rc._response_cache = None
+    assert r1 == r2 and r3 != r1 and r4 == r5 and _FakeProvider.calls == 3
+    func_ok += 1
+    print('  [OK] Response cache: LRU + disco + TTL + engine')
+except Exception as e:
+    print(f'  [FAIL] Response cache: {e}')
+
+# Test 39: Cache semantico (parafrases, escopo por tipo, limiar por tipo)
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile, zlib as _zlib
+    import numpy as _np
+    from src.core.semantic_cache import SemanticCache, normalize_prompt, parse_thresholds
+
+    def _trigram_embed(text):
+        v = _np.zeros(512, dtype=_np.float32)
+        for i in range(len(text) - 2):
+            v[_zlib.crc32(text[i:i + 3].encode()) % 512] += 1
+        return v / _np.linalg.norm(v)
+
+    assert normalize_prompt('Estratégia  p/ OFICINA') == 'estrategia para oficina'
+    assert parse_thresholds('code:0.99,x')['code'] == 0.99
+    _db = _os.path.join(_tempfile.mkdtemp(), 'responses.db')
+    scache = SemanticCache(db_file=_db, embed=_trigram_embed)
+    system = [{'role': 'system', 'content': 'Voce e consultor'}]
+    scache.put('Crie uma estratégia de marketing p/ minha oficina mecânica', 'plano A',
+               'business', system)
+    assert scache.get('crie uma estrategia de marketing para a minha oficina mecanica',
+                      'business', system) == 'plano A'
+    assert scache.get('crie uma estrategia de vendas para minha padaria', 'business', system) is None
+    assert scache.get('Crie uma estratégia de marketing p/ minha oficina mecânica', 'code', system) is None
+    assert scache.get('Crie uma estratégia de marketing p/ minha oficina mecânica', 'business') is None
+    assert SemanticCache(db_file=_db, embed=lambda t: None).get('x', 'business') is None  # modelo carregando
+    reloaded = SemanticCache(db_file=_db, embed=_trigram_embed)
+    assert reloaded.get('crie uma estrategia de marketing para minha oficina mecanica',
+                        'business', system) == 'plano A'
+    stats = scache.get_stats()
+    assert stats['hits_by_type'] == {'business': 1} and stats['misses'] == 3
+
+    from src.core.ai_engine import AIEngine  # groq real ou stub do teste 38
+    import src.core.semantic_cache as _sc
+    class _FakeProvider:
+        model = 'fake-1'
+        calls = 0
+        def chat(self, message, context=None, **kwargs):
+            assert 'semantic_cache' not in kwargs
+            _FakeProvider.calls += 1
+            return f'resposta {_FakeProvider.calls}'
+    import src.core.response_cache as _rc
+    _rc._response_cache = _rc.ResponseCache(db_file=_os.path.join(_tempfile.mkdtemp(), 'r.db'))
+    _sc._semantic_cache = SemanticCache(db_file=_os.path.join(_tempfile.mkdtemp(), 's.db'),
+                                        embed=_trigram_embed)
+    engine = AIEngine.__new__(AIEngine)
+    engine.providers = {'fake': _FakeProvider()}
+    engine.default_provider = 'fake'
+    engine.fallback_order = ['fake']
+    engine._provider_errors, engine._rate_limited_until = {}, {}
+    engine._latencies, engine._hedge_stats, engine._loop = {}, {}, None
+    r1 = engine.chat_with_fallback('Como aumentar vendas da minha loja?', semantic_cache=True)
+    r2 = engine.chat_with_fallback('como aumentar as vendas da minha loja', semantic_cache=True)
+    r3 = engine.chat_with_fallback('como aumentar as vendas da minha loja', semantic_cache=True,
+                                   context=[{'role': 'user', 'content': 'oi'}])  # conversa: bypass
+    r4 = engine.chat_with_fallback('como aumentar as vendas da minha loja', semantic_cache=True,
+                                   cache=False)                             # bypass dos dois
+    r5 = engine.chat_with_fallback('como aumentar as vendas da minha loja', semantic_cache=True,
+                                   temperature=0.9)                         # amostragem alta
+    _sc._semantic_cache = None
+    _rc._response_cache = None
+    assert r1 == r2 and len({r1, r3, r4, r5}) == 4 and _FakeProvider.calls == 4
+    # Limite por escopo: a entrada despejada sai tambem do disco
+    import sqlite3 as _sqlite3
+    _max, _sc.MAX_ENTRIES_PER_SCOPE = _sc.MAX_ENTRIES_PER_SCOPE, 2
+    _db2 = _os.path.join(_tempfile.mkdtemp(), 's2.db')
+    small = SemanticCache(db_file=_db2, embed=_trigram_embed)
+    for _p in ('primeira pergunta longa', 'segunda pergunta longa', 'terceira pergunta longa'):
+        small.put(_p, _p.upper(), 'general')
+    _sc.MAX_ENTRIES_PER_SCOPE = _max
+    _rows = _sqlite3.connect(_db2).execute('SELECT COUNT(*) FROM semantic_responses').fetchone()[0]
+    assert _rows == 2 and small.get_stats()['entries'] == 2, _rows
+    func_ok += 1
+    print('  [OK] Cache semantico: parafrase reaproveitada, escopo por tipo + engine')
+except Exception as e:
+    print(f'  [FAIL] Cache semantico: {e}')
+
+# Test 40: Provider async (achat) + hedging no AIEngine
+func_total += 1
+try:
+    import asyncio as _asyncio, time as _time
+    from src.ai_providers.base_provider import BaseAIProvider
+
+    class _SyncOnly(BaseAIProvider):
+        def chat(self, message, context=None, **kwargs):
+            return message.upper()
+        def chat_stream(self, message, context=None, **kwargs):
+            yield from message.split()
+
+    async def _collect(provider):
+        return [c async for c in provider.achat_stream('a b c')]
+    _sync = _SyncOnly('k', 'm')
+    assert _asyncio.run(_sync.achat('oi')) == 'OI'          # padrao: thread
+    assert _asyncio.run(_collect(_sync)) == ['a', 'b', 'c']
+
+    from src.core.ai_engine import AIEngine  # groq real ou stub do teste 38
+    from src.ai_providers.groq_provider import GroqProvider
+    _groq_provider = GroqProvider(api_key='k')
+    async def _sdk_client():
+        return _groq_provider.async_client
+    assert _asyncio.run(_sdk_client()) is not _asyncio.run(_sdk_client())  # um SDK por event loop
+
+    class _AsyncFake:
+        def __init__(self, model, delay, fail=False):
+            self.model, self.delay, self.fail = model, delay, fail
+            self.cancelled = 0
+        async def achat(self, message, context=None, **kwargs):
+            try:
+                await _asyncio.sleep(self.delay)
+            except _asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            if self.fail:
+                raise RuntimeError('falhou')
+            return f'{self.model}: ok'
+        def chat(self, message, context=None, **kwargs):
+            _time.sleep(self.delay)
+            return f'{self.model}: ok'
+
+    def _fake_engine(**providers):
+        engine = AIEngine.__new__(AIEngine)
+        engine.providers = providers
+        engine.default_provider = next(iter(providers))
+        engine.fallback_order = list(providers)
+        engine._provider_errors, engine._rate_limited_until = {}, {}
+        engine._latencies, engine._loop = {}, None
+        engine._hedge_stats = {'hedged': 0, 'hedge_wins': 0, 'cancelled': 0}
+        return engine
+
+    import src.core.response_cache as _rc
+    _rc._response_cache = _rc.ResponseCache(db_file=_os.path.join(_tempfile.mkdtemp(), 'r.db'))
+    engine = _fake_engine(lento=_AsyncFake('lento', 2.0), rapido=_AsyncFake('rapido', 0.05))
+    for _ in range(10):
+        engine._record_success('lento', 0.1, fallback=False)   # p95 = 0.1 -> HEDGE_MIN_DELAY
+    t0 = _time.time()
+    r = engine.chat_with_fallback('Oi tudo bem', hedge=True, cache=False)
+    hedged_in = _time.time() - t0
+    assert r == 'rapido: ok' and hedged_in < 1.5, (r, hedged_in)
+    _time.sleep(0.05)
+    assert engine.providers['lento'].cancelled == 1          # perdedor cancelado
+    assert engine._hedge_stats == {'hedged': 1, 'hedge_wins': 1, 'cancelled': 1}
+    _lento = engine._latencies['lento']
+    assert len(_lento) == 11 and _lento[-1] >= hedged_in - 0.2  # perdedor: amostra censurada
+
+    engine = _fake_engine(quebrado=_AsyncFake('quebrado', 0.01, fail=True),
+                          reserva=_AsyncFake('reserva', 0.01))
+    assert _asyncio.run(engine.achat_with_fallback('Oi tudo bem', cache=False)) == 'reserva: ok'
+    assert 'quebrado' in engine._provider_errors
+    _rc._response_cache = None
+    hedge_info = f'hedge em {hedged_in:.2f}s vs 2.0s do lento'
+    func_ok += 1
+    print(f'  [OK] Provider async + hedging: {hedge_info}')
+except Exception as e:
+    print(f'  [FAIL] Provider async + hedging: {e}')
+
+# Test 41: Pool HTTP compartilhado (keep-alive por host, limites, stats)
+func_total += 1
+try:
+    import asyncio as _asyncio, http.server as _hs, json as _json, socketserver as _ss, threading as _th
+    from src.core.http_pool import HttpPool, origin_of, parse_host_limits
+
+    class _OllamaLike(_hs.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        wbufsize = 65536
+        def _reply(self, payload):
+            body = _json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def do_GET(self):
+            self._reply({'models': [{'name': 'fake:1b'}]})
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self._reply({'message': {'content': 'ola'}})
+        def log_message(self, *args):
+            pass
+
+    _accepted = []
+    class _Server(_ss.ThreadingMixIn, _hs.HTTPServer):
+        daemon_threads = True
+        def get_request(self):
+            conn = super().get_request()
+            _accepted.append(conn)
+            return conn
+    _srv = _Server(('127.0.0.1', 0), _OllamaLike)
+    _th.Thread(target=_srv.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{_srv.server_address[1]}'
+
+    assert origin_of(base + '/api/tags?x=1') == base
+    assert parse_host_limits('localhost:11434=4,bad') == {'localhost:11434': 4}
+    pool = HttpPool(host_limits={f'127.0.0.1:{_srv.server_address[1]}': 3})
+    for _ in range(100):
+        assert pool.get(base + '/api/tags').json()['models']
+    assert len(_accepted) == 1, len(_accepted)                # keep-alive: 1 conexao TCP
+
+    async def _burst():
+        client = pool.get_async_client(base)
+        await _asyncio.gather(*[client.get(base + '/api/tags') for _ in range(12)])
+        return client is pool.get_async_client(base)
+    assert _asyncio.run(_burst())
+    host = pool.get_stats()['hosts'][base]
+    assert host['requests'] == 112 and host['limit'] == 3 and host['async_open'] <= 3, host
+
+    import src.core.http_pool as _hp
+    _hp._http_pool = pool
+    from src.ai_providers.ollama_provider import OllamaProvider
+    ollama = OllamaProvider(model='fake:1b', base_url=base)
+    answers = [ollama.chat('oi') for _ in range(20)]
+    assert ollama.is_available() and set(answers) == {'ola'}
+    assert _asyncio.run(ollama.achat('oi')) == 'ola'
+    _hp._http_pool = None
+    pool.close()
+    # URLs arbitrarias (browser_skill): LRU so para request/get; cliente
+    # entregue por get_client (provider) nunca e fechado pelo despejo
+    lru = HttpPool(max_clients=2)
+    _held = lru.get_client(base)
+    for _port in range(1, 6):
+        try:
+            lru.get(f'http://127.0.0.1:{_port}/', timeout=0.2)  # porta fechada: so cria o cliente
+        except Exception:
+            pass
+    _stats = lru.get_stats()
+    assert _stats['transient_clients'] == 2 and _stats['evicted_clients'] == 3, _stats
+    assert not _held.is_closed and list(lru._clients) == [base]
+    assert _held.get(base + '/api/tags').status_code == 200  # provider segue funcionando
+    lru.close()
+    _srv.shutdown()
+    func_ok += 1
+    print(f'  [OK] HTTP pool: 100 GETs em 1 conexao TCP, limite por host, Ollama no pool '
+          f'({len(_accepted)} conexoes no total)')
+except Exception as e:
+    print(f'  [FAIL] HTTP pool: {e}')
+
+# Test 42: Janela de contexto com orcamento de tokens (CLI + AIBrain)
+func_total += 1
+try:
+    from config.settings import settings as _settings
+    from src.core.context_window import ContextWindow, TokenCounter, fit_messages, get_token_counter
+
+    counter = TokenCounter('groq')
+    assert counter.count('ola mundo') == counter.count('ola mundo') > 0
+    assert fit_messages([{'role': 'user', 'content': 'x' * 400}] * 5, 300, counter) == \
+        [{'role': 'user', 'content': 'x' * 400}] * 2
+
+    window = ContextWindow(budget=400, provider='groq')
+    sizes = []
+    for i in range(200):
+        window.add('user', f'Meu pedido numero {i}. Detalhes: ' + 'bla ' * 20)
+        window.add('assistant', f'Resposta {i}. ' + 'texto ' * 20)
+        ctx = window.context_for('proxima pergunta')
+        sizes.append(window.counter.count_messages(ctx))
+    stats = window.get_stats()
+    assert max(sizes) <= 400 and stats['evicted'] > 300, (max(sizes), stats)
+    assert stats['summaries'] < 200                      # despejo em bloco, nao a cada turno
+    assert ctx[0]['role'] == 'system' and 'pedido numero' in ctx[0]['content']
+    assert ctx[-1]['content'].startswith('Resposta 199')
+    window.clear()
+    assert len(window) == 0 and window.context_for('oi') == []
+
+    from src.core.ai_brain import AIBrain
+    class _CaptureEngine:
+        default_provider = 'groq'
+        def chat(self, message, context=None, **kwargs):
+            self.context = context
+            return '{"action":"answer","answer":"ok","description":"teste"}'
+    _engine = _CaptureEngine()
+    history = [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'turno {i} ' + 'x ' * 300}
+               for i in range(60)]
+    assert AIBrain(_engine).process('qual o status?', history)['success']
+    sent = get_token_counter('groq').count_messages(_engine.context)
+    assert sent <= _settings.MAX_CONTEXT_LENGTH and _engine.context[-1] is history[-1]
+    func_ok += 1
+    print(f'  [OK] Contexto por tokens: max {max(sizes)}/400 tokens em 400 msgs, '
+          f'brain {sent}/{_settings.MAX_CONTEXT_LENGTH} ({len(_engine.context) - 1} turnos)')
+except Exception as e:
+    print(f'  [FAIL] Contexto por tokens: {e}')
+
+# Test 43: Timeout do scheduler segura o slot ate o callback retornar
+func_total += 1
+try:
+    import os as _os, tempfile as _tempfile, threading as _threading, time as _time
+    from src.core import scheduler as _scheduler_mod
+    from src.core.run_ledger import RunLedger
+    from src.core.scheduler import TaskScheduler
+    _tmp = _tempfile.mkdtemp()
+    _scheduler_mod.TASKS_FILE = _os.path.join(_tmp, 'scheduled_tasks.json')
+    sched = TaskScheduler(max_workers=4, ledger=RunLedger(_os.path.join(_tmp, 'runs.db')))
+    active, peak = [0], [0]
+    _gate = _threading.Lock()
+    def _hang(command, name):
+        with _gate:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        _time.sleep(0.4)
+        with _gate:
+            active[0] -= 1
+    sched.add_callback(_hang)
+    sched.start()
+    hung = sched.add_task('travada', 'cmd', interval_minutes=60, timeout_seconds=0.1,
+                          max_retries=1, max_concurrency=1)
+    with sched._cond:
+        sched._dispatch(hung, _time.time())
+    _time.sleep(0.25)
+    with sched._cond:
+        sched._dispatch(hung, _time.time())       # proximo disparo com a tentativa travada
+    during = sched.get_metrics()
+    _time.sleep(3.0)                             # backoff de 2s + retry travado
+    after = sched.get_metrics()
+    history = sched.get_run_history(task_id=hung['id'])
+    sched.remove_task(hung['id'])
+    sched.close()
+    assert during['overdue_jobs'] == 1 and during['running_jobs'] == 1, during
+    assert during['skipped_overlap'] == 1 and peak[0] == 1, (during, peak)
+    assert after['timeouts'] == 2 and after['running_jobs'] == 0, after
+    assert len(history) == 1 and history[0]['outcome'] == 'timeout' and history[0]['retries'] == 1
+    func_ok += 1
+    print(f'  [OK] Scheduler timeout: pico de concorrencia {peak[0]}, retry so apos o callback')
+except Exception as e:
+    print(f'  [FAIL] Scheduler timeout: {e}')
+
 print(f'\n  Testes funcionais: {func_ok}/{func_total}')
 
 # ===== RESUMO FINAL =====